@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class AccountsConfig(AppConfig):
+    name = "accounts"
+
+    def ready(self):
+        from common import metrics
+        from . import signals  # noqa: F401
+        from .authentication import stats
+
+        metrics.register("accounts.tokens", stats)
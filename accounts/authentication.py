@@ -0,0 +1,59 @@
+# Token authentication with an in-process cache of token key -> token (and its user), so
+# most requests authenticate without the Token/User query. Deleting a token or saving its
+# user evicts it from this process at once (see signals.py). Other processes, and changes
+# made with queryset .update(), are caught up when the entry expires, so a revoked token
+# or deactivated user is refused everywhere within ACCOUNTS_TOKEN_CACHE_SECONDS.
+import copy
+import threading
+import time
+from typing import Iterable
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from common.caches import LRUCache
+
+# key -> (loaded at, Token with .user loaded)
+token_users = LRUCache(maxsize=getattr(settings, "ACCOUNTS_TOKEN_CACHE_SIZE", 10_000))
+
+_lock = threading.Lock()
+_generation = 0  # bumped by every eviction, so a lookup racing with one is not cached
+_expired = 0
+_evicted = 0
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves repeat requests for a token from token_users."""
+
+    def authenticate_credentials(self, key):
+        global _expired
+        ttl = getattr(settings, "ACCOUNTS_TOKEN_CACHE_SECONDS", 60)
+        cached = token_users.get(key)
+        if cached is not None:
+            loaded_at, token = cached
+            if time.monotonic() - loaded_at <= ttl:
+                # a copy per request: attributes set on request.user stay in that request
+                return copy.copy(token.user), token
+            with _lock:
+                _expired += 1
+
+        generation = _generation
+        user, token = super().authenticate_credentials(key)  # raises for unknown keys and inactive users
+        with _lock:
+            if generation == _generation:
+                token_users.set(key, (time.monotonic(), token))
+        return copy.copy(user), token
+
+
+def forget_tokens(keys: Iterable[str]) -> None:
+    global _generation, _evicted
+    with _lock:
+        _generation += 1
+        for key in keys:
+            if token_users.pop(key) is not None:
+                _evicted += 1
+
+
+def stats() -> dict:
+    with _lock:
+        return {**token_users.stats(), "expired": _expired, "evicted": _evicted}
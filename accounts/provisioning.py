@@ -0,0 +1,182 @@
+# Bulk creation of student accounts from a CSV (username,password[,email,first_name,last_name]).
+#
+# Rows are read and validated in batches. Each batch's passwords are hashed across a
+# process pool (the slow part: one default PBKDF2 hash is about half a second of CPU),
+# then the users and their API tokens are inserted with bulk_create, so first logins find
+# a token instead of creating one. The caller receives a generator of report entries:
+# one per row (created or rejected) plus a summary. Tokens are bearer credentials, so
+# they are only reported when asked for (the management command's --include-tokens).
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+
+CSV_COLUMNS = ("username", "password", "email", "first_name", "last_name")
+
+# a record is (row number, {column: value}) or (row number, error message)
+Record = Tuple[int, object]
+
+
+def read_students(lines: Iterable[str]) -> Iterator[Record]:
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or not {"username", "password"}.issubset(reader.fieldnames):
+        yield 1, f"CSV header must include username and password (optional: {', '.join(CSV_COLUMNS[2:])})"
+        return
+    for r in reader:
+        record = {c: (r.get(c) or "").strip() for c in CSV_COLUMNS}
+        record["password"] = r.get("password") or ""
+        yield reader.line_num, record
+
+
+def _student_errors(User, record) -> Dict[str, str]:
+    # the rules the admin's user form applies, without a form per row
+    username = record["username"]
+    if not username:
+        return {"username": "This field is required."}
+    for name in ("username", "first_name", "last_name"):
+        max_length = User._meta.get_field(name).max_length
+        if len(record[name]) > max_length:
+            return {name: f"Ensure this field has no more than {max_length} characters."}
+    try:
+        User.username_validator(username)
+    except ValidationError as exc:
+        return {"username": exc.messages[0]}
+    if record["email"]:
+        try:
+            validate_email(record["email"])
+        except ValidationError as exc:
+            return {"email": exc.messages[0]}
+    if not record["password"]:
+        return {"password": "This field is required."}
+    try:
+        validate_password(record["password"], user=User(username=username, email=record["email"]))
+    except ValidationError as exc:
+        return {"password": " ".join(exc.messages)}
+    return {}
+
+
+# process pool plumbing: the hasher is shipped once per worker, not once per task
+_worker_hasher = None
+
+
+def _init_worker(hasher):
+    global _worker_hasher
+    _worker_hasher = hasher
+
+
+def _hash_password(password: str) -> str:
+    return _worker_hasher.encode(password, _worker_hasher.salt())
+
+
+class PasswordHasherPool:
+    """
+    Hashes passwords with the default hasher (as make_password does), in-process when
+    workers <= 1, otherwise spread over a process pool. Use as a context manager.
+    """
+
+    def __init__(self, workers: int = 1):
+        self.hasher = get_hasher()
+        self.workers = max(1, int(workers or 1))
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            # workers only hash, they never use the inherited database connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.hasher,),
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def hash(self, passwords: List[str]) -> List[str]:
+        if self._pool is None or len(passwords) < 2:
+            return [self.hasher.encode(p, self.hasher.salt()) for p in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._pool.map(_hash_password, passwords, chunksize=chunksize))
+
+
+def _provision_batch(
+    hashers: PasswordHasherPool, batch: List[Record], report: dict, include_tokens: bool = False,
+) -> Iterator[dict]:
+    User = get_user_model()
+    usernames = {r["username"] for _, r in batch if isinstance(r, dict)}
+    taken = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+
+    accepted = []
+    for row, record in batch:
+        errors = {"non_field_errors": record} if isinstance(record, str) else _student_errors(User, record)
+        if not errors and record["username"] in taken:
+            errors = {"username": "A user with that username already exists."}
+        if errors:
+            report["failed"] += 1
+            yield {"row": row, "status": "error", "errors": errors}
+            continue
+        taken.add(record["username"])
+        accepted.append((row, record))
+
+    if not accepted:
+        return
+
+    passwords = hashers.hash([record["password"] for _, record in accepted])
+    users = [
+        User(
+            username=record["username"], password=password, email=record["email"],
+            first_name=record["first_name"], last_name=record["last_name"],
+        )
+        for (_, record), password in zip(accepted, passwords)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            tokens = [Token(key=Token.generate_key(), user=user) for user in users]
+            Token.objects.bulk_create(tokens)
+    except IntegrityError:
+        # one of the usernames was taken after the batch was checked; nothing was kept
+        report["failed"] += len(accepted)
+        for row, _ in accepted:
+            yield {"row": row, "status": "error", "errors": {"non_field_errors": "Batch not saved: a username was taken concurrently. Retry these rows."}}
+        return
+
+    report["created"] += len(users)
+    for (row, _), user, token in zip(accepted, users, tokens):
+        entry = {"row": row, "status": "created", "username": user.username, "user_id": user.id}
+        if include_tokens:
+            entry["token"] = token.key
+        yield entry
+
+
+def provision_students(
+    records: Iterable[Record], batch_size: int = 500, workers: int = 1, include_tokens: bool = False,
+) -> Iterator[dict]:
+    """
+    Creates a user and token per valid record, batch by batch. Yields {"row", "status":
+    "created", "username", "user_id"} (plus "token" with include_tokens) or {"row",
+    "status": "error", "errors"} per record and finally {"status": "done", "created",
+    "failed"}. Every batch commits on its own, so a failure late in a file keeps earlier
+    rows. workers > 1 forks a process pool: only for management commands, never inside a
+    web request.
+    """
+    report = {"created": 0, "failed": 0}
+    records = iter(records)
+    with PasswordHasherPool(workers) as hashers:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            yield from _provision_batch(hashers, batch, report, include_tokens)
+
+    yield {"status": "done", **report}
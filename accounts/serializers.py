@@ -8,3 +8,7 @@ class LoginResponseSerializer(serializers.Serializer):
     token = serializers.CharField()
     user_id = serializers.IntegerField()
     username = serializers.CharField()
+
+class ProvisionStudentsSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    batch_size = serializers.IntegerField(required=False, default=500, min_value=1, max_value=5000)
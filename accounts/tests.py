@@ -0,0 +1,154 @@
+import io
+import json
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from .authentication import CachedTokenAuthentication, token_users
+from .provisioning import PasswordHasherPool
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_users.clear()
+
+    def test_repeat_requests_skip_the_token_query(self):
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            again, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual((user.pk, token.key, again.pk), (self.user.pk, self.token.key, self.user.pk))
+        self.assertIsNot(user, again)
+
+    def test_logout_revokes_the_cached_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(client.get("/api/submissions/").status_code, 200)
+
+        self.assertEqual(client.post("/api/auth/logout/").status_code, 200)
+        self.assertEqual(client.get("/api/submissions/").status_code, 401)
+
+    def test_deactivation_revokes_the_cached_token(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(ACCOUNTS_TOKEN_CACHE_SECONDS=60)
+    def test_changes_made_elsewhere_apply_after_the_ttl(self):
+        self.auth.authenticate_credentials(self.token.key)
+        # as if another process (or a bulk update, which sends no signal) deactivated the user
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.auth.authenticate_credentials(self.token.key)
+
+        with mock.patch("accounts.authentication.time.monotonic", return_value=10**9):
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.authenticate_credentials(self.token.key)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisionStudentsTests(TestCase):
+    CSV = (
+        "username,password,email,first_name\n"
+        "ada,analytical-engine-1,ada@example.com,Ada\n"
+        "existing,whatever-pass-9,,\n"
+        "grace,short,,\n"
+        "bad name!,cobol-compiler-59,,\n"
+        "alan,turing-machine-36,not-an-email,\n"
+        "ada,another-password-2,,\n"
+        "linus,kernel-hacker-91,,Linus\n"
+    )
+
+    def setUp(self):
+        User.objects.create_user("existing", password="pw")
+        self.staff = APIClient()
+        self.staff.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+
+    def upload(self, client, text=None):
+        upload = SimpleUploadedFile("cohort.csv", (text or self.CSV).encode(), content_type="text/csv")
+        response = client.post("/api/admin/students/provision/", {"file": upload, "batch_size": 3}, format="multipart")
+        return response, [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_creates_users_with_tokens_and_reports_every_row(self):
+        response, entries = self.upload(self.staff)
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(entries[-1], {"status": "done", "created": 2, "failed": 5})
+        by_row = {e["row"]: e for e in entries[:-1]}
+        self.assertEqual([r for r in sorted(by_row) if by_row[r]["status"] == "created"], [2, 8])
+        self.assertEqual(set(by_row[3]["errors"]), {"username"})  # already exists
+        self.assertEqual(set(by_row[4]["errors"]), {"password"})  # too short
+        self.assertEqual(set(by_row[5]["errors"]), {"username"})
+        self.assertEqual(set(by_row[6]["errors"]), {"email"})
+        self.assertEqual(set(by_row[7]["errors"]), {"username"})  # ada twice in the file
+
+        ada = User.objects.get(username="ada")
+        self.assertEqual((ada.email, ada.first_name, ada.is_active), ("ada@example.com", "Ada", True))
+        self.assertTrue(ada.check_password("analytical-engine-1"))
+        self.assertEqual(by_row[2], {"row": 2, "status": "created", "username": "ada", "user_id": ada.id})
+        self.assertTrue(Token.objects.filter(user=ada).exists())
+
+    def test_first_login_reuses_the_provisioned_token(self):
+        self.upload(self.staff)
+        tokens = Token.objects.count()
+
+        response = APIClient().post("/api/auth/login/", {"username": "linus", "password": "kernel-hacker-91"}, format="json")
+
+        self.assertEqual(response.json()["data"]["token"], Token.objects.get(user__username="linus").key)
+        self.assertEqual(Token.objects.count(), tokens)
+
+    def test_students_cannot_provision(self):
+        student = APIClient()
+        student.force_authenticate(User.objects.get(username="existing"))
+        upload = SimpleUploadedFile("cohort.csv", self.CSV.encode(), content_type="text/csv")
+        response = student.post("/api/admin/students/provision/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(User.objects.filter(username="ada").exists())
+
+    def test_command_hashes_across_a_process_pool(self):
+        report = io.StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write(self.CSV)
+            f.flush()
+            call_command("provision_students", f.name, "--workers", "2", "--batch-size", "4", stdout=report)
+
+        self.assertIn("Created 2 students, rejected 5 rows", report.getvalue())
+        self.assertTrue(User.objects.get(username="linus").check_password("kernel-hacker-91"))
+        self.assertNotIn('"token"', report.getvalue())
+
+    def test_command_reports_tokens_only_when_asked(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f, tempfile.NamedTemporaryFile("r", suffix=".ndjson") as out:
+            f.write(self.CSV)
+            f.flush()
+            call_command("provision_students", f.name, "--workers", "1", "--report", out.name, "--include-tokens", stdout=io.StringIO())
+            created = [e for e in map(json.loads, out) if e["status"] == "created"]
+
+        self.assertEqual({e["username"]: e["token"] for e in created}, dict(
+            Token.objects.filter(user__username__in=["ada", "linus"]).values_list("user__username", "key")
+        ))
+
+    def test_pool_output_matches_make_password(self):
+        with PasswordHasherPool(workers=2) as pool:
+            hashes = pool.hash(["first-password", "second-password", "third-password"])
+        user = User(username="x")
+        for raw, encoded in zip(["first-password", "second-password", "third-password"], hashes):
+            user.password = encoded
+            self.assertTrue(user.check_password(raw))
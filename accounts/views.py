@@ -1,4 +1,8 @@
+import codecs
+import json
+
 from django.contrib.auth import authenticate
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -7,7 +11,9 @@ from rest_framework.authtoken.models import Token
 
 from drf_spectacular.utils import extend_schema
 
-from .serializers import LoginRequestSerializer, LoginResponseSerializer
+from assessments.permissions import IsStaff
+from .provisioning import provision_students, read_students
+from .serializers import LoginRequestSerializer, LoginResponseSerializer, ProvisionStudentsSerializer
 
 
 @extend_schema(
@@ -42,3 +48,27 @@ def login_view(request):
 def logout_view(request):
     Token.objects.filter(user=request.user).delete()
     return Response({"detail": "Logged out"})
+
+
+@extend_schema(
+    request={"multipart/form-data": ProvisionStudentsSerializer},
+    responses={(200, "application/x-ndjson"): dict},
+    description=(
+        "Staff: create student accounts and their tokens from a CSV upload "
+        "(username,password[,email,first_name,last_name]). Streamed as NDJSON: one line per row, "
+        "then a summary line. Tokens are not reported."
+    ),
+)
+@api_view(["POST"])
+@permission_classes([IsStaff])
+def provision_students_view(request):
+    params = ProvisionStudentsSerializer(data=request.data)
+    params.is_valid(raise_exception=True)
+
+    lines = codecs.iterdecode(params.validated_data["file"], "utf-8-sig")
+    # hashed in this process: forking a pool from a threaded server process is unsafe
+    report = provision_students(read_students(lines), batch_size=params.validated_data["batch_size"])
+    return StreamingHttpResponse(
+        (json.dumps(entry) + "\n" for entry in report),
+        content_type="application/x-ndjson",
+    )
@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import ScoreStats
+
+@admin.register(ScoreStats)
+class ScoreStatsAdmin(admin.ModelAdmin):
+    list_display = ("id", "exam", "question", "count", "lowest", "highest", "updated_at")
+    list_select_related = ("exam", "question")
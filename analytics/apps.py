@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    name = "analytics"
+
+    def ready(self):
+        from common import metrics
+        from .services import percentile_sketches
+
+        metrics.register("analytics.percentile_sketches", percentile_sketches.stats)
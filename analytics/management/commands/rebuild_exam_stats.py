@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Exam
+from analytics.services import rebuild_exam_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute exam score statistics from the stored grades (all exams if none are given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_ids", nargs="*", type=int)
+
+    def handle(self, *args, **options):
+        exam_ids = options["exam_ids"] or list(Exam.objects.order_by("id").values_list("id", flat=True))
+        missing = set(exam_ids) - set(Exam.objects.filter(id__in=exam_ids).values_list("id", flat=True))
+        if missing:
+            raise CommandError(f"Exams not found: {sorted(missing)}")
+
+        for exam_id in exam_ids:
+            rows = rebuild_exam_stats(exam_id)
+            overall = rows[0]
+            self.stdout.write(f"Exam {exam_id}: {overall.count} graded submissions, {len(rows) - 1} questions")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {len(exam_ids)} exams"))
@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-18 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("assessments", "0005_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoreStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total", models.FloatField(default=0.0)),
+                ("total_squares", models.FloatField(default=0.0)),
+                ("lowest", models.FloatField(blank=True, null=True)),
+                ("highest", models.FloatField(blank=True, null=True)),
+                ("histogram", models.JSONField(blank=True, default=list)),
+                ("options", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="score_stats",
+                        to="assessments.exam",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="score_stats",
+                        to="assessments.question",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("exam", "question"), name="uniq_exam_question_stats"
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("question__isnull", True)),
+                        fields=("exam",),
+                        name="uniq_exam_total_stats",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scorestats",
+            name="sketch",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,53 @@
+import math
+
+from django.db import models
+
+
+class ScoreStats(models.Model):
+    """
+    Running score aggregates for one exam (question is NULL: submission totals) or one
+    question of it (awarded scores), maintained as submissions are graded. Mean and
+    spread come from count/total/total_squares, so reading them never touches answers.
+    """
+    exam = models.ForeignKey("assessments.Exam", on_delete=models.CASCADE, related_name="score_stats")
+    question = models.ForeignKey(
+        "assessments.Question", on_delete=models.CASCADE, null=True, blank=True, related_name="score_stats",
+    )
+
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+    total_squares = models.FloatField(default=0.0)
+    lowest = models.FloatField(null=True, blank=True)
+    highest = models.FloatField(null=True, blank=True)
+    # counts per tenth of the maximum score (exam: sum of max_score, question: its max_score)
+    histogram = models.JSONField(default=list, blank=True)
+    # MCQ only: selected option -> count
+    options = models.JSONField(default=dict, blank=True)
+    # exam totals only: KLLSketch.to_dict() of every score, for percentile ranks
+    sketch = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "question"], name="uniq_exam_question_stats"),
+            models.UniqueConstraint(
+                fields=["exam"], condition=models.Q(question__isnull=True), name="uniq_exam_total_stats",
+            ),
+        ]
+
+    def __str__(self):
+        target = f"q={self.question_id}" if self.question_id else "total"
+        return f"ScoreStats exam={self.exam_id} {target} n={self.count}"
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        # population standard deviation; clamped because float rounding can go slightly negative
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return math.sqrt(max(0.0, self.total_squares / self.count - mean * mean))
@@ -0,0 +1,23 @@
+from rest_framework import serializers
+
+from .models import ScoreStats
+
+
+class ScoreStatsSerializer(serializers.ModelSerializer):
+    mean = serializers.FloatField(read_only=True, allow_null=True)
+    stddev = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = ScoreStats
+        fields = ["count", "mean", "stddev", "lowest", "highest", "histogram", "updated_at"]
+
+
+class QuestionStatsSerializer(ScoreStatsSerializer):
+    class Meta(ScoreStatsSerializer.Meta):
+        fields = ["question_id", *ScoreStatsSerializer.Meta.fields, "options"]
+
+
+class ExamAnalyticsSerializer(serializers.Serializer):
+    exam_id = serializers.IntegerField()
+    submissions = ScoreStatsSerializer()
+    questions = QuestionStatsSerializer(many=True)
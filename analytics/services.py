@@ -0,0 +1,236 @@
+# Incrementally maintained score analytics. Grading code calls record_grades() in the
+# transaction that writes the grades; rebuild_exam_stats() recomputes an exam from the
+# stored grades (after a regrade, or after submissions were deleted).
+import time
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Cast, Greatest, Least
+from django.utils import timezone
+
+from assessments.models import Question
+from common.caches import LRUCache
+from grading.services import CompiledAnswerKey, GradeResult
+from submissions.models import Submission, SubmissionAnswer
+from .models import ScoreStats
+from .sketches import KLLSketch
+
+HISTOGRAM_BUCKETS = 10
+STATS_FIELDS = ["count", "total", "total_squares", "lowest", "highest", "histogram", "options", "sketch", "updated_at"]
+
+# exam_id -> (loaded at, KLLSketch or None): percentile ranks are read from a copy of the
+# exam's sketch at most ANALYTICS_PERCENTILE_REFRESH_SECONDS old, not from the database
+percentile_sketches = LRUCache(maxsize=getattr(settings, "ANALYTICS_PERCENTILE_CACHE_SIZE", 1024))
+
+
+def bucket(score: float, out_of: float) -> int:
+    if out_of <= 0:
+        return 0
+    return max(0, min(int(score * HISTOGRAM_BUCKETS / out_of), HISTOGRAM_BUCKETS - 1))
+
+
+class ScoreTally:
+    """In-memory aggregates of a batch of scores, merged into a ScoreStats row in one write."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.lowest: Optional[float] = None
+        self.highest: Optional[float] = None
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self.options = Counter()
+
+    def add(self, score: float, out_of: float, option: Optional[str] = None):
+        self.count += 1
+        self.total += score
+        self.total_squares += score * score
+        self.lowest = score if self.lowest is None else min(self.lowest, score)
+        self.highest = score if self.highest is None else max(self.highest, score)
+        self.histogram[bucket(score, out_of)] += 1
+        if option is not None:
+            self.options[option] += 1
+
+    def merge_into(self, stats: ScoreStats):
+        stats.count += self.count
+        stats.total += self.total
+        stats.total_squares += self.total_squares
+        if self.lowest is not None:
+            stats.lowest = self.lowest if stats.lowest is None else min(stats.lowest, self.lowest)
+            stats.highest = self.highest if stats.highest is None else max(stats.highest, self.highest)
+        histogram = list(stats.histogram or []) + [0] * HISTOGRAM_BUCKETS
+        stats.histogram = [a + b for a, b in zip(histogram, self.histogram)]
+        options = Counter(stats.options or {})
+        options.update(self.options)
+        stats.options = dict(options)
+
+
+def normalize_option(option: str) -> str:
+    # options are compared case-insensitively when grading; count them the same way
+    return (option or "").strip().lower()
+
+
+def record_grades(
+    answer_key: CompiledAnswerKey,
+    answers_by_submission: Dict[Hashable, Sequence],
+    results: Dict[Hashable, GradeResult],
+) -> None:
+    """
+    Adds newly graded submissions to the exam's stats. Takes the same shapes the graders
+    use: answers (anything with selected_option) per submission, aligned with the
+    per_question grades of its result. Must only see first-time grades: regrades replace
+    scores already counted, so they rebuild instead. Call inside the grading transaction,
+    after the grades are written, so concurrent updates of the same rows are serialized.
+    """
+    if not results:
+        return
+    out_of = sum(q.max_score for q in answer_key.questions.values())
+    exam_tally = ScoreTally()
+    question_tallies: Dict[int, ScoreTally] = {}
+    for key, result in results.items():
+        exam_tally.add(result.total_score, out_of)
+        for answer, g in zip(answers_by_submission[key], result.per_question):
+            q = answer_key.questions.get(g.question_id)
+            if q is None:
+                continue  # not in this exam's answer key, graded as zero
+            option = normalize_option(answer.selected_option) if q.question_type == "MCQ" else None
+            question_tallies.setdefault(g.question_id, ScoreTally()).add(g.awarded_score, q.max_score, option)
+
+    with transaction.atomic(savepoint=False):
+        rows = _locked_rows(answer_key.exam_id, question_tallies)
+        if len(rows) < len(question_tallies) + 1:
+            missing = [qid for qid in [None, *question_tallies] if qid not in rows]
+            ScoreStats.objects.bulk_create(
+                [ScoreStats(exam_id=answer_key.exam_id, question_id=qid) for qid in missing], ignore_conflicts=True,
+            )
+            rows = _locked_rows(answer_key.exam_id, question_tallies)
+
+        exam_tally.merge_into(rows[None])
+        sketch = KLLSketch.from_dict(rows[None].sketch)
+        for result in results.values():
+            sketch.add(result.total_score)
+        rows[None].sketch = sketch.to_dict()
+        for qid, tally in question_tallies.items():
+            tally.merge_into(rows[qid])
+        now = timezone.now()
+        for row in rows.values():
+            row.updated_at = now  # bulk_update does not apply auto_now
+        ScoreStats.objects.bulk_update(list(rows.values()), STATS_FIELDS)
+
+
+def _locked_rows(exam_id: int, question_ids) -> Dict[Optional[int], ScoreStats]:
+    rows = (
+        ScoreStats.objects
+        .select_for_update()
+        .filter(Q(question__isnull=True) | Q(question_id__in=list(question_ids)), exam_id=exam_id)
+    )
+    return {row.question_id: row for row in rows}
+
+
+@transaction.atomic
+def rebuild_exam_stats(exam_id: int) -> List[ScoreStats]:
+    """Recomputes an exam's stats from its GRADED submissions and replaces the stored rows."""
+    # deleting first takes the write lock, so grades recorded meanwhile wait for the rebuild
+    ScoreStats.objects.filter(exam_id=exam_id).delete()
+    graded = Submission.objects.filter(exam_id=exam_id, status=Submission.Status.GRADED)
+    out_of = float(sum(max(m, 1) for m in Question.objects.filter(exam_id=exam_id).values_list("max_score", flat=True)))
+
+    exam_row = ScoreStats(exam_id=exam_id, **_aggregates(graded, "score"))
+    exam_row.histogram = _histogram(graded, "score", Value(max(out_of, 1.0)))
+    sketch = KLLSketch()
+    for score in graded.values_list("score", flat=True).iterator(chunk_size=5000):
+        sketch.add(score)
+    exam_row.sketch = sketch.to_dict()
+
+    answers = SubmissionAnswer.objects.filter(submission__in=graded)
+    rows = {None: exam_row}
+    for values in answers.values("question_id").annotate(**_aggregates(None, "awarded_score")).order_by():
+        qid = values.pop("question_id")
+        rows[qid] = ScoreStats(exam_id=exam_id, question_id=qid, histogram=[0] * HISTOGRAM_BUCKETS, **values)
+
+    per_question = (
+        answers
+        .annotate(bucket=_bucket_expression("awarded_score", Greatest(F("question__max_score"), 1)))
+        .values_list("question_id", "bucket")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for qid, index, n in per_question:
+        rows[qid].histogram[index] = n
+
+    options = (
+        answers
+        .filter(question__question_type="MCQ")
+        .values_list("question_id", "selected_option")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for qid, option, n in options:
+        key = normalize_option(option)
+        rows[qid].options[key] = rows[qid].options.get(key, 0) + n
+
+    ScoreStats.objects.bulk_create(rows.values())
+    return list(rows.values())
+
+
+def percentile_rank(exam_id: int, score: float) -> Optional[float]:
+    """
+    Approximate percentile of `score` among the exam's graded submissions (ties count
+    half), from the exam's quantile sketch; None before anything is graded.
+    """
+    refresh = getattr(settings, "ANALYTICS_PERCENTILE_REFRESH_SECONDS", 30)
+    now = time.monotonic()
+    cached = percentile_sketches.get(exam_id)
+    if cached is None or now - cached[0] > refresh:
+        data = (
+            ScoreStats.objects
+            .filter(exam_id=exam_id, question__isnull=True)
+            .values_list("sketch", flat=True)
+            .first()
+        )
+        cached = (now, KLLSketch.from_dict(data) if data else None)
+        percentile_sketches.set(exam_id, cached)
+
+    sketch = cached[1]
+    if sketch is None or not sketch.n:
+        return None
+    return round(sketch.percentile(score), 1)
+
+
+def _aggregates(queryset, field: str) -> dict:
+    expressions = {
+        "count": Count(field),
+        "total": Sum(field),
+        "total_squares": Sum(F(field) * F(field), output_field=FloatField()),
+        "lowest": Min(field),
+        "highest": Max(field),
+    }
+    if queryset is None:
+        return expressions
+    values = queryset.aggregate(**expressions)
+    values["total"] = values["total"] or 0.0
+    values["total_squares"] = values["total_squares"] or 0.0
+    return values
+
+
+def _bucket_expression(field: str, out_of):
+    # same arithmetic as bucket(): scores are never negative, so truncation is floor
+    raw = Cast(F(field) * HISTOGRAM_BUCKETS / Cast(out_of, FloatField()), IntegerField())
+    return Least(raw, Value(HISTOGRAM_BUCKETS - 1))
+
+
+def _histogram(queryset, field: str, out_of) -> List[int]:
+    histogram = [0] * HISTOGRAM_BUCKETS
+    rows = (
+        queryset
+        .annotate(bucket=_bucket_expression(field, out_of))
+        .values_list("bucket")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for index, n in rows:
+        histogram[index] = n
+    return histogram
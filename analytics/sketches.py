@@ -0,0 +1,102 @@
+# KLL quantile sketch (Karnin, Lang & Liberty, "Optimal Quantile Approximation in
+# Streams", 2016). Keeps O(k log(n/k)) of the n values seen; any rank it reports is
+# within about 1.7/k * n of the true rank with high probability (k=200: under 1%).
+# Sketches of disjoint sets merge into a sketch of their union with the same bound.
+import math
+import random
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+DEFAULT_K = 200
+CAPACITY_DECAY = 2 / 3
+
+
+class KLLSketch:
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        # levels[h] holds values that each stand for 2**h of the values seen
+        self.levels: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.levels) - height - 1
+        return int(math.ceil(self.k * CAPACITY_DECAY ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(level) for level in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def add(self, value: float) -> None:
+        self.levels[0].append(float(value))
+        self.n += 1
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for height, level in enumerate(other.levels):
+            self.levels[height].extend(level)
+        self.n += other.n
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def _compress(self) -> None:
+        for height in range(len(self.levels)):
+            if len(self.levels[height]) < self._capacity(height):
+                continue
+            if height + 1 == len(self.levels):
+                self.levels.append([])
+            # every other value of the sorted level moves up with twice the weight; the
+            # random offset keeps the rank error unbiased. An odd one out stays behind.
+            items = sorted(self.levels[height])
+            keep = [items.pop()] if len(items) % 2 else []
+            self.levels[height + 1].extend(items[self._rng.randint(0, 1)::2])
+            self.levels[height] = keep
+            if self._size() < self._max_size():
+                break
+
+    def counts(self, value: float) -> Tuple[int, int]:
+        """Estimated number of values below `value` and equal to it."""
+        below = equal = 0
+        for height, level in enumerate(self.levels):
+            items = sorted(level)
+            lo, hi = bisect_left(items, value), bisect_right(items, value)
+            below += lo << height
+            equal += (hi - lo) << height
+        return below, equal
+
+    def percentile(self, value: float) -> Optional[float]:
+        """Percentile rank of `value`: the share of values below it, counting ties as half."""
+        if not self.n:
+            return None
+        below, equal = self.counts(value)
+        return 100.0 * (below + equal / 2) / self.n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value at rank q * n (0 <= q <= 1)."""
+        if not self.n:
+            return None
+        weighted = sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level)
+        target, seen = q * self.n, 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "n": self.n, "levels": [sorted(level) for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict], k: int = DEFAULT_K) -> "KLLSketch":
+        data = data or {}
+        # seeded from n: replaying the same stream gives the same sketch
+        sketch = cls(k=data.get("k", k), seed=data.get("n", 0))
+        sketch.n = data.get("n", 0)
+        sketch.levels = [list(level) for level in data.get("levels", [])] or [[]]
+        return sketch
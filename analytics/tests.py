@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from assessments.models import Exam, Question
+from grading.answer_keys import answer_key_cache
+from grading.memo import grading_memo
+from grading.regrade import regrade, start_or_resume_run
+from submissions.imports import import_submissions
+from .services import percentile_sketches, rebuild_exam_stats
+from .sketches import KLLSketch
+
+User = get_user_model()
+
+
+@override_settings(GRADING_ASYNC=False, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=0)
+class ExamAnalyticsTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        self.staff = APIClient()
+        self.staff.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+        self.url = f"/api/admin/exams/{self.exam.id}/analytics/"
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def answers(self, option, text):
+        return [
+            {"question_id": self.mcq.id, "selected_option": option},
+            {"question_id": self.short.id, "answer_text": text},
+        ]
+
+    def take_exam(self):
+        # one submission through each grading path
+        for name, option, text in [("ada", "B", "light energy"), ("bo", "a", "sugar")]:
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(name, password="pw"))
+            response = client.post(
+                "/api/submissions/create/", {"exam_id": self.exam.id, "answers": self.answers(option, text)}, format="json",
+            )
+            setattr(self, name, (client, response.json()["data"]["id"]))
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("cy", password="pw"))
+        pk = client.post("/api/submissions/start/", {"exam_id": self.exam.id}, format="json").json()["data"]["id"]
+        client.patch(f"/api/submissions/{pk}/autosave/", {"answers": self.answers("b", "no idea")}, format="json")
+        client.post(f"/api/submissions/{pk}/submit/")
+
+        User.objects.create_user("di", password="pw")
+        list(import_submissions(self.exam, [(1, {"student": "di", "answers": self.answers("A", "light energy sugar")})]))
+
+    def stats(self):
+        data = self.staff.get(self.url).json()["data"]
+        for row in [data["submissions"], *data["questions"]]:
+            row.pop("updated_at")
+        return data
+
+    def test_stats_follow_grading(self):
+        self.take_exam()
+
+        with self.assertNumQueries(1):
+            data = self.stats()
+
+        overall = data["submissions"]
+        self.assertEqual((overall["count"], overall["lowest"], overall["highest"]), (4, 1.0, 4.0))
+        self.assertAlmostEqual(overall["mean"], (4.0 + 1.0 + 2.0 + 3.0) / 4)
+        self.assertEqual(sum(overall["histogram"]), 4)
+        mcq = next(q for q in data["questions"] if q["question_id"] == self.mcq.id)
+        self.assertEqual(mcq["options"], {"a": 2, "b": 2})
+        self.assertEqual(mcq["histogram"], [2, 0, 0, 0, 0, 0, 0, 0, 0, 2])
+
+        rebuild_exam_stats(self.exam.id)
+        self.assertEqual(self.stats(), data)
+
+    def test_submission_percentile(self):
+        self.take_exam()
+        client, pk = self.ada
+        percentile_sketches.clear()
+
+        # 4.0 is the best of 4.0, 1.0, 2.0 and 3.0
+        self.assertEqual(client.get(f"/api/submissions/{pk}/").json()["data"]["percentile"], 87.5)
+        # the cached response still gets a current percentile
+        self.assertEqual(client.get(f"/api/submissions/{pk}/").json()["data"]["percentile"], 87.5)
+
+        rows = rebuild_exam_stats(self.exam.id)
+        self.assertEqual(KLLSketch.from_dict(rows[0].sketch).percentile(1.0), 12.5)
+
+    def test_regrade_rebuilds_stats(self):
+        self.take_exam()
+        self.mcq.expected_answer = "A"
+        self.mcq.save()
+
+        regrade(start_or_resume_run(self.exam))
+
+        data = self.stats()
+        self.assertEqual(data["submissions"]["count"], 4)
+        self.assertAlmostEqual(data["submissions"]["mean"], (2.0 + 3.0 + 0.0 + 5.0) / 4)
+
+    def test_exam_without_submissions(self):
+        data = self.stats()
+        self.assertEqual((data["submissions"]["count"], data["questions"]), (0, []))
+        self.assertEqual(self.staff.get("/api/admin/exams/0/analytics/").status_code, 404)
+
+
+class KLLSketchTests(SimpleTestCase):
+    def exact(self, values, x):
+        below = sum(v < x for v in values)
+        equal = sum(v == x for v in values)
+        return 100 * (below + equal / 2) / len(values)
+
+    def test_percentiles_within_error_bound(self):
+        values = [(i * 7919) % 10_000 / 100 for i in range(20_000)]
+        first, second = KLLSketch(seed=1), KLLSketch(seed=2)
+        for i, value in enumerate(values):
+            (first if i % 2 else second).add(value)
+        # a sketch survives being stored and merged
+        merged = KLLSketch.from_dict(first.to_dict()).merge(second)
+
+        self.assertEqual(merged.n, len(values))
+        self.assertLess(sum(len(level) for level in merged.levels), 1000)
+        for x in (0.5, 10.0, 25.0, 50.0, 75.0, 99.5):
+            self.assertAlmostEqual(merged.percentile(x), self.exact(values, x), delta=1.0)
+        self.assertAlmostEqual(merged.quantile(0.5), 50.0, delta=1.0)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ExamAnalyticsView
+
+urlpatterns = [
+    path("admin/exams/<int:exam_id>/analytics/", ExamAnalyticsView.as_view(), name="exam-analytics"),
+]
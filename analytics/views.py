@@ -0,0 +1,34 @@
+from rest_framework import generics
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+
+from assessments.models import Exam
+from assessments.permissions import IsStaff
+from .models import ScoreStats
+from .serializers import ExamAnalyticsSerializer
+
+
+class ExamAnalyticsView(generics.GenericAPIView):
+    """
+    Staff: score statistics of an exam's graded submissions (count, mean, standard
+    deviation, range, histogram) overall and per question, with MCQ option counts.
+    Served from the maintained aggregates: one query whatever the cohort size.
+    """
+    permission_classes = [IsStaff]
+    serializer_class = ExamAnalyticsSerializer
+    pagination_class = None
+
+    @extend_schema(tags=["Analytics"], responses=ExamAnalyticsSerializer)
+    def get(self, request, exam_id):
+        rows = list(ScoreStats.objects.filter(exam_id=exam_id).defer("sketch").order_by("question_id"))
+        if not rows and not Exam.objects.filter(pk=exam_id).exists():
+            raise NotFound("Exam not found.")
+
+        overall = next((row for row in rows if row.question_id is None), None) or ScoreStats(exam_id=exam_id)
+        data = ExamAnalyticsSerializer({
+            "exam_id": exam_id,
+            "submissions": overall,
+            "questions": [row for row in rows if row.question_id is not None],
+        }).data
+        return Response(data)
@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class AssessmentsConfig(AppConfig):
     name = "assessments"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from common import metrics
+        from . import signals
+        from .views import exam_detail_cache
+
+        post_migrate.connect(signals.restore_search_triggers, sender=self)
+
+        metrics.register("assessments.exam_detail", exam_detail_cache.stats)
@@ -0,0 +1,65 @@
+# Bulk exam authoring: an exam with all its questions, or a batch of question upserts for
+# an existing exam, validated in memory and written with bulk_create / bulk_update in one
+# transaction. Bulk writes send no model signals, so the exam's content_version is bumped
+# here, once per request, which also retires its cached answer key and detail payload.
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Exam, Question
+from .signals import grading_fields_changed
+
+QUESTION_FIELDS = ["question_type", "prompt", "expected_answer", "options", "max_score"]
+BULK_BATCH_SIZE = 500
+
+
+def create_exam_with_questions(exam_data: dict, questions: List[dict]) -> Tuple[Exam, List[int]]:
+    """Creates the exam and its questions; returns the exam and the question ids in input order."""
+    with transaction.atomic():
+        exam = Exam.objects.create(**exam_data)
+        created = Question.objects.bulk_create(
+            [Question(exam=exam, **{f: q[f] for f in QUESTION_FIELDS if f in q}) for q in questions],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Exam.objects.filter(pk=exam.pk).bump_content_version()
+    return exam, [q.id for q in created]
+
+
+def upsert_questions(exam: Exam, questions: List[dict], user=None) -> Dict[str, List[int]]:
+    """
+    Writes `questions` to `exam`: items with an id replace that question of the exam (the
+    ids must be questions of this exam), items without one are added. Returns
+    {"created": [...], "updated": [...]} ids in input order. Replaced questions whose
+    grading fields changed are announced with grading_fields_changed, on behalf of `user`.
+    Raises ValidationError, writing nothing, if an id is not (or no longer) in the exam.
+    """
+    with transaction.atomic():
+        wanted = [q["id"] for q in questions if q.get("id") is not None]
+        existing = Question.objects.select_for_update().filter(exam=exam).in_bulk(wanted) if wanted else {}
+        # the serializer checked the ids before the lock; one may have been deleted or moved since
+        missing = sorted(set(wanted) - set(existing))
+        if missing:
+            raise ValidationError({"questions": [f"Questions not in this exam: {missing}"]})
+
+        new, changed, regrade = [], [], []
+        for q in questions:
+            if q.get("id") is None:
+                new.append(Question(exam=exam, **{f: q[f] for f in QUESTION_FIELDS if f in q}))
+                continue
+            question = existing[q["id"]]
+            previous_key = question.grading_key()
+            for f in QUESTION_FIELDS:
+                # each item is the whole question: omitted optional fields go back to their defaults
+                setattr(question, f, q[f] if f in q else Question._meta.get_field(f).get_default())
+            changed.append(question)
+            if question.grading_key() != previous_key:
+                regrade.append(question.id)
+
+        Question.objects.bulk_create(new, batch_size=BULK_BATCH_SIZE)
+        Question.objects.bulk_update(changed, QUESTION_FIELDS, batch_size=BULK_BATCH_SIZE)
+        if new or changed:
+            Exam.objects.filter(pk=exam.pk).bump_content_version()
+        if regrade:
+            grading_fields_changed.send(sender=Question, question_ids=regrade, user=user)
+    return {"created": [q.id for q in new], "updated": [q.id for q in changed]}
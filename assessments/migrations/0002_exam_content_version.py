@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assessments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="content_version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
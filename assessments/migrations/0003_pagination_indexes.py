@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assessments", "0002_exam_content_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="exam",
+            index=models.Index(
+                fields=["created_at", "id"], name="assessments_created_11b0f4_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["created_at", "id"], name="assessments_created_6c2a1b_idx"
+            ),
+        ),
+    ]
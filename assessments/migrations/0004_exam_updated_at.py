@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-18 05:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assessments", "0003_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,4 +1,13 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class ExamQuerySet(models.QuerySet):
+    def bump_content_version(self):
+        # bulk writes skip model signals, so callers bump explicitly
+        return self.update(content_version=F("content_version") + 1, updated_at=timezone.now())
+
 
 class Exam(models.Model):
     title = models.CharField(max_length=255, db_index=True)
@@ -6,6 +15,27 @@ class Exam(models.Model):
     duration_minutes = models.PositiveIntegerField()
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # bumped whenever the exam or one of its questions changes (see signals.py)
+    content_version = models.PositiveIntegerField(default=1)
+
+    objects = ExamQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # content_version only moves forward via bump_content_version(); saving an
+        # instance loaded before a bump must not write the old number back
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != "content_version"
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # keyset pagination order (common.pagination)
+            models.Index(fields=["created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.course}: {self.title}"
@@ -26,10 +56,17 @@ class Question(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # what grading reads: editing one of these changes the grades already stored for the question
+    GRADING_FIELDS = ("question_type", "expected_answer", "max_score")
+
     class Meta:
         indexes = [
             models.Index(fields=["exam", "question_type"]),
+            models.Index(fields=["created_at", "id"]),
         ]
 
     def __str__(self):
         return f"{self.exam_id} - {self.question_type}"
+
+    def grading_key(self) -> tuple:
+        return tuple(getattr(self, f) for f in self.GRADING_FIELDS)
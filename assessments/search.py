@@ -0,0 +1,151 @@
+# Ranked full-text search over the question bank (and exam titles), backed by the FTS5
+# tables created in migration 0005. Other database backends fall back to LIKE filters.
+# SQLite drops a table's triggers whenever a migration remakes the table, so the sync
+# triggers are restored after every migrate (ensure_search_triggers).
+import re
+from typing import Dict, List
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Q
+
+from .models import Exam, Question
+
+QUESTION_FTS = "assessments_question_fts"
+EXAM_FTS = "assessments_exam_fts"
+# exam search ranks exams by their questions among the top limit * this many question hits
+QUESTION_HITS_PER_EXAM = 20
+
+# (content table, FTS5 table, indexed columns)
+FTS_TABLES = [
+    ("assessments_question", QUESTION_FTS, ["prompt", "expected_answer"]),
+    ("assessments_exam", EXAM_FTS, ["title", "course"]),
+]
+TRIGGER_SUFFIXES = ("ai", "ad", "au")
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+")
+
+
+def fts_query(text: str) -> str:
+    """
+    Turns user input into a safe FTS5 expression: bare words must all match, "quoted
+    text" matches as a phrase, and a trailing * makes a word a prefix (cell* -> cellular).
+    Any other FTS5 syntax in the input is treated as plain text.
+    """
+    parts = []
+    for phrase, word in _TERM.findall(text or ""):
+        tokens = _WORD.findall(phrase if phrase else word)
+        if not tokens:
+            continue
+        prefix = bool(word) and word.endswith("*")
+        parts.append('"' + " ".join(tokens) + '"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+def _trigger_sql(table: str, fts: str, columns: List[str]) -> List[str]:
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def ensure_search_triggers(using: str = DEFAULT_DB_ALIAS) -> List[str]:
+    """
+    Recreates the FTS5 sync triggers a table remake dropped and rebuilds those indexes,
+    since writes made without the triggers were not indexed. Does nothing before migration
+    0005 or off SQLite. Returns the FTS tables rebuilt.
+    """
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return []
+    rebuilt = []
+    with transaction.atomic(using=using), conn.cursor() as cursor:
+        tables = set(conn.introspection.table_names(cursor))
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+        for table, fts, columns in FTS_TABLES:
+            if fts not in tables or {f"{fts}_{suffix}" for suffix in TRIGGER_SUFFIXES} <= triggers:
+                continue
+            for statement in _trigger_sql(table, fts, columns):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            rebuilt.append(fts)
+    return rebuilt
+
+
+def _uses_fts() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def _ranked(sql: str, params) -> Dict[int, float]:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def search_question_ids(text: str, limit: int = 50) -> List[int]:
+    """Question ids matching `text`, best first (prompt weighs twice the expected answer)."""
+    query = fts_query(text)
+    if not query:
+        return []
+    if not _uses_fts():
+        return list(_like(Question.objects.all(), ["prompt", "expected_answer"], text).order_by("-id").values_list("id", flat=True)[:limit])
+    ranks = _ranked(
+        f"SELECT rowid, bm25({QUESTION_FTS}, 2.0, 1.0) FROM {QUESTION_FTS} "
+        f"WHERE {QUESTION_FTS} MATCH %s ORDER BY bm25({QUESTION_FTS}, 2.0, 1.0) LIMIT %s",
+        [query, limit],
+    )
+    return list(ranks)
+
+
+def search_exam_ids(text: str, limit: int = 50) -> List[int]:
+    """
+    Exam ids whose title/course or any question matches `text`, best first. A title
+    match counts double; an exam's question score is that of its best question.
+    """
+    query = fts_query(text)
+    if not query:
+        return []
+    if not _uses_fts():
+        exams = _like(Exam.objects.all(), ["title", "course"], text) | Exam.objects.filter(
+            id__in=_like(Question.objects.all(), ["prompt", "expected_answer"], text).values("exam_id")
+        )
+        return list(exams.order_by("-id").values_list("id", flat=True)[:limit])
+
+    by_title = _ranked(
+        f"SELECT rowid, bm25({EXAM_FTS}) FROM {EXAM_FTS} "
+        f"WHERE {EXAM_FTS} MATCH %s ORDER BY bm25({EXAM_FTS}) LIMIT %s",
+        [query, limit],
+    )
+    # bm25() cannot be aggregated directly, so the best questions are ranked first (capped,
+    # which keeps common words cheap) and grouped by exam afterwards
+    by_question = _ranked(
+        f"WITH hits AS MATERIALIZED ("
+        f"SELECT rowid AS id, bm25({QUESTION_FTS}, 2.0, 1.0) AS rank FROM {QUESTION_FTS} "
+        f"WHERE {QUESTION_FTS} MATCH %s ORDER BY rank LIMIT %s) "
+        f"SELECT q.exam_id, MIN(hits.rank) FROM hits JOIN assessments_question q ON q.id = hits.id "
+        f"GROUP BY q.exam_id ORDER BY 2 LIMIT %s",
+        [query, limit * QUESTION_HITS_PER_EXAM, limit],
+    )
+    # bm25 scores are negative, lower is better
+    scores = dict(by_question)
+    for exam_id, rank in by_title.items():
+        scores[exam_id] = min(scores.get(exam_id, 0.0), rank * 2)
+    return sorted(scores, key=scores.get)[:limit]
+
+
+def _like(queryset, fields, text):
+    for token in _WORD.findall(text):
+        match = Q()
+        for field in fields:
+            match |= Q(**{f"{field}__icontains": token})
+        queryset = queryset.filter(match)
+    return queryset
@@ -27,3 +27,52 @@ class QuestionCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = ["exam", "question_type", "prompt", "expected_answer", "options", "max_score"]
+
+    def validate_exam(self, exam):
+        # answers belong to the old exam's submissions; moving the question would orphan them
+        if self.instance is not None and exam.pk != self.instance.exam_id and self.instance.submission_answers.exists():
+            raise serializers.ValidationError("Cannot move a question that already has answers to another exam")
+        return exam
+
+
+class BulkQuestionSerializer(serializers.ModelSerializer):
+    # no exam field: the exam is the one in the URL (or the one being created)
+    id = serializers.IntegerField(required=False, help_text="Upserts: the question to replace. Omit to add a question.")
+
+    class Meta:
+        model = Question
+        fields = ["id", "question_type", "prompt", "expected_answer", "options", "max_score"]
+
+class ExamBulkCreateSerializer(ExamCreateUpdateSerializer):
+    questions = BulkQuestionSerializer(many=True, max_length=1000)
+
+    class Meta(ExamCreateUpdateSerializer.Meta):
+        fields = ExamCreateUpdateSerializer.Meta.fields + ["questions"]
+
+    def validate_questions(self, questions):
+        if any("id" in q for q in questions):
+            raise serializers.ValidationError("New questions cannot have an id")
+        return questions
+
+class QuestionUpsertSerializer(serializers.Serializer):
+    questions = BulkQuestionSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_questions(self, questions):
+        ids = [q["id"] for q in questions if "id" in q]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Duplicate id in questions payload")
+        if ids:
+            found = set(Question.objects.filter(exam=self.context["exam"], pk__in=ids).values_list("pk", flat=True))
+            missing = sorted(set(ids) - found)
+            if missing:
+                raise serializers.ValidationError(f"Questions not in this exam: {missing}")
+        return questions
+
+class ExamBulkCreateResponseSerializer(serializers.Serializer):
+    exam_id = serializers.IntegerField()
+    question_ids = serializers.ListField(child=serializers.IntegerField())
+
+class QuestionUpsertResponseSerializer(serializers.Serializer):
+    exam_id = serializers.IntegerField()
+    created = serializers.ListField(child=serializers.IntegerField())
+    updated = serializers.ListField(child=serializers.IntegerField())
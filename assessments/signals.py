@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Exam, Question
+from .search import ensure_search_triggers
+
+# sent by the question endpoints when questions' GRADING_FIELDS were edited, with
+# question_ids and user; the grading app rescores the answers already graded against them
+grading_fields_changed = Signal()
+
+
+@receiver(post_save, sender=Exam)
+def bump_exam_version_on_save(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    Exam.objects.filter(pk=instance.pk).bump_content_version()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_exam_version_on_question_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Exam.objects.filter(pk=instance.exam_id).bump_content_version()
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    # connected in AssessmentsConfig.ready for this app only; a migration that remade the
+    # question or exam table (any AlterField on SQLite) dropped the FTS5 triggers with it
+    ensure_search_triggers(using)
@@ -1,3 +1,244 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from common.caches import SingleFlightCache
+from .models import Exam, Question
+from .serializers import QuestionUpsertSerializer
+
+User = get_user_model()
+
+
+class QuestionSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="staff", password="pass", is_staff=True))
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.membrane = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Describe the cell membrane",
+            expected_answer="phospholipid bilayer", max_score=5,
+        )
+        self.wall = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="What is a cell wall made of?",
+            expected_answer="cellulose", max_score=5,
+        )
+
+    def search(self, q, url="/api/admin/questions/"):
+        response = self.client.get(url, {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()["data"]["results"]]
+
+    def test_words_phrases_and_prefixes(self):
+        self.assertEqual(self.search("cell membrane"), [self.membrane.id])
+        self.assertEqual(self.search('"wall made"'), [self.wall.id])
+        self.assertEqual(set(self.search("cell*")), {self.membrane.id, self.wall.id})
+        self.assertEqual(self.search("phospho*"), [self.membrane.id])
+        self.assertEqual(self.search("cellulose", url="/api/admin/exams/"), [self.exam.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.membrane.prompt = "Describe the mitochondria"
+        self.membrane.save()
+        self.assertEqual(self.search("mitochondria"), [self.membrane.id])
+        self.assertEqual(self.search("membrane"), [])
+
+        self.wall.delete()
+        self.assertEqual(self.search("cellulose"), [])
+
+    def test_migrate_restores_triggers_a_table_remake_dropped(self):
+        # what SQLite does to the triggers when a migration remakes assessments_question
+        with connection.cursor() as cursor:
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER assessments_question_fts_{suffix}")
+        self.membrane.prompt = "Describe the mitochondria"
+        self.membrane.save()
+        self.assertEqual(self.search("mitochondria"), [])
+
+        emit_post_migrate_signal(0, False, "default")
+
+        self.assertEqual(self.search("mitochondria"), [self.membrane.id])
+        self.wall.prompt = "What is a chloroplast?"
+        self.wall.save()
+        self.assertEqual(self.search("chloroplast"), [self.wall.id])
+
+    def test_search_is_staff_only(self):
+        student = APIClient()
+        student.force_authenticate(User.objects.create_user(username="student", password="pass"))
+        self.assertEqual(student.get("/api/admin/questions/", {"q": "cell"}).status_code, 403)
+
+
+class ExamDetailCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="student", password="pass"))
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.question = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Describe the cell membrane",
+            expected_answer="phospholipid bilayer", max_score=5,
+        )
+        self.url = f"/api/exams/{self.exam.id}/"
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_revalidation_gets_a_304_without_rendering(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(1):
+            by_etag = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        by_date = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+
+        self.assertEqual((by_etag.status_code, by_date.status_code), (304, 304))
+        self.assertEqual(by_etag.content, b"")
+        self.assertEqual(by_etag["ETag"], first["ETag"])
+
+    def test_payload_is_served_from_cache_until_the_exam_changes(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            again = self.client.get(self.url)
+        self.assertEqual(again.content, first.content)
+
+        self.question.prompt = "Describe the cell wall"
+        self.question.save()
+        edited = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(edited.status_code, 200)
+        self.assertNotEqual(edited["ETag"], first["ETag"])
+        self.assertEqual(edited.json()["data"]["questions"][0]["prompt"], "Describe the cell wall")
+
+    def test_missing_exam_is_not_found(self):
+        self.assertEqual(self.client.get("/api/exams/999/").status_code, 404)
+
+
+class SingleFlightCacheTests(TestCase):
+    def setUp(self):
+        self.flight = SingleFlightCache("single-flight-test", wait=1.0, poll=0.01)
+        self.key = self.flight.key("exam", 1)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_concurrent_miss_waits_for_the_builder(self):
+        cache.add(f"{self.key}:building", 1)  # another request is building
+        threading.Timer(0.05, cache.set, args=(self.key, b"built elsewhere")).start()
+        build = mock.Mock(return_value=b"built here")
+
+        self.assertEqual(self.flight.get_or_build(self.key, build), b"built elsewhere")
+        build.assert_not_called()
+        self.assertEqual((self.flight.stats()["waits"], self.flight.stats()["builds"]), (1, 0))
+
+    def test_builds_once_then_serves_the_cached_value(self):
+        build = mock.Mock(return_value=b"payload")
+
+        for _ in range(3):
+            self.assertEqual(self.flight.get_or_build(self.key, build), b"payload")
+
+        build.assert_called_once()
+        self.assertIsNone(cache.get(f"{self.key}:building"))
+
+    def test_stuck_builder_is_bypassed_after_the_wait(self):
+        flight = SingleFlightCache("single-flight-test", wait=0.05, poll=0.01)
+        cache.add(f"{self.key}:building", 1)
+
+        self.assertEqual(flight.get_or_build(self.key, lambda: b"built here"), b"built here")
+
+
+class BulkAuthoringTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="staff", password="pass", is_staff=True))
+
+    def tearDown(self):
+        cache.clear()
+
+    def question(self, n, **extra):
+        return {"question_type": "SHORT", "prompt": f"Question {n}", "expected_answer": f"answer {n}", "max_score": 2, **extra}
+
+    def test_exam_with_questions_in_one_request(self):
+        payload = {
+            "title": "Chemistry", "course": "CHM101", "duration_minutes": 60,
+            "questions": [self.question(n) for n in range(200)] + [
+                {"question_type": "MCQ", "prompt": "Pick B", "expected_answer": "B", "options": ["A", "B"]},
+            ],
+        }
+        # savepoint, exam, questions (two inserts: SQLite caps the variables per statement), version bump, release
+        with self.assertNumQueries(6):
+            response = self.client.post("/api/admin/exams/bulk/", payload, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()["data"]
+        exam = Exam.objects.get(pk=data["exam_id"])
+        self.assertEqual(exam.content_version, 2)
+        self.assertEqual(list(exam.questions.order_by("id").values_list("id", flat=True)), data["question_ids"])
+        self.assertEqual(Question.objects.get(pk=data["question_ids"][-1]).options, ["A", "B"])
+
+    def test_invalid_question_writes_nothing(self):
+        payload = {"title": "Chemistry", "course": "CHM101", "duration_minutes": 60, "questions": [self.question(1), {"prompt": "no type"}]}
+        response = self.client.post("/api/admin/exams/bulk/", payload, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Exam.objects.exists())
+
+    def test_upsert_replaces_and_adds_questions(self):
+        exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        kept = Question.objects.create(exam=exam, question_type="SHORT", prompt="Describe the cell", max_score=5)
+        edited = Question.objects.create(exam=exam, question_type="SHORT", prompt="Old prompt", max_score=5)
+        self.assertEqual(self.client.get(f"/api/exams/{exam.id}/").status_code, 200)  # cache the detail
+        version = Exam.objects.get(pk=exam.pk).content_version
+
+        response = self.client.post(f"/api/admin/exams/{exam.id}/questions/", {"questions": [
+            self.question("new"), self.question("edited", id=edited.id, max_score=3),
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["updated"], [edited.id])
+        self.assertEqual(len(data["created"]), 1)
+        self.assertEqual(Exam.objects.get(pk=exam.pk).content_version, version + 1)
+        prompts = {q["id"]: q["prompt"] for q in self.client.get(f"/api/exams/{exam.id}/").json()["data"]["questions"]}
+        self.assertEqual(prompts, {kept.id: "Describe the cell", edited.id: "Question edited", data["created"][0]: "Question new"})
+        edited.refresh_from_db()
+        self.assertEqual((edited.max_score, edited.expected_answer), (3, "answer edited"))
+
+    def test_upsert_rejects_other_exams_questions(self):
+        exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        other = Exam.objects.create(title="Physics", course="PHY101", duration_minutes=30)
+        foreign = Question.objects.create(exam=other, question_type="SHORT", prompt="Foreign", max_score=1)
+
+        for questions in ([self.question(1, id=foreign.id)], [self.question(1), self.question(1, id=foreign.id), self.question(2, id=foreign.id)]):
+            response = self.client.post(f"/api/admin/exams/{exam.id}/questions/", {"questions": questions}, format="json")
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(exam.questions.count(), 0)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.prompt, "Foreign")
+
+    def test_upsert_of_a_question_deleted_after_validation_writes_nothing(self):
+        exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        doomed = Question.objects.create(exam=exam, question_type="SHORT", prompt="Doomed", max_score=1)
+        validate = QuestionUpsertSerializer.validate_questions
+
+        def validate_then_delete(serializer, questions):
+            questions = validate(serializer, questions)
+            Question.objects.filter(pk=doomed.pk).delete()  # a concurrent request
+            return questions
+
+        with mock.patch.object(QuestionUpsertSerializer, "validate_questions", validate_then_delete):
+            response = self.client.post(f"/api/admin/exams/{exam.id}/questions/", {"questions": [
+                self.question("new"), self.question("edited", id=doomed.id),
+            ]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["data"], {"questions": [f"Questions not in this exam: [{doomed.id}]"]})
+        self.assertEqual(exam.questions.count(), 0)
 
-# Create your tests here.
+    def test_bulk_authoring_is_staff_only(self):
+        student = APIClient()
+        student.force_authenticate(User.objects.create_user(username="student", password="pass"))
+        response = student.post("/api/admin/exams/bulk/", {"title": "T", "course": "C", "duration_minutes": 1, "questions": []}, format="json")
+        self.assertEqual(response.status_code, 403)
@@ -1,11 +1,51 @@
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import generics
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+
+from common.caches import SingleFlightCache
+from common.renderers import PreRendered, encode
 from .models import Exam
 from .serializers import ExamListSerializer, ExamDetailSerializer
 
+# encoded exam detail payloads, keyed by exam id and content_version
+exam_detail_cache = SingleFlightCache("exam-detail-payload", timeout=getattr(settings, "EXAM_DETAIL_CACHE_SECONDS", 300))
+
+
 class ExamListView(generics.ListAPIView):
-    queryset = Exam.objects.all().order_by("-created_at")
+    queryset = Exam.objects.all()
+    ordering = ("-created_at", "-id")
     serializer_class = ExamListSerializer
 
 class ExamDetailView(generics.RetrieveAPIView):
+    """
+    Served from a cache of encoded payload bytes keyed by (exam, content_version), so an edit
+    to the exam or its questions makes the next request rebuild it. The version is also
+    the ETag: clients revalidating with If-None-Match/If-Modified-Since get a 304.
+    """
     queryset = Exam.objects.prefetch_related("questions").all()
     serializer_class = ExamDetailSerializer
+
+    @extend_schema(responses=ExamDetailSerializer)
+    def get(self, request, pk):
+        row = Exam.objects.filter(pk=pk).values_list("content_version", "updated_at").first()
+        if row is None:
+            raise NotFound("No Exam matches the given query.")
+        version, updated_at = row
+
+        etag = f'"exam-{pk}-v{version}"'
+        last_modified = int(updated_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            payload = exam_detail_cache.get_or_build(
+                exam_detail_cache.key(pk, version),
+                lambda: encode(ExamDetailSerializer(self.get_object()).data),
+            )
+            response = Response(PreRendered(payload))
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = "private, no-cache"
+        return response
@@ -1,49 +1,111 @@
-from rest_framework import viewsets
-from drf_spectacular.utils import extend_schema_view, extend_schema
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 
+from .authoring import create_exam_with_questions, upsert_questions
 from .models import Exam, Question
+from .search import search_exam_ids, search_question_ids
+from .signals import grading_fields_changed
 from .serializers import (
     ExamListSerializer, ExamDetailSerializer,
     ExamCreateUpdateSerializer,
-    QuestionSerializer, QuestionCreateUpdateSerializer
+    QuestionSerializer, QuestionCreateUpdateSerializer,
+    ExamBulkCreateSerializer, ExamBulkCreateResponseSerializer,
+    QuestionUpsertSerializer, QuestionUpsertResponseSerializer,
 )
 from .permissions import IsStaff
 
+SEARCH_PARAMETER = OpenApiParameter(
+    "q", str,
+    description='Staff: ranked full-text search. Words must all match; "quoted words" match as a phrase; word* matches as a prefix.',
+)
+
+
+class RankedSearchMixin:
+    """
+    `?q=` on list returns the best matches in rank order (up to page_size) instead of
+    keyset pages. Staff only: question search also looks at expected answers.
+    """
+    search_ids = None
+
+    def list(self, request, *args, **kwargs):
+        text = request.query_params.get("q")
+        if text is None:
+            return super().list(request, *args, **kwargs)
+        if not request.user.is_staff:
+            raise PermissionDenied("Search is available to staff only.")
+
+        ids = type(self).search_ids(text, self.paginator.get_page_size(request))
+        objects = self.get_queryset().in_bulk(ids)
+        results = [objects[pk] for pk in ids if pk in objects]
+        return Response({"next": None, "previous": None, "results": self.get_serializer(results, many=True).data})
+
+
 @extend_schema_view(
-    list=extend_schema(tags=["Assessments"], responses=ExamListSerializer(many=True)),
+    list=extend_schema(tags=["Assessments"], responses=ExamListSerializer(many=True), parameters=[SEARCH_PARAMETER]),
     retrieve=extend_schema(tags=["Assessments"], responses=ExamDetailSerializer),
     create=extend_schema(tags=["Assessments"], request=ExamCreateUpdateSerializer, responses=ExamDetailSerializer),
     update=extend_schema(tags=["Assessments"], request=ExamCreateUpdateSerializer, responses=ExamDetailSerializer),
     partial_update=extend_schema(tags=["Assessments"], request=ExamCreateUpdateSerializer, responses=ExamDetailSerializer),
     destroy=extend_schema(tags=["Assessments"]),
+    bulk_create=extend_schema(tags=["Assessments"], request=ExamBulkCreateSerializer, responses={201: ExamBulkCreateResponseSerializer}),
+    upsert_questions=extend_schema(tags=["Assessments"], request=QuestionUpsertSerializer, responses=QuestionUpsertResponseSerializer),
 )
-class ExamViewSet(viewsets.ModelViewSet):
-    queryset = Exam.objects.all().order_by("-created_at")
+class ExamViewSet(RankedSearchMixin, viewsets.ModelViewSet):
+    queryset = Exam.objects.all()
+    ordering = ("-created_at", "-id")
+    search_ids = staticmethod(search_exam_ids)
 
     def get_serializer_class(self):
         if self.action == "list":
             return ExamListSerializer
         if self.action == "retrieve":
             return ExamDetailSerializer
+        if self.action == "bulk_create":
+            return ExamBulkCreateSerializer
+        if self.action == "upsert_questions":
+            return QuestionUpsertSerializer
         return ExamCreateUpdateSerializer
 
     def get_permissions(self):
         # students can read exams; only staff can write
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action in ["create", "update", "partial_update", "destroy", "bulk_create", "upsert_questions"]:
             return [IsStaff()]
         return super().get_permissions()
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        """An exam with all its questions in one request and one transaction."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        questions = serializer.validated_data.pop("questions")
+        exam, question_ids = create_exam_with_questions(serializer.validated_data, questions)
+        return Response({"exam_id": exam.id, "question_ids": question_ids}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["post"], url_path="questions")
+    def upsert_questions(self, request, pk=None):
+        """Adds questions to an exam and replaces existing ones (by id), in one transaction."""
+        exam = self.get_object()
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), "exam": exam})
+        serializer.is_valid(raise_exception=True)
+        ids = upsert_questions(exam, serializer.validated_data["questions"], user=request.user)
+        return Response({"exam_id": exam.id, **ids})
+
 
 @extend_schema_view(
-    list=extend_schema(tags=["Assessments"], responses=QuestionSerializer(many=True)),
+    list=extend_schema(tags=["Assessments"], responses=QuestionSerializer(many=True), parameters=[SEARCH_PARAMETER]),
     retrieve=extend_schema(tags=["Assessments"], responses=QuestionSerializer),
     create=extend_schema(tags=["Assessments"], request=QuestionCreateUpdateSerializer, responses=QuestionSerializer),
     update=extend_schema(tags=["Assessments"], request=QuestionCreateUpdateSerializer, responses=QuestionSerializer),
     partial_update=extend_schema(tags=["Assessments"], request=QuestionCreateUpdateSerializer, responses=QuestionSerializer),
     destroy=extend_schema(tags=["Assessments"]),
 )
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(RankedSearchMixin, viewsets.ModelViewSet):
     queryset = Question.objects.select_related("exam").all()
+    ordering = ("created_at", "id")
+    search_ids = staticmethod(search_question_ids)
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -54,3 +116,13 @@ class QuestionViewSet(viewsets.ModelViewSet):
         if self.action in ["create", "update", "partial_update", "destroy"]:
             return [IsStaff()]
         return super().get_permissions()
+
+    def perform_update(self, serializer):
+        previous_exam_id = serializer.instance.exam_id
+        previous_key = serializer.instance.grading_key()
+        question = serializer.save()
+        # signals only see the new exam; the exam the question left changed too
+        if question.exam_id != previous_exam_id:
+            Exam.objects.filter(pk=previous_exam_id).bump_content_version()
+        if question.grading_key() != previous_key:
+            grading_fields_changed.send(sender=Question, question_ids=[question.id], user=self.request.user)
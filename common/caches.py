@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process cache bounded by entry count.
+    The least recently used entry is evicted when maxsize is exceeded.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = max(1, int(maxsize))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SingleFlightCache:
+    """
+    Values built on demand and stored in Django's cache (shared between processes when
+    CACHES points at a shared backend). Concurrent misses for one key collapse into a
+    single build: the first caller takes a short lock with cache.add(), the others wait
+    for its result instead of building the same value again.
+    """
+
+    def __init__(self, prefix: str, timeout: int = 300, wait: float = 5.0, poll: float = 0.02):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.wait = wait
+        self.poll = poll
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.waits = 0
+
+    def key(self, *parts) -> str:
+        return ":".join([self.prefix, *map(str, parts)])
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        from django.core.cache import cache
+
+        value = cache.get(key)
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def get_or_build(self, key, build):
+        from django.core.cache import cache
+
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f"{key}:building"
+        deadline = time.monotonic() + self.wait
+        waited = False
+        while True:
+            if cache.add(lock_key, 1, timeout=max(1, int(self.wait))):
+                try:
+                    value = build()
+                    cache.set(key, value, timeout=self.timeout)
+                    self._count("builds")
+                    return value
+                finally:
+                    cache.delete(lock_key)
+
+            # another request is building it
+            if not waited:
+                self._count("waits")
+                waited = True
+            time.sleep(self.poll)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if time.monotonic() >= deadline:
+                # the builder is stuck or died: serve this request without the cache
+                self._count("builds")
+                return build()
+
+    def set(self, key, value):
+        from django.core.cache import cache
+
+        cache.set(key, value, timeout=self.timeout)
+
+    def delete(self, key):
+        from django.core.cache import cache
+
+        cache.delete(key)
+
+    def delete_many(self, keys):
+        from django.core.cache import cache
+
+        cache.delete_many(list(keys))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "builds": self.builds,
+                "waits": self.waits,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,13 @@
+# Process-local counters (cache sizes, hit rates) exposed to staff at /api/admin/metrics/.
+# Each worker process reports its own numbers.
+from typing import Callable, Dict
+
+_sources: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, stats: Callable[[], dict]):
+    _sources[name] = stats
+
+
+def snapshot() -> dict:
+    return {name: stats() for name, stats in sorted(_sources.items())}
@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Sequence
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a multi-column ordering such as ("-submitted_at", "-id").
+
+    The cursor holds the ordering values of the first/last row of the current page, and
+    the next page is fetched with WHERE (a, id) < (last_a, last_id) instead of OFFSET, so
+    every page costs one index range scan no matter how deep it is. The last ordering
+    field must be unique (normally "id"). Only the first field may be nullable; its
+    NULLs sort last.
+
+    Views set `ordering`; clients pass `cursor` and optionally `page_size`.
+    """
+
+    ordering: Sequence[str] = ("-created_at", "-id")
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.fields = list(getattr(view, "ordering", None) or self.ordering)
+        self.size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        model_fields = queryset.model._meta
+
+        self.columns = []
+        for i, spec in enumerate(self.fields):
+            name = spec.lstrip("-")
+            nullable = model_fields.get_field(name).null
+            if nullable and i > 0:
+                raise ImproperlyConfigured(f"Only the first ordering field may be nullable, not {name!r}")
+            self.columns.append((name, spec.startswith("-"), nullable))
+
+        reverse = bool(cursor and cursor["r"])
+        queryset = queryset.order_by(*self._order_by(reverse))
+        segments = [Q()] if cursor is None else self._segments(cursor["v"], before=reverse)
+
+        # each segment is one index range scan; a page only spills into the second
+        # segment where it crosses from non-NULL to NULL values of the first field
+        rows = []
+        try:
+            for q in segments:
+                rows += queryset.filter(q)[:self.size + 1 - len(rows)]
+                if len(rows) > self.size:
+                    break
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        has_more = len(rows) > self.size
+        rows = rows[:self.size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        # going backwards, "more" means more rows before; rows after the cursor always exist
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        return rows
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # --- keyset predicates -------------------------------------------------
+
+    def _order_by(self, reverse: bool) -> List:
+        order = []
+        for name, desc, nullable in self.columns:
+            # going backwards is the exact mirror of the forward order, NULLs included
+            nulls = ({"nulls_first": True} if reverse else {"nulls_last": True}) if nullable else {}
+            order.append(F(name).desc(**nulls) if desc != reverse else F(name).asc(**nulls))
+        return order
+
+    def _seek(self, columns, values, before: bool) -> Q:
+        """(a, b, id) strictly after (or, going back, before) the given non-NULL values."""
+        q = None
+        for (name, desc, _), value in reversed(list(zip(columns, values))):
+            beyond = "lt" if desc != before else "gt"
+            if q is None:
+                q = Q(**{f"{name}__{beyond}": value})
+                continue
+            # a <= v AND (a < v OR (a = v AND rest)) lets the database range-scan the index on a
+            bound = "lte" if beyond == "lt" else "gte"
+            q = Q(**{f"{name}__{bound}": value}) & (Q(**{f"{name}__{beyond}": value}) | (Q(**{name: value}) & q))
+        return q
+
+    def _segments(self, values, before: bool) -> List[Q]:
+        """Filters for the rows past the cursor, in fetch order. NULLs sort after all values."""
+        name, _, nullable = self.columns[0]
+        if values[0] is not None:
+            after = [self._seek(self.columns, values, before)]
+            if nullable and not before:
+                after.append(Q(**{f"{name}__isnull": True}))
+            return after
+        rest = self._seek(self.columns[1:], values[1:], before)
+        if not before:
+            return [Q(**{f"{name}__isnull": True}) & rest]
+        return [Q(**{f"{name}__isnull": True}) & rest, Q(**{f"{name}__isnull": False})]
+
+    # --- cursors -----------------------------------------------------------
+
+    def _position(self, row) -> list:
+        values = []
+        for name, _, _ in self.columns:
+            value = getattr(row, name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return values
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        payload = json.dumps({"v": self._position(row), "r": int(reverse)}, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request) -> Optional[dict]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            values, reverse = payload["v"], payload["r"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return {"v": values, "r": bool(reverse)}
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
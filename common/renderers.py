@@ -1,5 +1,78 @@
+import json
+from typing import Iterable, Iterator
+
+from rest_framework.utils import encoders
 from rest_framework.renderers import JSONRenderer
 
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+if orjson is not None:
+    # datetimes go through DRF's encoder so their format matches the stdlib path
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+else:
+    ORJSON_OPTIONS = 0
+
+SUCCESS_PREFIX = b'{"status":true,"message":"Success","data":'
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+class PreRendered(bytes):
+    """
+    JSON bytes encoded earlier (for example by a response cache). Views return
+    Response(PreRendered(payload)) and the renderer splices the bytes into the envelope
+    as they are, without decoding and re-encoding them.
+    """
+
+
+def encode(data, indent=None) -> bytes:
+    """
+    JSON bytes of `data`, equivalent to what JSONRenderer would produce. Uses orjson when
+    it is installed and the output settings allow (compact, UTF-8), otherwise the stdlib.
+    The bytes can differ: orjson spells some floats differently (1e16, not 1e+16) and
+    writes NaN/Infinity as null where the stdlib encoder would refuse them.
+    """
+    if isinstance(data, PreRendered):
+        return bytes(data)
+    if orjson is not None and indent is None and JSONRenderer.compact and not JSONRenderer.ensure_ascii:
+        try:
+            body = orjson.dumps(data, default=_drf_encoder.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers over 64 bits or lone surrogates: let the stdlib decide
+            pass
+        else:
+            if b"\xe2\x80\xa8" in body or b"\xe2\x80\xa9" in body:
+                body = body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+            return body
+    return _stdlib_encode(data, indent)
+
+
+def _stdlib_encode(data, indent=None) -> bytes:
+    if indent is not None:
+        separators = (",", ": ")
+    elif JSONRenderer.compact:
+        separators = (",", ":")
+    else:
+        separators = (", ", ": ")
+    ret = json.dumps(
+        data, cls=encoders.JSONEncoder, indent=indent, ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not JSONRenderer.strict, separators=separators,
+    )
+    # same strict javascript subset escaping as JSONRenderer
+    return ret.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+def envelope(payload: bytes, ok: bool = True, message: str = "Success") -> bytes:
+    """Wraps already encoded `data` bytes in the response envelope by concatenation."""
+    if ok and message == "Success":
+        prefix = SUCCESS_PREFIX
+    else:
+        prefix = b'{"status":' + (b"true" if ok else b"false") + b',"message":' + encode(message) + b',"data":'
+    return prefix + payload + b"}"
+
 
 class EnvelopeJSONRenderer(JSONRenderer):
     """
@@ -9,30 +82,29 @@ class EnvelopeJSONRenderer(JSONRenderer):
       "message": "...",
       "data": ...
     }
+
+    Only `data` is encoded; the envelope around it is constant bytes. PreRendered data
+    is spliced in without being encoded again.
     """
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
         renderer_context = renderer_context or {}
         response = renderer_context.get("response")
+        indent = self.get_indent(accepted_media_type, renderer_context)
 
         # If no response context, fallback
         if response is None:
-            return super().render(data, accepted_media_type, renderer_context)
+            return b"" if data is None else encode(data, indent)
 
         # If it's already wrapped, do nothing
-        if isinstance(data, dict) and {"status", "message", "data"}.issubset(data.keys()):
-            return super().render(data, accepted_media_type, renderer_context)
+        if isinstance(data, dict) and "status" in data and "message" in data and "data" in data:
+            return encode(data, indent)
 
         status_code = getattr(response, "status_code", 200)
         ok = 200 <= status_code < 400
 
         if ok:
-            payload = {
-                "status": True,
-                "message": "Success",
-                "data": data,
-            }
-            return super().render(payload, accepted_media_type, renderer_context)
+            return self._envelope(data, True, "Success", indent)
 
         # Error wrapping
         message = "Request failed"
@@ -47,9 +119,36 @@ class EnvelopeJSONRenderer(JSONRenderer):
             else:
                 message = "Validation error"
 
-        payload = {
-            "status": False,
-            "message": message,
-            "data": data,
-        }
-        return super().render(payload, accepted_media_type, renderer_context)
+        return self._envelope(data, False, message, indent)
+
+    def _envelope(self, data, ok, message, indent):
+        if indent is not None and not isinstance(data, PreRendered):
+            # pretty printing (browsable API, "; indent=" media types): indent the envelope too
+            return encode({"status": ok, "message": message, "data": data}, indent)
+        return envelope(encode(data), ok, message)
+
+
+def with_fields(payload: bytes, **fields) -> bytes:
+    """
+    Appends fields to an encoded JSON object without decoding it: for cached payloads
+    whose few volatile fields are filled in per request.
+    """
+    extra = b"".join(b"," + encode(name) + b":" + encode(value) for name, value in fields.items())
+    return payload[:-1] + extra + payload[-1:]
+
+
+def stream_list(chunks: Iterable[list]) -> Iterator[bytes]:
+    """
+    A success envelope whose data is a JSON array, yielded piece by piece: the envelope
+    opening first, then each chunk of items as soon as it is encoded. Joined, the pieces
+    are what the renderer would produce for the whole list.
+    """
+    yield SUCCESS_PREFIX + b"["
+    separator = b""
+    for items in chunks:
+        if not items:
+            continue
+        # encode(list) is "[...]"; keep the items and join chunks with commas
+        yield separator + encode(items)[1:-1]
+        separator = b","
+    yield b"]}"
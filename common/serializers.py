@@ -0,0 +1,11 @@
+class SparseFieldsMixin:
+    """
+    Serializer mixin: pass fields=[...] to keep only those fields (e.g. from ?fields=).
+    Unknown names are ignored here; views validate them against `fields` first.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from common import renderers
+from common.renderers import EnvelopeJSONRenderer, PreRendered, encode, with_fields
+
+
+class EnvelopeJSONRendererTests(SimpleTestCase):
+    data = {
+        "id": 7,
+        "score": 6.5,
+        "when": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        "amount": Decimal("1.10"),
+        "text": "café\u2028line",
+        "answers": [{"question_id": 1, "feedback": None}],
+    }
+
+    def render(self, data, status=200, media_type=None):
+        return EnvelopeJSONRenderer().render(data, media_type, {"response": Response(status=status)})
+
+    def test_fast_encoder_matches_stdlib(self):
+        fast = self.render(self.data)
+        with mock.patch.object(renderers, "orjson", None):
+            slow = self.render(self.data)
+        stdlib = JSONRenderer().render({"status": True, "message": "Success", "data": self.data})
+
+        self.assertEqual(fast, slow)
+        self.assertEqual(fast, stdlib)
+
+    @skipIf(renderers.orjson is None, "orjson is not installed")
+    def test_floats_decode_the_same_with_either_encoder(self):
+        data = {"scores": [0.1, 6.5, 1e16, 1.5e-7, 12345678.9, -0.0, 2.0 ** 60]}
+        fast = self.render(data)
+        with mock.patch.object(renderers, "orjson", None):
+            slow = self.render(data)
+
+        self.assertEqual(json.loads(fast), json.loads(slow))
+        self.assertIn(b"1e16", fast)  # not the stdlib's 1e+16: equivalent, not identical
+        self.assertIn(b"1e+16", slow)
+
+    def test_pre_rendered_payload_is_spliced(self):
+        payload = PreRendered(with_fields(encode({"id": 7}), percentile=87.5))
+
+        self.assertEqual(self.render(payload), b'{"status":true,"message":"Success","data":{"id":7,"percentile":87.5}}')
+
+    def test_errors_and_indent(self):
+        error = json.loads(self.render({"detail": "Not found."}, status=404))
+        self.assertEqual(error, {"status": False, "message": "Not found.", "data": {"detail": "Not found."}})
+
+        pretty = self.render({"id": 7}, media_type="application/json; indent=2")
+        self.assertEqual(json.loads(pretty), {"status": True, "message": "Success", "data": {"id": 7}})
+        self.assertIn(b'\n  "data"', pretty)
@@ -0,0 +1,14 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+
+from assessments.permissions import IsStaff
+from . import metrics
+
+
+class MetricsView(APIView):
+    permission_classes = [IsStaff]
+
+    @extend_schema(tags=["Metrics"], responses={200: dict}, description="Cache statistics of the worker process serving the request.")
+    def get(self, request):
+        return Response(metrics.snapshot())
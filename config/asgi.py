@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+
+# compile answer keys for active exams before the first submission arrives
+from grading.answer_keys import warm_on_startup  # noqa: E402
+
+warm_on_startup()
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     "assessments",
     "submissions",
     "grading",
+    "analytics",
 
 ]
 
@@ -60,7 +61,7 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -68,6 +69,8 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
+    # keyset pagination: views set `ordering`; ?page_size= is capped at max_page_size
+    "DEFAULT_PAGINATION_CLASS": "common.pagination.KeysetCursorPagination",
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_RENDERER_CLASSES": [
         "common.renderers.EnvelopeJSONRenderer",
@@ -76,6 +79,32 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Accounts
+ACCOUNTS_TOKEN_CACHE_SECONDS = 60  # longest a revoked token or deactivated user keeps working in another process
+ACCOUNTS_TOKEN_CACHE_SIZE = 10_000  # authenticated tokens cached per process
+
+# Assessments
+EXAM_DETAIL_CACHE_SECONDS = 300  # rendered exam detail payloads; edits change the key, so this only bounds memory
+
+# Grading
+GRADING_ANSWER_KEY_CACHE_SIZE = 256  # compiled answer keys kept per worker process
+GRADING_MEMO_SIZE = 50_000  # memoized (question, answer key version, answer) grades per worker process
+GRADING_ACTIVE_EXAM_WINDOW_HOURS = 24  # exams warmed into the cache at worker start
+GRADING_REGRADE_REQUEST_SECONDS = 10  # time slice one regrade API call may spend grading
+GRADING_ASYNC = False  # True: submissions are queued and graded by `manage.py grading_worker`
+GRADING_JOB_TIMEOUT_SECONDS = 300  # RUNNING jobs older than this are handed to another worker
+GRADING_JOB_MAX_ATTEMPTS = 3
+
+# Analytics
+ANALYTICS_PERCENTILE_REFRESH_SECONDS = 30  # how stale a process's copy of an exam's score sketch may get
+ANALYTICS_PERCENTILE_CACHE_SIZE = 1024  # exam score sketches kept per process
+
+# Submissions
+SUBMISSION_AUTOSAVE_FLUSH_SECONDS = 5  # autosaved drafts are written in batches this often; 0 writes through
+SUBMISSION_AUTOSAVE_DRAFT_CACHE_SIZE = 10_000  # in-progress submissions whose owner is cached per process
+SUBMISSION_IDEMPOTENCY_TTL_SECONDS = 24 * 3600  # how long a stored Idempotency-Key response is replayed
+SUBMISSION_DETAIL_CACHE_SECONDS = 24 * 3600  # rendered GRADED submission responses; regrades invalidate them
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Acad AI Mini Assessment Engine",
     "DESCRIPTION": "Backend API for exams, submissions, and mock grading.",
@@ -161,3 +190,9 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = "static/"
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
+
+# what every migration of this project was generated with
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -4,6 +4,9 @@ from django.urls import path, include
 from rest_framework.permissions import AllowAny
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from accounts.views import provision_students_view
+from common.views import MetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
 
@@ -13,4 +16,8 @@ urlpatterns = [
     path("api/auth/", include("accounts.urls")),
     path("api/", include("assessments.urls")),
     path("api/", include("submissions.urls")),
+    path("api/", include("grading.urls")),
+    path("api/", include("analytics.urls")),
+    path("api/admin/students/provision/", provision_students_view, name="provision-students"),
+    path("api/admin/metrics/", MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,24 @@
+from django.contrib import admin
+from .models import DeltaRegradeJob, GradingJob, RegradeRun, ScoreAdjustment
+
+@admin.register(RegradeRun)
+class RegradeRunAdmin(admin.ModelAdmin):
+    list_display = ("id", "exam", "status", "processed_submissions", "total_submissions", "started_at", "finished_at")
+    list_filter = ("status",)
+
+@admin.register(GradingJob)
+class GradingJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "submission", "status", "attempts", "claimed_by", "created_at", "finished_at")
+    list_filter = ("status",)
+
+@admin.register(DeltaRegradeJob)
+class DeltaRegradeJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "question", "status", "attempts", "rewritten_answers", "claimed_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    raw_id_fields = ("question", "changed_by")
+
+@admin.register(ScoreAdjustment)
+class ScoreAdjustmentAdmin(admin.ModelAdmin):
+    list_display = ("id", "submission", "question", "old_score", "new_score", "old_total", "new_total", "changed_by", "created_at")
+    list_filter = ("question__exam",)
+    raw_id_fields = ("submission", "question", "changed_by")
@@ -0,0 +1,86 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from common.caches import LRUCache
+from .services import CompiledAnswerKey, CompiledQuestion
+
+logger = logging.getLogger(__name__)
+
+answer_key_cache = LRUCache(maxsize=getattr(settings, "GRADING_ANSWER_KEY_CACHE_SIZE", 256))
+
+
+def compile_answer_key(exam_id: int, version: int = None) -> CompiledAnswerKey:
+    from assessments.models import Exam, Question
+
+    # read the version before the questions: a concurrent edit then leaves us
+    # with an older version number, which the next lookup simply recompiles
+    if version is None:
+        version = Exam.objects.filter(pk=exam_id).values_list("content_version", flat=True).first() or 0
+
+    rows = (
+        Question.objects
+        .filter(exam_id=exam_id)
+        .values_list("id", "question_type", "expected_answer", "max_score")
+    )
+    questions = {row[0]: CompiledQuestion.compile(*row) for row in rows}
+    return CompiledAnswerKey(exam_id=exam_id, version=version, questions=questions)
+
+
+def get_answer_key(exam_id: int, version: int = None) -> CompiledAnswerKey:
+    """
+    Returns the compiled answer key for an exam, compiling it on a cache miss.
+    Pass the exam's content_version when it is already loaded to skip the version lookup.
+    """
+    if version is None:
+        from assessments.models import Exam
+
+        version = Exam.objects.filter(pk=exam_id).values_list("content_version", flat=True).first() or 0
+
+    key = answer_key_cache.get(exam_id)
+    if key is not None and key.version == version:
+        return key
+
+    key = compile_answer_key(exam_id, version)
+    answer_key_cache.set(exam_id, key)
+    return key
+
+
+def invalidate_answer_key(exam_id: int):
+    answer_key_cache.pop(exam_id)
+
+
+def warm_answer_key_cache(limit: int = None) -> int:
+    """
+    Compiles answer keys for active exams: created recently or with recent submissions.
+    """
+    from assessments.models import Exam
+
+    limit = limit or answer_key_cache.maxsize
+    cutoff = timezone.now() - timedelta(hours=getattr(settings, "GRADING_ACTIVE_EXAM_WINDOW_HOURS", 24))
+    exams = (
+        Exam.objects
+        .filter(Q(created_at__gte=cutoff) | Q(submissions__started_at__gte=cutoff))
+        .order_by("-created_at")
+        .values_list("id", "content_version")
+        .distinct()[:limit]
+    )
+    warmed = 0
+    for exam_id, version in exams:
+        answer_key_cache.set(exam_id, compile_answer_key(exam_id, version))
+        warmed += 1
+    return warmed
+
+
+def warm_on_startup():
+    # never let a cold or unmigrated database stop a worker from booting
+    try:
+        warmed = warm_answer_key_cache()
+    except DatabaseError:
+        logger.warning("Skipped answer key warm-up: database not ready", exc_info=True)
+        return
+    logger.info("Warmed %s answer keys", warmed)
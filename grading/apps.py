@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class GradingConfig(AppConfig):
+    name = "grading"
+
+    def ready(self):
+        from common import metrics
+        from . import signals  # noqa: F401
+        from .answer_keys import answer_key_cache
+        from .memo import grading_memo
+
+        metrics.register("grading.answer_keys", answer_key_cache.stats)
+        metrics.register("grading.memo", grading_memo.stats)
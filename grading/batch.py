@@ -0,0 +1,143 @@
+# Batch grading engine: grades many submissions of one exam in a single call.
+# With NumPy installed, MCQ answers are compared as integer arrays and keyword overlap
+# is computed as a sparse (answer x vocabulary) product against the expected-token
+# matrix. Without NumPy it falls back to the scalar grader. Both paths produce results
+# identical to CompiledAnswerKey.grade.
+from typing import Dict, List, Sequence
+
+from .services import (
+    NOT_IN_ANSWER_KEY, CompiledAnswerKey, GradeResult, QuestionGrade, stored_token_hashes, token_hash, tokenize,
+)
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+NO_EXPECTED_ANSWER = "No expected answer configured"
+
+
+class BatchGrader:
+    """
+    Precomputes per-question arrays for one answer key; grade() can then be called
+    repeatedly with chunks of answer rows (objects exposing question_id, answer_text
+    and selected_option, grouped by submission id).
+    """
+
+    def __init__(self, answer_key: CompiledAnswerKey):
+        self.answer_key = answer_key
+        questions = list(answer_key.questions.values())
+        self.q_index = {q.question_id: i for i, q in enumerate(questions)}
+        self.questions = questions
+        self.max_score = [q.max_score for q in questions]
+
+        # MCQ: each distinct expected choice gets a positive code; a chosen option that is
+        # no question's key encodes to -1 and a question without a key to 0, so neither matches
+        self.choice_codes: Dict[str, int] = {}
+        for q in questions:
+            if q.question_type == "MCQ" and q.expected_choice:
+                self.choice_codes.setdefault(q.expected_choice, len(self.choice_codes) + 1)
+        self.expected_choice = [self.choice_codes.get(q.expected_choice, 0) for q in questions]
+
+        # keywords: one vocabulary over all expected tokens of the exam, keyed by token hash
+        # so stored answer fingerprints map straight to vocabulary ids
+        self.vocab: Dict[int, int] = {}
+        for q in questions:
+            if q.question_type != "MCQ":
+                for h in sorted(q.expected_hashes):
+                    self.vocab.setdefault(h, len(self.vocab))
+        self.expected_count = [len(q.expected_tokens) for q in questions]
+
+        # scores and feedback depend only on (question, overlap): build them once with the
+        # scalar grader's own arithmetic so floats come out bit-for-bit identical
+        self.score_table: List[List[float]] = []
+        self.feedback_table: List[List[str]] = []
+        for q, n in zip(questions, self.expected_count):
+            self.score_table.append([round(q.max_score * (k / max(1, n)), 2) for k in range(n + 1)])
+            self.feedback_table.append([f"Keyword overlap: {k}/{n}" for k in range(n + 1)])
+
+        if np is not None:
+            self._np_expected_choice = np.asarray(self.expected_choice, dtype=np.int64)
+            self._np_max_score = np.asarray(self.max_score, dtype=np.float64)
+            matrix = np.zeros((len(questions), max(1, len(self.vocab))), dtype=np.int64)
+            for i, q in enumerate(questions):
+                if q.question_type != "MCQ":
+                    for h in q.expected_hashes:
+                        matrix[i, self.vocab[h]] = 1
+            self._np_expected_matrix = matrix
+
+    def grade(self, rows_by_submission: Dict[int, Sequence]) -> Dict[int, GradeResult]:
+        if np is None:
+            return {sid: self.answer_key.grade(rows) for sid, rows in rows_by_submission.items()}
+
+        flat = [row for rows in rows_by_submission.values() for row in rows]
+        n = len(flat)
+        # a question missing from the answer key gets index -1 and is neither MCQ nor text
+        q_index = self.q_index
+        q_idx = np.fromiter((q_index.get(row.question_id, -1) for row in flat), dtype=np.int64, count=n)
+        known = q_idx >= 0
+        is_mcq = np.fromiter(
+            (i >= 0 and self.questions[i].question_type == "MCQ" for i in q_idx.tolist()), dtype=bool, count=n,
+        )
+
+        awarded = np.zeros(n, dtype=np.float64)
+        overlap = np.zeros(n, dtype=np.int64)
+
+        mcq_rows = np.flatnonzero(is_mcq)
+        if mcq_rows.size:
+            codes = self.choice_codes
+            chosen = np.fromiter(
+                (codes.get((flat[i].selected_option or "").strip().lower(), -1) for i in mcq_rows.tolist()),
+                dtype=np.int64, count=mcq_rows.size,
+            )
+            expected = self._np_expected_choice[q_idx[mcq_rows]]
+            correct = (chosen == expected) & (chosen > 0)
+            awarded[mcq_rows] = np.where(correct, self._np_max_score[q_idx[mcq_rows]], 0.0)
+
+        text_rows = np.flatnonzero(~is_mcq & known)
+        if text_rows.size:
+            # sparse answer x vocabulary matrix in COO form: (row, vocab id) per distinct known token
+            entry_rows, entry_cols = [], []
+            vocab = self.vocab
+            for i in text_rows.tolist():
+                hashes = stored_token_hashes(flat[i])
+                if hashes is None:
+                    hashes = {token_hash(t) for t in tokenize(flat[i].answer_text)}
+                ids = {vocab[h] for h in hashes if h in vocab}
+                entry_rows.extend([i] * len(ids))
+                entry_cols.extend(ids)
+            if entry_rows:
+                rows_arr = np.asarray(entry_rows, dtype=np.int64)
+                cols_arr = np.asarray(entry_cols, dtype=np.int64)
+                # (A @ E.T)[row, question(row)] without materializing either product operand
+                hits = self._np_expected_matrix[q_idx[rows_arr], cols_arr]
+                overlap = np.bincount(rows_arr, weights=hits, minlength=n).astype(np.int64)
+
+        awarded_list = awarded.tolist()
+        overlap_list = overlap.tolist()
+        q_list = q_idx.tolist()
+        mcq_list = is_mcq.tolist()
+
+        results: Dict[int, GradeResult] = {}
+        pos = 0
+        for sid, rows in rows_by_submission.items():
+            per_q: List[QuestionGrade] = []
+            total = 0.0
+            for row in rows:
+                qi = q_list[pos]
+                if qi < 0:
+                    score, feedback = 0.0, NOT_IN_ANSWER_KEY
+                elif mcq_list[pos]:
+                    score = awarded_list[pos]
+                    feedback = "Correct" if score > 0 else "Incorrect"
+                elif not self.expected_count[qi]:
+                    score, feedback = 0.0, NO_EXPECTED_ANSWER
+                else:
+                    k = overlap_list[pos]
+                    score, feedback = self.score_table[qi][k], self.feedback_table[qi][k]
+                total += score
+                per_q.append(QuestionGrade(question_id=row.question_id, awarded_score=score, feedback=feedback))
+                pos += 1
+            results[sid] = GradeResult(total_score=round(total, 2), per_question=per_q)
+        return results
+
@@ -0,0 +1,285 @@
+# Grading micro-benchmarks on synthetic exams. Driven by `manage.py benchmark_grading`;
+# results are plain dicts so runs can be saved as JSON and compared.
+import math
+import platform
+import random
+import statistics
+import string
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List
+
+from .batch import BatchGrader, np
+from .bulk import AnswerRow
+from .memo import GradingMemo
+from .services import (
+    TOKENIZER_VERSION, CompiledAnswerKey, CompiledQuestion, MockGradingService, fingerprint, tokenize,
+)
+
+
+@dataclass
+class SyntheticExamSpec:
+    questions: int = 40
+    mcq_ratio: float = 0.6
+    short_ratio: float = 0.3  # the rest are ESSAY
+    students: int = 500
+    short_words: int = 15  # mean answer length, in words
+    essay_words: int = 400
+    length_dist: str = "lognormal"  # fixed | uniform | lognormal
+    expected_words: int = 8  # keywords in SHORT/ESSAY expected answers
+    options: int = 4
+    vocabulary: int = 5000
+    seed: int = 42
+
+
+@dataclass
+class SyntheticQuestion:
+    id: int
+    question_type: str
+    prompt: str
+    expected_answer: str
+    options: list
+    max_score: int
+
+
+class SyntheticExam:
+    def __init__(self, spec: SyntheticExamSpec):
+        self.spec = spec
+        rng = random.Random(spec.seed)
+        self.rng = rng
+        self.words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(spec.vocabulary)]
+
+        self.questions: List[SyntheticQuestion] = []
+        for qid in range(1, spec.questions + 1):
+            roll = rng.random()
+            if roll < spec.mcq_ratio:
+                options = [f"option {i}" for i in range(spec.options)]
+                self.questions.append(SyntheticQuestion(qid, "MCQ", f"Question {qid}?", rng.choice(options), options, 1))
+            else:
+                qtype = "SHORT" if roll < spec.mcq_ratio + spec.short_ratio else "ESSAY"
+                expected = " ".join(rng.sample(self.words, spec.expected_words))
+                self.questions.append(SyntheticQuestion(qid, qtype, f"Explain topic {qid}.", expected, [], 5 if qtype == "SHORT" else 10))
+
+    def answer_key(self, version: int = 1) -> CompiledAnswerKey:
+        return CompiledAnswerKey(exam_id=0, version=version, questions={
+            q.id: CompiledQuestion.compile(q.id, q.question_type, q.expected_answer, q.max_score)
+            for q in self.questions
+        })
+
+    def _length(self, mean: int) -> int:
+        dist = self.spec.length_dist
+        if dist == "fixed":
+            return mean
+        if dist == "uniform":
+            return self.rng.randint(1, 2 * mean)
+        return max(1, int(self.rng.lognormvariate(0, 0.5) * mean))
+
+    def answer(self, q: SyntheticQuestion) -> dict:
+        if q.question_type == "MCQ":
+            # most students agree on a few options, like real cohorts
+            choice = q.expected_answer if self.rng.random() < 0.6 else self.rng.choice(q.options)
+            return {"question_id": q.id, "selected_option": choice}
+        n = self._length(self.spec.short_words if q.question_type == "SHORT" else self.spec.essay_words)
+        keywords = q.expected_answer.split()
+        words = [self.rng.choice(keywords) if self.rng.random() < 0.1 else self.rng.choice(self.words) for _ in range(n)]
+        return {"question_id": q.id, "answer_text": " ".join(words)}
+
+    def submissions(self) -> List[List[dict]]:
+        return [[self.answer(q) for q in self.questions] for _ in range(self.spec.students)]
+
+
+def rows_for(answers: List[dict], submission_id: int) -> List[AnswerRow]:
+    # the shape submissions are stored in: SHORT/ESSAY answers carry their fingerprint
+    rows = []
+    for i, a in enumerate(answers):
+        text = a.get("answer_text", "")
+        rows.append(AnswerRow(
+            id=i,
+            submission_id=submission_id,
+            question_id=a["question_id"],
+            answer_text=text,
+            selected_option=a.get("selected_option", ""),
+            token_fingerprint=fingerprint(text) if text else b"",
+            token_version=TOKENIZER_VERSION if text else 0,
+        ))
+    return rows
+
+
+class _InMemorySubmission:
+    # just enough of Submission for MockGradingService.grade
+    def __init__(self, rows):
+        self._rows = rows
+        self.answers = self
+
+    def all(self):
+        return self._rows
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(per_submission_seconds: List[float], answers: int) -> dict:
+    total = sum(per_submission_seconds)
+    ordered = sorted(per_submission_seconds)
+    return {
+        "submissions": len(ordered),
+        "answers": answers,
+        "seconds": round(total, 6),
+        "answers_per_sec": round(answers / total, 1) if total else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4) if ordered else 0.0,
+    }
+
+
+def time_each(items, fn: Callable) -> List[float]:
+    timings = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_tokenize(exam: SyntheticExam, submissions: List[List[dict]]) -> dict:
+    texts = [[a["answer_text"] for a in answers if "answer_text" in a] for answers in submissions]
+    timings = time_each(texts, lambda batch: [tokenize(t) for t in batch])
+    return summarize(timings, sum(len(t) for t in texts))
+
+
+def bench_grade(exam: SyntheticExam, submissions: List[List[dict]]) -> dict:
+    answer_key = exam.answer_key()
+    grader = MockGradingService(memo=GradingMemo(maxsize=50_000))
+    fakes = [_InMemorySubmission(rows_for(answers, i)) for i, answers in enumerate(submissions)]
+    timings = time_each(fakes, lambda sub: grader.grade(sub, answer_key=answer_key))
+    result = summarize(timings, sum(len(a) for a in submissions))
+    result["memo"] = grader.memo.stats()
+    return result
+
+
+def bench_batch(exam: SyntheticExam, submissions: List[List[dict]], chunk_size: int = 500) -> dict:
+    grader = BatchGrader(exam.answer_key())
+    rows = {i: rows_for(answers, i) for i, answers in enumerate(submissions)}
+    items = list(rows.items())
+    chunks = [dict(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+    timings = time_each(chunks, grader.grade)
+    # report per submission so numbers line up with the scalar grader
+    per_submission = [t / len(chunk) for t, chunk in zip(timings, chunks) for _ in chunk]
+    result = summarize(per_submission, sum(len(a) for a in submissions))
+    result["numpy"] = np is not None
+    return result
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Points the default connection at a freshly migrated test database (and the cache at a
+    private local-memory one) for the block, then drops it. Nothing the benchmark writes
+    reaches the configured database, and production traffic never waits on its locks.
+    """
+    from django.db import connection
+    from django.test import override_settings
+
+    from analytics.services import percentile_sketches
+    from .answer_keys import answer_key_cache
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "grading-benchmark",
+        }}):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        # in-process caches are keyed by ids of the dropped database
+        answer_key_cache.clear()
+        percentile_sketches.clear()
+
+
+def bench_submission_create(exam: SyntheticExam, submissions: List[List[dict]]) -> dict:
+    """
+    POSTs every synthetic submission through SubmissionCreateView (validation, inserts,
+    grading, response) against a throwaway database, each request committing as it would
+    in production.
+    """
+    from django.contrib.auth import get_user_model
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from assessments.models import Exam, Question
+    from submissions.views import SubmissionCreateView
+
+    User = get_user_model()
+    factory = APIRequestFactory()
+    view = SubmissionCreateView.as_view()
+    timings = []
+
+    with throwaway_database(), override_settings(GRADING_ASYNC=False):
+        db_exam = Exam.objects.create(title="Benchmark", course="BENCH", duration_minutes=60)
+        id_map = {}
+        for q in exam.questions:
+            obj = Question.objects.create(
+                exam=db_exam, question_type=q.question_type, prompt=q.prompt,
+                expected_answer=q.expected_answer, options=q.options, max_score=q.max_score,
+            )
+            id_map[q.id] = obj.id
+        users = User.objects.bulk_create([User(username=f"bench-{db_exam.id}-{i}") for i in range(len(submissions))])
+
+        for user, answers in zip(users, submissions):
+            payload = {"exam_id": db_exam.id, "answers": [{**a, "question_id": id_map[a["question_id"]]} for a in answers]}
+            request = factory.post("/api/submissions/create/", payload, format="json")
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                raise RuntimeError(f"Benchmark submission failed: {response.status_code} {response.content[:200]!r}")
+
+    return summarize(timings, sum(len(a) for a in submissions))
+
+
+STAGES: Dict[str, Callable] = {
+    "tokenize": bench_tokenize,
+    "grade": bench_grade,
+    "batch_grade": bench_batch,
+    "submission_create": bench_submission_create,
+}
+
+
+def run_benchmarks(spec: SyntheticExamSpec, stages: List[str]) -> dict:
+    exam = SyntheticExam(spec)
+    submissions = exam.submissions()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np is not None,
+            "tokenizer_version": TOKENIZER_VERSION,
+            "spec": asdict(spec),
+        },
+        "results": {stage: STAGES[stage](exam, submissions) for stage in stages},
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond tolerance (0.1 = 10%) in throughput or p50/p99 latency."""
+    problems = []
+    for stage, now in current["results"].items():
+        before = baseline.get("results", {}).get(stage)
+        if not before:
+            continue
+        if before["answers_per_sec"] and now["answers_per_sec"] < before["answers_per_sec"] * (1 - tolerance):
+            problems.append(f"{stage}: answers/sec {now['answers_per_sec']} < baseline {before['answers_per_sec']}")
+        for key in ("p50_ms", "p99_ms"):
+            if before[key] and now[key] > before[key] * (1 + tolerance):
+                problems.append(f"{stage}: {key} {now[key]} > baseline {before[key]}")
+    return problems
@@ -0,0 +1,131 @@
+# Chunked grading shared by regrades and background grading: stream answer rows,
+# grade them (optionally across a process pool) and write results back in bulk.
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple
+
+from django.db import connections
+from django.db.models import Case, F, TextField, Value, When
+
+from submissions.caches import invalidate_graded_submissions
+from submissions.models import Submission, SubmissionAnswer
+from .batch import BatchGrader
+from .services import TOKENIZER_VERSION, CompiledAnswerKey, GradeResult, letter_grade
+
+BULK_UPDATE_BATCH_SIZE = 500
+
+
+class AnswerRow(NamedTuple):
+    id: int
+    submission_id: int
+    question_id: int
+    answer_text: str
+    selected_option: str
+    token_fingerprint: bytes
+    token_version: int
+
+
+def load_answer_rows(submission_ids) -> Dict[int, List[AnswerRow]]:
+    rows_by_submission: Dict[int, List[AnswerRow]] = {sid: [] for sid in submission_ids}
+    rows = (
+        SubmissionAnswer.objects
+        .filter(submission_id__in=submission_ids)
+        .order_by("submission_id", "id")
+        # answers with a current fingerprint are graded from it; don't read their essays
+        .annotate(text=Case(
+            When(token_version=TOKENIZER_VERSION, then=Value("")),
+            default=F("answer_text"),
+            output_field=TextField(),
+        ))
+        .values_list(
+            "id", "submission_id", "question_id", "text", "selected_option", "token_fingerprint", "token_version",
+        )
+    )
+    for row in rows:
+        rows_by_submission[row[1]].append(AnswerRow(*row))
+    return rows_by_submission
+
+
+def grade_rows(answer_key: CompiledAnswerKey, rows_by_submission: Dict[int, List[AnswerRow]]) -> Dict[int, GradeResult]:
+    return BatchGrader(answer_key).grade(rows_by_submission)
+
+
+# process pool plumbing: the answer key is shipped once per worker, not once per task
+_worker_grader = None
+
+
+def _init_worker(answer_key):
+    global _worker_grader
+    _worker_grader = BatchGrader(answer_key)
+
+
+def _grade_slice(items):
+    return _worker_grader.grade(dict(items))
+
+
+class PoolGrader:
+    """
+    Grades chunks of answer rows for one answer key, in-process when workers <= 1,
+    otherwise spread over a process pool. Use as a context manager.
+    """
+
+    def __init__(self, answer_key: CompiledAnswerKey, workers: int = 1):
+        self.answer_key = answer_key
+        self.workers = max(1, int(workers or 1))
+        self._grader = BatchGrader(answer_key)
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            # forked workers must not share the parent's database connections
+            connections.close_all()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.answer_key,),
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def grade(self, rows_by_submission: Dict[int, List[AnswerRow]]) -> Dict[int, GradeResult]:
+        if self._pool is None or len(rows_by_submission) < 2:
+            return self._grader.grade(rows_by_submission)
+
+        items = list(rows_by_submission.items())
+        step = -(-len(items) // self.workers)
+        slices = [items[i:i + step] for i in range(0, len(items), step)]
+
+        results: Dict[int, GradeResult] = {}
+        for part in self._pool.map(_grade_slice, slices):
+            results.update(part)
+        return results
+
+
+def write_grades(rows_by_submission: Dict[int, List[AnswerRow]], results: Dict[int, GradeResult], graded_at) -> int:
+    """
+    Writes per-answer scores/feedback and submission totals with chunked bulk_update.
+    Returns the number of answers written. Call inside a transaction.
+    """
+    answers = []
+    submissions = []
+    for sid, rows in rows_by_submission.items():
+        result = results[sid]
+        for row, g in zip(rows, result.per_question):
+            answers.append(SubmissionAnswer(id=row.id, awarded_score=g.awarded_score, feedback=g.feedback))
+        submissions.append(Submission(
+            id=sid,
+            score=result.total_score,
+            grade_letter=letter_grade(result.total_score),
+            graded_at=graded_at,
+            status=Submission.Status.GRADED,
+        ))
+
+    SubmissionAnswer.objects.bulk_update(answers, ["awarded_score", "feedback"], batch_size=BULK_UPDATE_BATCH_SIZE)
+    Submission.objects.bulk_update(
+        submissions, ["score", "grade_letter", "graded_at", "status"], batch_size=BULK_UPDATE_BATCH_SIZE
+    )
+    invalidate_graded_submissions(rows_by_submission)
+    return len(answers)
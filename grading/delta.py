@@ -0,0 +1,178 @@
+# Delta regrade after a question's answer key is edited. Only the stored answers to that
+# question are rescored; each submission's total moves by the difference instead of being
+# recomputed from all its answers, and every changed score is kept as a ScoreAdjustment.
+# Edits queue a DeltaRegradeJob that the grading worker runs, outside the edit's request.
+from collections import defaultdict
+from typing import Iterable, List
+
+from django.db import transaction
+from django.db.models import Case, F, TextField, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from analytics.services import rebuild_exam_stats
+from assessments.models import Question
+from submissions.caches import invalidate_graded_submissions
+from submissions.models import Submission, SubmissionAnswer
+from .models import DeltaRegradeJob, ScoreAdjustment
+from .services import TOKENIZER_VERSION, CompiledQuestion, letter_grade, unpack_fingerprint
+
+CHUNK_SIZE = 1000
+AUDIT_BATCH_SIZE = 500
+
+
+def enqueue_delta_regrades(question_ids: Iterable[int], changed_by=None) -> List[DeltaRegradeJob]:
+    """
+    Queues a delta regrade of each question for the grading worker. Call inside the
+    transaction that saved the edit, so a rolled back edit queues nothing. A question whose
+    job is still waiting keeps that job (it reads the key when it starts), now on behalf of
+    `changed_by`. Returns the jobs created.
+    """
+    question_ids = list(dict.fromkeys(question_ids))
+    waiting = DeltaRegradeJob.objects.filter(question_id__in=question_ids, status=DeltaRegradeJob.Status.QUEUED)
+    waiting.update(changed_by=changed_by)
+    queued = set(waiting.values_list("question_id", flat=True))
+    return DeltaRegradeJob.objects.bulk_create([
+        DeltaRegradeJob(question_id=question_id, changed_by=changed_by)
+        for question_id in question_ids if question_id not in queued
+    ])
+
+
+def regrade_questions(
+    question_ids: Iterable[int], chunk_size: int = CHUNK_SIZE, changed_by=None, worker_id: str = "inline",
+) -> int:
+    """
+    Delta regrades the questions in this process rather than through the queue, each as a
+    DeltaRegradeJob claimed by `worker_id` (so one that dies part way is resumed by the
+    grading worker). Returns the number of answers rewritten.
+    """
+    now = timezone.now()
+    jobs = DeltaRegradeJob.objects.bulk_create([
+        DeltaRegradeJob(
+            question_id=question_id, changed_by=changed_by, status=DeltaRegradeJob.Status.RUNNING,
+            attempts=1, claimed_by=worker_id, claimed_at=now,
+        )
+        for question_id in dict.fromkeys(question_ids)
+    ])
+    return sum(run_delta_job(job, chunk_size=chunk_size).rewritten_answers for job in jobs)
+
+
+def run_delta_job(job: DeltaRegradeJob, chunk_size: int = CHUNK_SIZE) -> DeltaRegradeJob:
+    """
+    Rescores the answers of GRADED submissions to the job's question, chunk by chunk in
+    answer id order from the job's resume point. Each chunk commits together with the
+    job's progress, so an interrupted job continues where it stopped. Answers whose grade
+    already matches the key are not written. Once every chunk is done, the analytics of
+    the exams whose totals moved are rebuilt and the job is marked DONE.
+    """
+    row = (
+        Question.objects
+        .filter(pk=job.question_id)
+        .values_list("exam__content_version", "question_type", "expected_answer", "max_score")
+        .first()
+    )
+    if row is not None:
+        version, question_type, expected_answer, max_score = row
+        question = CompiledQuestion.compile(job.question_id, question_type, expected_answer, max_score)
+    # else the question was deleted and its answers with it: there is nothing left to rescore
+
+    answers = (
+        SubmissionAnswer.objects
+        .filter(question_id=job.question_id, submission__status=Submission.Status.GRADED)
+        .order_by("id")
+        # answers with a current fingerprint are graded from it; don't read their essays
+        .annotate(text=Case(
+            When(token_version=TOKENIZER_VERSION, then=Value("")),
+            default=F("answer_text"),
+            output_field=TextField(),
+        ))
+    )
+    while True:
+        with transaction.atomic():
+            rows = list(
+                answers
+                .filter(id__gt=job.last_answer_id)
+                .select_for_update(of=("self",))
+                .values_list(
+                    "id", "submission_id", "text", "selected_option", "token_fingerprint", "token_version",
+                    "awarded_score", "feedback",
+                )[:chunk_size]
+            )
+            if not rows:
+                # adjusted totals replace scores the stats already counted
+                for exam_id in job.exam_ids:
+                    rebuild_exam_stats(exam_id)
+                job.status = DeltaRegradeJob.Status.DONE
+                job.finished_at = timezone.now()
+                job.last_error = ""
+                # an update, not a save: a deleted question took its job with it
+                DeltaRegradeJob.objects.filter(pk=job.pk).update(
+                    status=job.status, finished_at=job.finished_at, last_error="",
+                )
+                return job
+
+            rewritten, exam_ids = _rescore(question, version, rows, job.changed_by_id)
+            job.last_answer_id = rows[-1][0]
+            job.rewritten_answers += rewritten
+            job.exam_ids = sorted(set(job.exam_ids) | exam_ids)
+            # a heartbeat, so a long job is not taken for one whose worker died
+            job.claimed_at = timezone.now()
+            job.save(update_fields=["last_answer_id", "rewritten_answers", "exam_ids", "claimed_at"])
+
+
+def _rescore(question: CompiledQuestion, version: int, rows, changed_by_id):
+    # call inside a transaction; returns (answers rewritten, exams of the totals moved)
+    regraded = {}
+    for answer_id, sid, text, option, fp, token_version, old_score, old_feedback in rows:
+        hashes = None
+        if question.question_type != "MCQ" and token_version == TOKENIZER_VERSION:
+            hashes = unpack_fingerprint(fp)
+        score, feedback = question.grade(text, option, hashes)
+        if score != old_score or feedback != old_feedback:
+            regraded[answer_id] = (sid, old_score, score, feedback)
+    if not regraded:
+        return 0, set()
+
+    totals, exams = {}, {}
+    for sid, score, exam_id in (
+        Submission.objects
+        .select_for_update()
+        .filter(id__in={sid for sid, *_ in regraded.values()}, status=Submission.Status.GRADED)
+        .values_list("id", "score", "exam_id")
+    ):
+        # normally the question's exam, but not for answers given before the question was moved
+        totals[sid], exams[sid] = score, exam_id
+    # a question has few distinct grades, so rows are written with one UPDATE per distinct
+    # outcome, score difference and letter rather than one CASE branch per row
+    by_outcome, by_delta, by_letter = defaultdict(list), defaultdict(list), defaultdict(list)
+    audit, rewritten, moved = [], 0, set()
+    for answer_id, (sid, old_score, score, feedback) in regraded.items():
+        if sid not in totals:
+            continue
+        by_outcome[score, feedback].append(answer_id)
+        rewritten += 1
+        if score == old_score:
+            continue  # only the feedback changed
+        # one answer per (submission, question), so this is the submission's only delta
+        old_total = totals[sid]
+        new_total = round(old_total + score - old_score, 2)
+        by_delta[score - old_score].append(sid)
+        by_letter[letter_grade(new_total)].append(sid)
+        moved.add(exams[sid])
+        audit.append(ScoreAdjustment(
+            submission_id=sid, question_id=question.question_id, changed_by_id=changed_by_id, answer_key_version=version,
+            old_score=old_score, new_score=score, old_total=old_total, new_total=new_total,
+        ))
+
+    touched = {regraded[answer_id][0] for ids in by_outcome.values() for answer_id in ids}
+    for (score, feedback), answer_ids in by_outcome.items():
+        SubmissionAnswer.objects.filter(id__in=answer_ids).update(awarded_score=score, feedback=feedback)
+    for delta, sids in by_delta.items():
+        Submission.objects.filter(id__in=sids).update(score=Round(F("score") + delta, 2))
+    for letter, sids in by_letter.items():
+        Submission.objects.filter(id__in=sids).update(grade_letter=letter)
+    # feedback-only changes too: graded_at is what tells cached detail responses they are stale
+    Submission.objects.filter(id__in=touched).update(graded_at=timezone.now())
+    ScoreAdjustment.objects.bulk_create(audit, batch_size=AUDIT_BATCH_SIZE)
+    invalidate_graded_submissions(touched)
+    return rewritten, moved
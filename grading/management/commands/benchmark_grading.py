@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from grading.benchmarks import STAGES, SyntheticExamSpec, compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark tokenize, MockGradingService.grade, batch grading and the submission create "
+        "endpoint on a synthetic exam. Database writes go to a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        defaults = SyntheticExamSpec()
+        parser.add_argument("--questions", type=int, default=defaults.questions)
+        parser.add_argument("--mcq-ratio", type=float, default=defaults.mcq_ratio)
+        parser.add_argument("--short-ratio", type=float, default=defaults.short_ratio, help="The rest are ESSAY.")
+        parser.add_argument("--students", type=int, default=defaults.students)
+        parser.add_argument("--short-words", type=int, default=defaults.short_words, help="Mean SHORT answer length.")
+        parser.add_argument("--essay-words", type=int, default=defaults.essay_words, help="Mean ESSAY answer length.")
+        parser.add_argument("--length-dist", choices=["fixed", "uniform", "lognormal"], default=defaults.length_dist)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated subset of: {', '.join(STAGES)}")
+        parser.add_argument("--output", help="Write JSON results to this file (default: stdout).")
+        parser.add_argument("--compare", help="Baseline JSON from a previous run; fail (exit status 1) on regressions.")
+        parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression vs baseline (0.15 = 15%%).")
+
+    def handle(self, *args, **options):
+        stages = [s.strip() for s in options["stages"].split(",") if s.strip()]
+        unknown = [s for s in stages if s not in STAGES]
+        if unknown:
+            raise CommandError(f"Unknown stages: {', '.join(unknown)}")
+
+        spec = SyntheticExamSpec(
+            questions=options["questions"],
+            mcq_ratio=options["mcq_ratio"],
+            short_ratio=options["short_ratio"],
+            students=options["students"],
+            short_words=options["short_words"],
+            essay_words=options["essay_words"],
+            length_dist=options["length_dist"],
+            seed=options["seed"],
+        )
+        report = run_benchmarks(spec, stages)
+
+        for stage, result in report["results"].items():
+            self.stderr.write(
+                f"{stage:>18}: {result['answers_per_sec']:>12,.1f} answers/s  "
+                f"p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms per submission"
+            )
+
+        body = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(body + "\n")
+        else:
+            self.stdout.write(body)
+
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                baseline = json.load(fh)
+            problems = compare(report, baseline, options["tolerance"])
+            for problem in problems:
+                self.stderr.write(self.style.ERROR(f"REGRESSION {problem}"))
+            if problems:
+                raise CommandError(f"{len(problems)} regression(s) against {options['compare']}", returncode=1)
+            self.stderr.write(self.style.SUCCESS("No regressions against baseline"))
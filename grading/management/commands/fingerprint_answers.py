@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from grading.services import TOKENIZER_VERSION, fingerprint
+from submissions.models import SubmissionAnswer
+
+
+class Command(BaseCommand):
+    help = (
+        "Store token fingerprints for SHORT/ESSAY answers that have none or were fingerprinted "
+        "by an older tokenizer. Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exam", type=int, help="Only answers of this exam.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        qs = (
+            SubmissionAnswer.objects
+            .exclude(token_version=TOKENIZER_VERSION)
+            .exclude(question__question_type="MCQ")
+        )
+        if options["exam"]:
+            qs = qs.filter(submission__exam_id=options["exam"])
+
+        started = time.monotonic()
+        done = 0
+        last_id = 0
+        while True:
+            rows = list(
+                qs.filter(id__gt=last_id).order_by("id").values_list("id", "answer_text")[:options["chunk_size"]]
+            )
+            if not rows:
+                break
+            answers = [
+                SubmissionAnswer(id=pk, token_fingerprint=fingerprint(text), token_version=TOKENIZER_VERSION)
+                for pk, text in rows
+            ]
+            with transaction.atomic():
+                SubmissionAnswer.objects.bulk_update(answers, ["token_fingerprint", "token_version"])
+            last_id = rows[-1][0]
+            done += len(rows)
+            self.stdout.write(f"  {done} answers ({done / max(time.monotonic() - started, 1e-9):.0f}/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Fingerprinted {done} answers (tokenizer version {TOKENIZER_VERSION})"))
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from grading.answer_keys import warm_on_startup
+from grading.queue import claim_delta_jobs, claim_jobs, process_delta_jobs, process_jobs, requeue_stale_jobs
+
+
+def run_worker(worker_id: str, batch_size: int, poll_interval: float, once: bool, stdout=None):
+    warm_on_startup()
+    while True:
+        requeue_stale_jobs()
+        jobs = claim_jobs(worker_id, batch_size)
+        if jobs:
+            graded = process_jobs(jobs)
+            if stdout is not None:
+                stdout.write(f"[{worker_id}] graded {graded}/{len(jobs)} submissions")
+            continue
+        # submissions first: students are waiting for those
+        delta_jobs = claim_delta_jobs(worker_id)
+        if delta_jobs:
+            rewritten = process_delta_jobs(delta_jobs)
+            if stdout is not None:
+                stdout.write(f"[{worker_id}] delta regrade rescored {rewritten} answers")
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def _child(worker_id, batch_size, poll_interval, once):
+    # connections inherited through fork belong to the parent
+    connections.close_all()
+    run_worker(worker_id, batch_size, poll_interval, once)
+
+
+class Command(BaseCommand):
+    help = "Grade queued submissions (async grading mode) and run queued delta regrades. Runs until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes claiming jobs in parallel.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Jobs claimed per round trip.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is drained.")
+
+    def handle(self, *args, **options):
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+        batch_size = options["batch_size"]
+        poll_interval = options["poll_interval"]
+        once = options["once"]
+
+        processes = max(1, options["processes"])
+        if processes == 1:
+            self.stdout.write(f"Grading worker {base_id} started")
+            run_worker(base_id, batch_size, poll_interval, once, stdout=self.stdout)
+            return
+
+        connections.close_all()
+        children = [
+            multiprocessing.Process(target=_child, args=(f"{base_id}/{n}", batch_size, poll_interval, once))
+            for n in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"Grading worker pool {base_id} started with {processes} processes")
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
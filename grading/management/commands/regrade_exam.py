@@ -0,0 +1,49 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Exam
+from grading.regrade import regrade, start_or_resume_run
+
+
+class Command(BaseCommand):
+    help = "Regrade every submitted answer of an exam against its current answer key. Resumes an interrupted run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument("--chunk-size", type=int, default=500, help="Submissions graded and written per chunk.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Grading processes (1 = in-process).")
+        parser.add_argument("--restart", action="store_true", help="Discard an unfinished run and start from scratch.")
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options["exam_id"])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam_id']} not found")
+
+        run = start_or_resume_run(exam, restart=options["restart"])
+        if run.processed_submissions:
+            self.stdout.write(
+                f"Resuming run {run.id} after submission {run.last_submission_id} "
+                f"({run.processed_submissions}/{run.total_submissions} done)"
+            )
+        else:
+            self.stdout.write(f"Starting run {run.id}: {run.total_submissions} submissions")
+
+        totals = {"submissions": 0, "answers": 0}
+
+        def report(progress):
+            totals["submissions"] += progress.submissions
+            totals["answers"] += progress.answers
+            elapsed = max(progress.elapsed, 1e-9)
+            done = progress.run.processed_submissions
+            total = max(progress.run.total_submissions, done, 1)
+            self.stdout.write(
+                f"  {done}/{total} submissions ({done * 100 / total:.1f}%) - "
+                f"{totals['submissions'] / elapsed:.1f} submissions/s, {totals['answers'] / elapsed:.1f} answers/s"
+            )
+
+        run = regrade(run, chunk_size=options["chunk_size"], workers=options["workers"], on_progress=report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Run {run.id} {run.status.lower()}: {run.processed_submissions} submissions, {run.processed_answers} answers"
+        ))
@@ -0,0 +1,27 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Question
+from grading.delta import CHUNK_SIZE, regrade_questions
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescore the graded answers to the given questions against their current answer keys, "
+        "adjusting submission totals by the difference (a delta regrade), in this process. Question "
+        "edits made through the API queue this for grading_worker; use this after edits made elsewhere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("question_ids", nargs="+", type=int)
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Answers rescored per transaction.")
+
+    def handle(self, *args, **options):
+        ids = options["question_ids"]
+        missing = sorted(set(ids) - set(Question.objects.filter(pk__in=ids).values_list("pk", flat=True)))
+        if missing:
+            raise CommandError(f"Questions not found: {missing}")
+
+        rewritten = regrade_questions(ids, chunk_size=options["chunk_size"], worker_id=f"regrade_question:{os.getpid()}")
+        self.stdout.write(self.style.SUCCESS(f"Rescored {rewritten} answers"))
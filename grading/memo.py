@@ -0,0 +1,44 @@
+import hashlib
+
+from django.conf import settings
+
+from common.caches import LRUCache
+from .services import TOKENIZER_VERSION
+
+
+class GradingMemo:
+    """
+    Remembers (awarded_score, feedback) per (compiled question, normalized answer).
+    Identical MCQ choices or identical keyword sets across a cohort are graded once per process.
+    The compiled question carries every grading input (id, type, max_score, expected
+    choice/tokens), so editing the key, or moving the question between exams whose versions
+    happen to coincide, never reuses an old entry; those simply age out of the LRU.
+    """
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    @staticmethod
+    def key_for(question, answer):
+        if question.question_type == "MCQ":
+            return question, (answer.selected_option or "").strip().lower()
+        # keyword grading only depends on the answer's token set, i.e. its fingerprint
+        if getattr(answer, "token_version", 0) != TOKENIZER_VERSION:
+            return None
+        digest = hashlib.blake2b(bytes(answer.token_fingerprint), digest_size=16).digest()
+        return question, digest
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+grading_memo = GradingMemo(maxsize=getattr(settings, "GRADING_MEMO_SIZE", 50_000))
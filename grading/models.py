@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import models
+
+
+class RegradeRun(models.Model):
+    class Status(models.TextChoices):
+        RUNNING = "RUNNING", "Running"
+        COMPLETED = "COMPLETED", "Completed"
+
+    exam = models.ForeignKey("assessments.Exam", on_delete=models.CASCADE, related_name="regrade_runs", db_index=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING, db_index=True)
+
+    # answer key the run grades against; a changed key restarts the run from the first submission
+    answer_key_version = models.PositiveIntegerField(default=0)
+    # resume point: every submission with id <= last_submission_id has been regraded
+    last_submission_id = models.BigIntegerField(default=0)
+
+    total_submissions = models.PositiveIntegerField(default=0)
+    processed_submissions = models.PositiveIntegerField(default=0)
+    processed_answers = models.PositiveIntegerField(default=0)
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["exam", "status"]),
+        ]
+
+    def __str__(self):
+        return f"RegradeRun({self.id}) exam={self.exam_id} {self.status}"
+
+
+class GradingJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    submission = models.OneToOneField("submissions.Submission", on_delete=models.CASCADE, related_name="grading_job")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, db_index=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_by = models.CharField(max_length=64, blank=True, default="")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # claim order and queue position both scan QUEUED jobs by id
+            models.Index(fields=["status", "id"]),
+        ]
+
+    def __str__(self):
+        return f"GradingJob({self.id}) sub={self.submission_id} {self.status}"
+
+
+class DeltaRegradeJob(models.Model):
+    """
+    A queued delta regrade (grading.delta) of one question whose answer key was edited.
+    Created with the edit, claimed and run by `manage.py grading_worker`.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    question = models.ForeignKey("assessments.Question", on_delete=models.CASCADE, related_name="+")
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, db_index=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_by = models.CharField(max_length=64, blank=True, default="")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    # resume point: every answer to the question with id <= last_answer_id has been rescored
+    last_answer_id = models.BigIntegerField(default=0)
+    rewritten_answers = models.PositiveIntegerField(default=0)
+    # exams of the submissions whose totals moved; their analytics are rebuilt when the job finishes
+    exam_ids = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"]),
+        ]
+
+    def __str__(self):
+        return f"DeltaRegradeJob({self.id}) q={self.question_id} {self.status}"
+
+
+class ScoreAdjustment(models.Model):
+    """
+    Audit record of one answer rescored by a delta regrade (grading.delta) after its
+    question's answer key was edited: the answer's and the submission's score before and after.
+    """
+    submission = models.ForeignKey("submissions.Submission", on_delete=models.CASCADE, related_name="score_adjustments")
+    question = models.ForeignKey("assessments.Question", on_delete=models.CASCADE, related_name="+")
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    # exam content_version the new score was graded against
+    answer_key_version = models.PositiveIntegerField(default=0)
+
+    old_score = models.FloatField()
+    new_score = models.FloatField()
+    old_total = models.FloatField()
+    new_total = models.FloatField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["question", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"ScoreAdjustment({self.id}) sub={self.submission_id} q={self.question_id} {self.old_score}->{self.new_score}"
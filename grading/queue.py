@@ -0,0 +1,173 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from analytics.services import record_grades
+from submissions.models import Submission
+from .answer_keys import get_answer_key
+from .bulk import grade_rows, load_answer_rows, write_grades
+from .delta import run_delta_job
+from .models import DeltaRegradeJob, GradingJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_grading(submission) -> GradingJob:
+    # call inside the transaction that saved the submission, so workers never see a job without answers
+    return GradingJob.objects.create(submission=submission)
+
+
+def queue_position(job: GradingJob):
+    """1-based position among queued jobs, or None once a worker has picked the job up."""
+    if job.status != GradingJob.Status.QUEUED:
+        return None
+    return GradingJob.objects.filter(status=GradingJob.Status.QUEUED, id__lt=job.id).count() + 1
+
+
+def queue_positions(job_ids: Iterable[int]) -> Dict[int, int]:
+    """queue_position for many jobs in one query: {job id: position} for those still queued."""
+    queued = GradingJob.objects.filter(status=GradingJob.Status.QUEUED)
+    ahead = (
+        queued.filter(id__lt=OuterRef("id"))
+        .order_by()
+        .values("status")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    rows = queued.filter(id__in=list(job_ids)).annotate(ahead=Coalesce(Subquery(ahead), 0)).values_list("id", "ahead")
+    return {job_id: n + 1 for job_id, n in rows}
+
+
+def requeue_stale_jobs() -> int:
+    # a worker that died mid-batch leaves its jobs RUNNING; hand them back after a timeout
+    cutoff = timezone.now() - timedelta(seconds=settings.GRADING_JOB_TIMEOUT_SECONDS)
+    return sum(
+        model.objects.filter(status=model.Status.RUNNING, claimed_at__lt=cutoff).update(
+            status=model.Status.QUEUED, claimed_by="", claimed_at=None,
+        )
+        for model in (GradingJob, DeltaRegradeJob)
+    )
+
+
+def _claim(model, worker_id: str, batch_size: int):
+    now = timezone.now()
+    queued = (
+        model.objects
+        .filter(status=model.Status.QUEUED)
+        .order_by("id")
+        .values("id")[:batch_size]
+    )
+    claimed = model.objects.filter(id__in=queued, status=model.Status.QUEUED).update(
+        status=model.Status.RUNNING,
+        claimed_by=worker_id,
+        claimed_at=now,
+        attempts=F("attempts") + 1,
+    )
+    if not claimed:
+        return model.objects.none()
+    return model.objects.filter(status=model.Status.RUNNING, claimed_by=worker_id, claimed_at=now)
+
+
+def claim_jobs(worker_id: str, batch_size: int) -> List[GradingJob]:
+    """
+    Claims up to batch_size queued jobs for this worker with a single conditional UPDATE,
+    so concurrent workers never claim the same job and never hold a read lock while
+    waiting to write (SQLite has no SELECT ... FOR UPDATE SKIP LOCKED).
+    """
+    return list(
+        _claim(GradingJob, worker_id, batch_size)
+        .select_related("submission")
+        .only("id", "attempts", "claimed_by", "claimed_at", "submission__id", "submission__exam_id")
+    )
+
+
+def claim_delta_jobs(worker_id: str, batch_size: int = 1) -> List[DeltaRegradeJob]:
+    # as claim_jobs; one at a time is usually right, a job rescores every answer to its question
+    return list(_claim(DeltaRegradeJob, worker_id, batch_size))
+
+
+def _retry_or_fail(model, jobs, exc: Exception):
+    # back to the queue, or FAILED once a job has used its GRADING_JOB_MAX_ATTEMPTS; jobs
+    # requeue_stale_jobs has handed to another worker meanwhile are left to that worker
+    jobs = [job for job in jobs if job.claimed_by]
+    if not jobs:
+        return
+    claimed = model.objects.filter(
+        id__in=[job.id for job in jobs], status=model.Status.RUNNING, claimed_by=jobs[0].claimed_by,
+    )
+    retry = [job.id for job in jobs if job.attempts < settings.GRADING_JOB_MAX_ATTEMPTS]
+    claimed.filter(id__in=retry).update(
+        status=model.Status.QUEUED, claimed_by="", claimed_at=None, last_error=str(exc),
+    )
+    claimed.exclude(id__in=retry).update(
+        status=model.Status.FAILED, finished_at=timezone.now(), last_error=str(exc),
+    )
+
+
+def process_jobs(jobs: List[GradingJob]) -> int:
+    """
+    Grades claimed jobs exam by exam and marks them DONE. A failing exam group is
+    re-queued (or FAILED after GRADING_JOB_MAX_ATTEMPTS) without affecting the others.
+    Only grades that are first-time grades are written and counted in the stats: a job
+    requeue_stale_jobs handed to another worker is that worker's, and a submission a
+    regrade already GRADED is left as it is. Returns the number of submissions graded.
+    """
+    by_exam = defaultdict(list)
+    for job in jobs:
+        by_exam[job.submission.exam_id].append(job)
+
+    graded = 0
+    for exam_id, exam_jobs in by_exam.items():
+        job_ids = [job.id for job in exam_jobs]
+        try:
+            answer_key = get_answer_key(exam_id)
+            rows_by_submission = load_answer_rows([job.submission_id for job in exam_jobs])
+            results = grade_rows(answer_key, rows_by_submission)
+
+            with transaction.atomic():
+                now = timezone.now()
+                claimed = GradingJob.objects.select_for_update().filter(
+                    id__in=job_ids, status=GradingJob.Status.RUNNING,
+                    claimed_by=exam_jobs[0].claimed_by, claimed_at=exam_jobs[0].claimed_at,
+                )
+                still_ours = list(claimed.values_list("submission_id", flat=True))
+                ungraded = set(
+                    Submission.objects.select_for_update()
+                    .filter(id__in=still_ours)
+                    .exclude(status=Submission.Status.GRADED)
+                    .values_list("id", flat=True)
+                )
+                rows = {sid: r for sid, r in rows_by_submission.items() if sid in ungraded}
+                write_grades(rows, results, graded_at=now)
+                record_grades(answer_key, rows, {sid: results[sid] for sid in rows})
+                claimed.update(status=GradingJob.Status.DONE, finished_at=now, last_error="")
+            graded += len(rows)
+        except Exception as exc:
+            logger.exception("Grading failed for exam %s jobs %s", exam_id, job_ids)
+            _retry_or_fail(GradingJob, exam_jobs, exc)
+    return graded
+
+
+def process_delta_jobs(jobs: List[DeltaRegradeJob]) -> int:
+    """
+    Runs claimed delta regrades one by one, each from where an earlier attempt stopped. A
+    failing job is re-queued (or FAILED after GRADING_JOB_MAX_ATTEMPTS) without affecting
+    the others. Returns the number of answers rewritten.
+    """
+    rewritten = 0
+    for job in jobs:
+        before = job.rewritten_answers
+        try:
+            run_delta_job(job)
+        except Exception as exc:
+            logger.exception("Delta regrade failed for question %s job %s", job.question_id, job.id)
+            _retry_or_fail(DeltaRegradeJob, [job], exc)
+        rewritten += job.rewritten_answers - before
+    return rewritten
@@ -0,0 +1,121 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.services import rebuild_exam_stats
+from submissions.models import Submission
+from .answer_keys import get_answer_key
+from .bulk import PoolGrader, load_answer_rows, write_grades
+from .models import RegradeRun
+
+REGRADABLE_STATUSES = [Submission.Status.SUBMITTED, Submission.Status.GRADED]
+
+
+@dataclass
+class ChunkProgress:
+    run: RegradeRun
+    submissions: int
+    answers: int
+    elapsed: float  # seconds since regrade() was called
+
+
+def regradable_submissions(exam_id: int):
+    return Submission.objects.filter(exam_id=exam_id, status__in=REGRADABLE_STATUSES)
+
+
+def start_or_resume_run(exam, requested_by=None, restart: bool = False) -> RegradeRun:
+    """
+    Returns the exam's unfinished run so an interrupted regrade continues where it stopped,
+    or starts a new one.
+    """
+    with transaction.atomic():
+        run = (
+            RegradeRun.objects
+            .filter(exam=exam, status=RegradeRun.Status.RUNNING)
+            .order_by("-id")
+            .first()
+        )
+        if run is not None and restart:
+            run.status = RegradeRun.Status.COMPLETED
+            run.finished_at = timezone.now()
+            run.save(update_fields=["status", "finished_at", "updated_at"])
+            run = None
+
+        if run is None:
+            run = RegradeRun.objects.create(
+                exam=exam,
+                requested_by=requested_by,
+                answer_key_version=exam.content_version,
+                total_submissions=regradable_submissions(exam.id).count(),
+            )
+    return run
+
+
+def regrade(
+    run: RegradeRun,
+    chunk_size: int = 500,
+    workers: int = 1,
+    deadline: Optional[float] = None,
+    on_progress: Optional[Callable[[ChunkProgress], None]] = None,
+) -> RegradeRun:
+    """
+    Regrades the run's exam chunk by chunk in submission id order. Each chunk's grades and
+    the run's resume point are committed together, so stopping at any time loses no work.
+    Stops early once time.monotonic() passes `deadline`; call again to continue.
+    """
+    started = time.monotonic()
+    answer_key = get_answer_key(run.exam_id)
+
+    if answer_key.version != run.answer_key_version:
+        # the key changed since the run started: everything graded so far used the old key
+        run.answer_key_version = answer_key.version
+        run.last_submission_id = 0
+        run.processed_submissions = 0
+        run.processed_answers = 0
+        run.total_submissions = regradable_submissions(run.exam_id).count()
+        run.save()
+
+    with PoolGrader(answer_key, workers=workers) as grader:
+        while run.status == RegradeRun.Status.RUNNING:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+            submission_ids = list(
+                regradable_submissions(run.exam_id)
+                .filter(id__gt=run.last_submission_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not submission_ids:
+                with transaction.atomic():
+                    # regraded scores replace ones the stats already counted: recompute them
+                    rebuild_exam_stats(run.exam_id)
+                    run.status = RegradeRun.Status.COMPLETED
+                    run.finished_at = timezone.now()
+                    run.save(update_fields=["status", "finished_at", "updated_at"])
+                break
+
+            rows_by_submission = load_answer_rows(submission_ids)
+            results = grader.grade(rows_by_submission)
+
+            with transaction.atomic():
+                answers = write_grades(rows_by_submission, results, graded_at=timezone.now())
+                run.last_submission_id = submission_ids[-1]
+                run.processed_submissions += len(submission_ids)
+                run.processed_answers += answers
+                run.save(update_fields=[
+                    "last_submission_id", "processed_submissions", "processed_answers", "updated_at",
+                ])
+
+            if on_progress is not None:
+                on_progress(ChunkProgress(
+                    run=run,
+                    submissions=len(submission_ids),
+                    answers=answers,
+                    elapsed=time.monotonic() - started,
+                ))
+
+    return run
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+from .models import RegradeRun
+
+class RegradeRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RegradeRun
+        fields = [
+            "id",
+            "exam_id",
+            "status",
+            "answer_key_version",
+            "total_submissions",
+            "processed_submissions",
+            "processed_answers",
+            "started_at",
+            "updated_at",
+            "finished_at",
+        ]
+
+class RegradeRequestSerializer(serializers.Serializer):
+    restart = serializers.BooleanField(required=False, default=False)
@@ -1,17 +1,51 @@
+import hashlib
 import re
-from dataclasses import dataclass
-from typing import List, Dict
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 STOPWORDS = {
     "the", "a", "an", "and", "or", "to", "of", "in", "on", "for", "is", "are", "was", "were",
     "with", "as", "by", "at", "from", "that", "this", "it"
 }
 
+TOKEN_PATTERN = r"[a-z0-9]+"
+
+# Bump TOKENIZER_REVISION when tokenize() changes in a way the pattern/stopwords don't capture.
+# TOKENIZER_VERSION is what stored fingerprints are stamped with; any change to it makes
+# existing fingerprints stale, so graders fall back to the text until they are backfilled.
+TOKENIZER_REVISION = 1
+TOKENIZER_VERSION = zlib.crc32(
+    f"{TOKENIZER_REVISION}|{TOKEN_PATTERN}|{','.join(sorted(STOPWORDS))}".encode()
+) & 0x7FFFFFFF
+
 def tokenize(text: str) -> List[str]:
     text = (text or "").lower()
-    words = re.findall(r"[a-z0-9]+", text)
+    words = re.findall(TOKEN_PATTERN, text)
     return [w for w in words if w not in STOPWORDS]
 
+def token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+def fingerprint(text: str) -> bytes:
+    """Distinct token hashes of a text, sorted and packed as little-endian uint64."""
+    hashes = sorted({token_hash(t) for t in tokenize(text)})
+    return struct.pack(f"<{len(hashes)}Q", *hashes)
+
+def unpack_fingerprint(data) -> FrozenSet[int]:
+    data = bytes(data or b"")
+    return frozenset(struct.unpack(f"<{len(data) // 8}Q", data))
+
+def stored_token_hashes(answer) -> Optional[FrozenSet[int]]:
+    """Token hashes from an answer's stored fingerprint, or None if missing or stale."""
+    if getattr(answer, "token_version", 0) != TOKENIZER_VERSION:
+        return None
+    return unpack_fingerprint(answer.token_fingerprint)
+
+# answers to a question the answer key no longer contains score nothing
+NOT_IN_ANSWER_KEY = "Question is not part of this exam"
+
 @dataclass
 class QuestionGrade:
     question_id: int
@@ -23,44 +57,132 @@ class GradeResult:
     total_score: float
     per_question: List[QuestionGrade]
 
-class MockGradingService:
+
+@dataclass(frozen=True)
+class CompiledQuestion:
     """
-    Rules:
-    - MCQ: selected_option must match expected_answer exactly (case-insensitive)
-    - SHORT/ESSAY: keyword overlap ratio * max_score (0..max_score)
+    Answer key for one question with everything grading needs precomputed,
+    so grading an answer only costs work proportional to the answer itself.
     """
+    question_id: int
+    question_type: str
+    max_score: float
+    expected_choice: str = ""
+    expected_tokens: FrozenSet[str] = frozenset()
+    expected_hashes: FrozenSet[int] = frozenset()
+
+    @classmethod
+    def compile(cls, question_id, question_type, expected_answer, max_score) -> "CompiledQuestion":
+        if question_type == "MCQ":
+            return cls(
+                question_id=question_id,
+                question_type=question_type,
+                max_score=float(max_score or 1),
+                expected_choice=(expected_answer or "").strip().lower(),
+            )
+        expected_tokens = frozenset(tokenize(expected_answer))
+        return cls(
+            question_id=question_id,
+            question_type=question_type,
+            max_score=float(max_score or 1),
+            expected_tokens=expected_tokens,
+            expected_hashes=frozenset(token_hash(t) for t in expected_tokens),
+        )
+
+    def grade(self, answer_text: str, selected_option: str, token_hashes: FrozenSet[int] = None) -> Tuple[float, str]:
+        if self.question_type == "MCQ":
+            chosen = (selected_option or "").strip().lower()
+            expected = self.expected_choice
+            awarded = self.max_score if expected and chosen and expected == chosen else 0.0
+            return awarded, "Correct" if awarded > 0 else "Incorrect"
+
+        if not self.expected_tokens:
+            # If there is no expected answer, give 0 (or you could default to max_score)
+            return 0.0, "No expected answer configured"
+
+        if token_hashes is not None:
+            # stored fingerprint: no need to re-tokenize the answer text
+            overlap = len(self.expected_hashes.intersection(token_hashes))
+        else:
+            overlap = len(self.expected_tokens.intersection(tokenize(answer_text)))
+        ratio = overlap / max(1, len(self.expected_tokens))
+        awarded = round(self.max_score * ratio, 2)
+        return awarded, f"Keyword overlap: {overlap}/{len(self.expected_tokens)}"
+
 
-    def grade(self, submission) -> GradeResult:
-        # expects submission.answers prefetched and answers.question select_related
+@dataclass(frozen=True)
+class CompiledAnswerKey:
+    exam_id: int
+    version: int
+    questions: Dict[int, CompiledQuestion] = field(default_factory=dict)
+
+    def grade(self, answers: Iterable, memo=None) -> GradeResult:
+        """
+        answers: objects exposing question_id, answer_text and selected_option
+        (SubmissionAnswer rows or plain tuples with those attributes), and optionally
+        token_fingerprint/token_version, used instead of answer_text when current.
+        memo: optional GradingMemo consulted before grading each answer.
+        """
         per_q: List[QuestionGrade] = []
         total = 0.0
 
-        for ans in submission.answers.all():
-            q = ans.question
-            max_score = float(q.max_score or 1)
-
-            if q.question_type == "MCQ":
-                expected = (q.expected_answer or "").strip().lower()
-                chosen = (ans.selected_option or "").strip().lower()
-                awarded = max_score if expected and chosen and expected == chosen else 0.0
-                feedback = "Correct" if awarded > 0 else "Incorrect"
+        for ans in answers:
+            q = self.questions.get(ans.question_id)
+            if q is None:
+                per_q.append(QuestionGrade(question_id=ans.question_id, awarded_score=0.0, feedback=NOT_IN_ANSWER_KEY))
+                continue
+            memo_key = memo.key_for(q, ans) if memo is not None else None
+            cached = memo.get(memo_key) if memo_key is not None else None
 
+            if cached is not None:
+                awarded, feedback = cached
             else:
-                expected_tokens = set(tokenize(q.expected_answer))
-                answer_tokens = set(tokenize(ans.answer_text))
-
-                if not expected_tokens:
-                    # If there is no expected answer, give 0 (or you could default to max_score)
-                    awarded = 0.0
-                    feedback = "No expected answer configured"
-                else:
-                    overlap = len(expected_tokens.intersection(answer_tokens))
-                    ratio = overlap / max(1, len(expected_tokens))
-                    awarded = round(max_score * ratio, 2)
-                    feedback = f"Keyword overlap: {overlap}/{len(expected_tokens)}"
+                token_hashes = stored_token_hashes(ans) if q.question_type != "MCQ" else None
+                awarded, feedback = q.grade(ans.answer_text, ans.selected_option, token_hashes)
+                if memo_key is not None:
+                    memo.set(memo_key, (awarded, feedback))
 
             total += awarded
-            per_q.append(QuestionGrade(question_id=q.id, awarded_score=awarded, feedback=feedback))
+            per_q.append(QuestionGrade(question_id=q.question_id, awarded_score=awarded, feedback=feedback))
 
         total = round(total, 2)
         return GradeResult(total_score=total, per_question=per_q)
+
+
+def letter_grade(score: float) -> str:
+    # Simple scale; adjust if needed
+    if score >= 90:
+        return "A"
+    if score >= 75:
+        return "B"
+    if score >= 60:
+        return "C"
+    if score >= 50:
+        return "D"
+    return "F"
+
+
+class MockGradingService:
+    """
+    Rules:
+    - MCQ: selected_option must match expected_answer exactly (case-insensitive)
+    - SHORT/ESSAY: keyword overlap ratio * max_score (0..max_score)
+    """
+
+    def __init__(self, memo=None):
+        if memo is None:
+            from .memo import grading_memo as memo
+        self.memo = memo
+
+    def grade(self, submission, answer_key: CompiledAnswerKey = None) -> GradeResult:
+        # expects submission.answers prefetched; questions come from the compiled answer key
+        if answer_key is None:
+            from .answer_keys import get_answer_key
+
+            answer_key = get_answer_key(submission.exam_id, getattr(submission.exam, "content_version", None))
+
+        return self.grade_answers(submission.answers.all(), answer_key)
+
+    def grade_answers(self, answers, answer_key: CompiledAnswerKey) -> GradeResult:
+        # grades answers that need not be saved yet (e.g. before the submission is inserted)
+        return answer_key.grade(answers, memo=self.memo)
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from assessments.models import Exam, Question
+from assessments.signals import grading_fields_changed
+from .answer_keys import invalidate_answer_key
+from .delta import enqueue_delta_regrades
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def invalidate_exam_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key(instance.exam_id)
+
+
+@receiver(grading_fields_changed)
+def regrade_edited_questions(sender, question_ids, user=None, **kwargs):
+    # queued in the edit's transaction (a rolled back edit queues nothing); the grading worker rescores
+    enqueue_delta_regrades(question_ids, changed_by=user)
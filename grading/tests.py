@@ -1,3 +1,533 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import ScoreStats
+from analytics.services import percentile_sketches
+from assessments.models import Exam, Question
+from submissions.models import Submission, SubmissionAnswer
+from . import batch
+from .answer_keys import answer_key_cache
+from .batch import BatchGrader
+from .bulk import AnswerRow
+from .delta import regrade_questions, run_delta_job
+from .memo import GradingMemo, grading_memo
+from .models import DeltaRegradeJob, GradingJob, ScoreAdjustment
+from .queue import claim_jobs, process_jobs, requeue_stale_jobs
+from .regrade import regrade, start_or_resume_run
+from .services import (
+    NOT_IN_ANSWER_KEY, TOKENIZER_VERSION, CompiledAnswerKey, CompiledQuestion, fingerprint, unpack_fingerprint,
+)
+
+User = get_user_model()
+
+
+@override_settings(GRADING_ASYNC=False, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=0)
+class DeltaRegradeTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        self.staff_user = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.staff = APIClient()
+        self.staff.force_authenticate(self.staff_user)
+
+        self.submissions = {}
+        for name, option, text in [("ada", "B", "light energy"), ("bo", "A", "sugar"), ("cy", "A", "nothing")]:
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(name, password="pw"))
+            response = client.post("/api/submissions/create/", {"exam_id": self.exam.id, "answers": [
+                {"question_id": self.mcq.id, "selected_option": option},
+                {"question_id": self.short.id, "answer_text": text},
+            ]}, format="json")
+            self.submissions[name] = (client, response.json()["data"]["id"])
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def scores(self):
+        return dict(Submission.objects.filter(exam=self.exam).values_list("student__username", "score"))
+
+    def run_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("grading_worker", "--once", stdout=StringIO())
+
+    def edit_mcq_key(self, answer):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.staff.patch(f"/api/admin/questions/{self.mcq.id}/", {"expected_answer": answer}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.run_worker()
+
+    def test_key_edit_adjusts_scores_by_the_difference(self):
+        self.assertEqual(self.scores(), {"ada": 4.0, "bo": 1.0, "cy": 0.0})
+        client, pk = self.submissions["bo"]
+        self.assertEqual(client.get(f"/api/submissions/{pk}/").json()["data"]["score"], 1.0)  # cache it
+
+        self.edit_mcq_key("A")
+
+        self.assertEqual(self.scores(), {"ada": 2.0, "bo": 3.0, "cy": 2.0})
+        self.assertEqual(
+            dict(SubmissionAnswer.objects.filter(question=self.mcq).values_list("submission__student__username", "feedback")),
+            {"ada": "Incorrect", "bo": "Correct", "cy": "Correct"},
+        )
+        self.assertEqual(Submission.objects.get(pk=pk).grade_letter, "F")
+        self.assertEqual(client.get(f"/api/submissions/{pk}/").json()["data"]["score"], 3.0)
+
+        adjustments = ScoreAdjustment.objects.order_by("submission_id")
+        self.assertEqual(
+            [(a.old_score, a.new_score, a.old_total, a.new_total) for a in adjustments],
+            [(2.0, 0.0, 4.0, 2.0), (0.0, 2.0, 1.0, 3.0), (0.0, 2.0, 0.0, 2.0)],
+        )
+        self.assertEqual({(a.question_id, a.changed_by_id) for a in adjustments}, {(self.mcq.id, self.staff_user.id)})
+        stats = ScoreStats.objects.get(exam=self.exam, question__isnull=True)
+        self.assertEqual((stats.count, stats.total), (3, 7.0))
+
+    def test_detail_is_fresh_after_a_regrade_in_another_process(self):
+        client, pk = self.submissions["bo"]
+        self.assertEqual(client.get(f"/api/submissions/{pk}/").json()["data"]["score"], 1.0)  # cache it
+
+        # the worker's invalidation runs in its own process and never reaches this cache
+        with mock.patch("grading.delta.invalidate_graded_submissions"):
+            self.edit_mcq_key("A")
+
+        data = client.get(f"/api/submissions/{pk}/").json()["data"]
+        self.assertEqual((data["score"], data["grade_letter"]), (3.0, "F"))
+        self.assertEqual(client.get(f"/api/submissions/{pk}/").json()["data"]["score"], 3.0)
+
+    def test_edits_are_queued_for_the_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.patch(f"/api/admin/questions/{self.mcq.id}/", {"expected_answer": "A"}, format="json")
+            self.staff.patch(f"/api/admin/questions/{self.mcq.id}/", {"expected_answer": "B", "max_score": 4}, format="json")
+
+        # the requests only queued one job for the question; nothing was rescored yet
+        job = DeltaRegradeJob.objects.get()
+        self.assertEqual((job.question_id, job.status, job.changed_by_id), (self.mcq.id, DeltaRegradeJob.Status.QUEUED, self.staff_user.id))
+        self.assertEqual(self.scores(), {"ada": 4.0, "bo": 1.0, "cy": 0.0})
+
+        self.run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rewritten_answers, job.exam_ids), (DeltaRegradeJob.Status.DONE, 1, [self.exam.id]))
+        self.assertEqual(self.scores(), {"ada": 6.0, "bo": 1.0, "cy": 0.0})
+
+    def test_an_interrupted_job_resumes_where_it_stopped(self):
+        Question.objects.filter(pk=self.mcq.pk).update(expected_answer="A")
+        Exam.objects.filter(pk=self.exam.pk).bump_content_version()
+        job = DeltaRegradeJob.objects.create(question=self.mcq, status=DeltaRegradeJob.Status.RUNNING, attempts=1)
+
+        class Interrupted(Exception):
+            pass
+
+        saves = []
+
+        def save(*args, **kwargs):
+            if saves:
+                raise Interrupted
+            saves.append(kwargs)
+            DeltaRegradeJob.save(job, *args, **kwargs)
+
+        job.save = save
+        with self.assertRaises(Interrupted):
+            run_delta_job(job, chunk_size=1)
+        self.assertEqual(ScoreAdjustment.objects.count(), 1)
+
+        run_delta_job(DeltaRegradeJob.objects.get(pk=job.pk), chunk_size=1)
+
+        self.assertEqual(ScoreAdjustment.objects.count(), 3)
+        self.assertEqual(self.scores(), {"ada": 2.0, "bo": 3.0, "cy": 2.0})
+        stats = ScoreStats.objects.get(exam=self.exam, question__isnull=True)
+        self.assertEqual((stats.count, stats.total), (3, 7.0))
+
+    def test_stats_are_rebuilt_for_the_exams_of_the_rescored_submissions(self):
+        # moved outside the API, which refuses to move a question that has answers
+        other = Exam.objects.create(title="Chemistry", course="CHM101", duration_minutes=30)
+        Question.objects.filter(pk=self.mcq.pk).update(exam=other, expected_answer="A")
+
+        self.assertEqual(regrade_questions([self.mcq.id]), 3)
+
+        stats = ScoreStats.objects.get(exam=self.exam, question__isnull=True)
+        self.assertEqual((stats.count, stats.total), (3, 7.0))
+        self.assertFalse(ScoreStats.objects.filter(exam=other).exists())
+
+    def test_matches_a_full_regrade(self):
+        self.edit_mcq_key("A")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.post(f"/api/admin/exams/{self.exam.id}/questions/", {"questions": [
+                {"id": self.short.id, "question_type": "SHORT", "prompt": "Photosynthesis?", "expected_answer": "sugar", "max_score": 4},
+            ]}, format="json")
+        self.run_worker()
+        delta = self.scores()
+
+        regrade(start_or_resume_run(Exam.objects.get(pk=self.exam.pk)))
+
+        self.assertEqual(self.scores(), delta)
+        self.assertEqual(delta, {"ada": 0.0, "bo": 6.0, "cy": 2.0})
+
+    def test_new_submissions_are_graded_with_the_edited_key(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.patch(f"/api/admin/questions/{self.mcq.id}/", {"expected_answer": "A", "max_score": 5}, format="json")
+        self.run_worker()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("dee", password="pw"))
+
+        response = client.post("/api/submissions/create/", {"exam_id": self.exam.id, "answers": [
+            {"question_id": self.mcq.id, "selected_option": "A"},
+            {"question_id": self.short.id, "answer_text": "nothing"},
+        ]}, format="json")
+
+        self.assertEqual(response.json()["data"]["score"], 5.0)
+
+    def test_only_grading_fields_trigger_a_regrade(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.patch(f"/api/admin/questions/{self.mcq.id}/", {"prompt": "Pick the right one"}, format="json")
+        self.assertFalse(DeltaRegradeJob.objects.exists())
+
+        # nothing to change: a run writes nothing
+        self.assertEqual(regrade_questions([self.mcq.id]), 0)
+        self.assertFalse(ScoreAdjustment.objects.exists())
+
+
+@override_settings(GRADING_ASYNC=False, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=0)
+class TokenFingerprintTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("ada", password="pw"))
+        response = client.post("/api/submissions/create/", {"exam_id": self.exam.id, "answers": [
+            {"question_id": self.mcq.id, "selected_option": "B"},
+            {"question_id": self.short.id, "answer_text": "Light, and light energy!"},
+        ]}, format="json")
+        self.submission = Submission.objects.get(pk=response.json()["data"]["id"])
+        self.answer = self.submission.answers.get(question=self.short)
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def regraded_short_score(self):
+        # a new key version, so neither the memo nor the cached key hides the stored fingerprint
+        Exam.objects.filter(pk=self.exam.pk).bump_content_version()
+        regrade(start_or_resume_run(Exam.objects.get(pk=self.exam.pk), restart=True))
+        return SubmissionAnswer.objects.get(pk=self.answer.pk).awarded_score
+
+    def test_fingerprint_is_the_distinct_token_set(self):
+        self.assertEqual(fingerprint("The sugar, sugar and LIGHT"), fingerprint("light sugar"))
+        self.assertEqual(len(unpack_fingerprint(fingerprint("light sugar"))), 2)
+        self.assertEqual(fingerprint("the and of"), b"")
+
+    def test_text_answers_are_fingerprinted_on_submit(self):
+        self.assertEqual(
+            (bytes(self.answer.token_fingerprint), self.answer.token_version),
+            (fingerprint("light energy"), TOKENIZER_VERSION),
+        )
+        mcq_answer = self.submission.answers.get(question=self.mcq)
+        self.assertEqual((bytes(mcq_answer.token_fingerprint), mcq_answer.token_version), (b"", 0))
+        self.assertEqual(self.answer.awarded_score, 2.0)
+
+    def test_graders_use_a_current_fingerprint_instead_of_the_text(self):
+        SubmissionAnswer.objects.filter(pk=self.answer.pk).update(token_fingerprint=fingerprint("light energy sugar"))
+
+        self.assertEqual(self.regraded_short_score(), 3.0)
+
+    def test_stale_fingerprints_fall_back_to_the_text(self):
+        # as if the tokenizer changed after the answer was stored
+        SubmissionAnswer.objects.filter(pk=self.answer.pk).update(
+            token_fingerprint=fingerprint("light energy sugar"), token_version=TOKENIZER_VERSION + 1,
+        )
+
+        self.assertEqual(self.regraded_short_score(), 2.0)
+
+    def test_backfill_refreshes_only_stale_text_answers(self):
+        SubmissionAnswer.objects.filter(pk=self.answer.pk).update(token_fingerprint=b"", token_version=TOKENIZER_VERSION + 1)
+
+        call_command("fingerprint_answers", exam=self.exam.id, stdout=StringIO())
+
+        self.answer.refresh_from_db()
+        self.assertEqual(
+            (bytes(self.answer.token_fingerprint), self.answer.token_version),
+            (fingerprint("light energy"), TOKENIZER_VERSION),
+        )
+        self.assertEqual(self.submission.answers.get(question=self.mcq).token_version, 0)
+
+
+class Interrupted(Exception):
+    pass
+
+
+@override_settings(GRADING_ASYNC=False, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=0)
+class ResumableRegradeTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.ids = []
+        for n, option in enumerate("ABABA"):
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(f"student{n}", password="pw"))
+            response = client.post("/api/submissions/create/", {"exam_id": self.exam.id, "answers": [
+                {"question_id": self.mcq.id, "selected_option": option},
+            ]}, format="json")
+            self.ids.append(response.json()["data"]["id"])
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def change_key(self, answer):
+        # behind the API's back, so only a full regrade picks it up
+        Question.objects.filter(pk=self.mcq.pk).update(expected_answer=answer)
+        Exam.objects.filter(pk=self.exam.pk).bump_content_version()
+        self.exam.refresh_from_db()
+
+    def scores(self):
+        return list(Submission.objects.filter(pk__in=self.ids).order_by("id").values_list("score", flat=True))
+
+    def interrupt_after_first_chunk(self, run):
+        def stop(progress):
+            raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            regrade(run, chunk_size=2, on_progress=stop)
+
+    def test_resumes_after_the_last_committed_chunk(self):
+        self.change_key("A")
+        run = start_or_resume_run(self.exam)
+        self.interrupt_after_first_chunk(run)
+
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.last_submission_id, run.processed_submissions), ("RUNNING", self.ids[1], 2))
+        self.assertEqual(self.scores(), [2.0, 0.0, 0.0, 2.0, 0.0])
+
+        resumed = start_or_resume_run(self.exam)
+        self.assertEqual(resumed.pk, run.pk)
+        seen = []
+        regrade(resumed, chunk_size=2, on_progress=lambda progress: seen.append(progress.submissions))
+
+        resumed.refresh_from_db()
+        self.assertEqual(seen, [2, 1])  # only what the interrupted run had not reached
+        self.assertEqual((resumed.status, resumed.processed_submissions, resumed.processed_answers), ("COMPLETED", 5, 5))
+        self.assertEqual(self.scores(), [2.0, 0.0, 2.0, 0.0, 2.0])
+        stats = ScoreStats.objects.get(exam=self.exam, question__isnull=True)
+        self.assertEqual((stats.count, stats.total), (5, 6.0))
+
+    def test_a_key_change_restarts_the_run(self):
+        self.change_key("A")
+        run = start_or_resume_run(self.exam)
+        self.interrupt_after_first_chunk(run)
+        self.change_key("B")
+
+        regrade(start_or_resume_run(self.exam), chunk_size=2)
+
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.answer_key_version, run.processed_submissions), ("COMPLETED", self.exam.content_version, 5))
+        self.assertEqual(self.scores(), [0.0, 2.0, 0.0, 2.0, 0.0])
+
+    def test_deadline_stops_between_chunks(self):
+        self.change_key("A")
+        run = regrade(start_or_resume_run(self.exam), chunk_size=2, deadline=0)
+
+        self.assertEqual((run.status, run.processed_submissions), ("RUNNING", 0))
+        self.assertEqual(self.scores(), [0.0, 2.0, 0.0, 2.0, 0.0])
+
+
+@override_settings(GRADING_ASYNC=True, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=0)
+class GradingQueueTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        for name in ("ada", "bo"):
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(name, password="pw"))
+            client.post("/api/submissions/create/", {"exam_id": self.exam.id, "answers": [
+                {"question_id": self.mcq.id, "selected_option": "B"},
+            ]}, format="json")
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def stats(self):
+        stats = ScoreStats.objects.get(exam=self.exam, question__isnull=True)
+        return stats.count, stats.total
+
+    def test_a_job_handed_to_another_worker_is_counted_once(self):
+        slow = claim_jobs("slow", 10)
+        # the slow worker looks dead, so its jobs go to another worker
+        GradingJob.objects.update(claimed_at=timezone.now() - timedelta(seconds=settings.GRADING_JOB_TIMEOUT_SECONDS + 1))
+        self.assertEqual(requeue_stale_jobs(), 2)
+        self.assertEqual(process_jobs(claim_jobs("fast", 10)), 2)
+
+        self.assertEqual(process_jobs(slow), 0)
+
+        self.assertEqual(self.stats(), (2, 4.0))
+        self.assertEqual(set(GradingJob.objects.values_list("status", "claimed_by")), {("DONE", "fast")})
+
+    def test_a_submission_regraded_before_its_job_is_counted_once(self):
+        regrade(start_or_resume_run(self.exam))
+        self.assertEqual(self.stats(), (2, 4.0))
+
+        self.assertEqual(process_jobs(claim_jobs("worker", 10)), 0)
+
+        self.assertEqual(self.stats(), (2, 4.0))
+        self.assertEqual(set(GradingJob.objects.values_list("status", flat=True)), {"DONE"})
+
+
+@override_settings(GRADING_ASYNC=False, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=0)
+class MovedQuestionTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.other = Exam.objects.create(title="Chemistry", course="CHEM101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        self.staff = APIClient()
+        self.staff.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("ada", password="pw"))
+        response = client.post("/api/submissions/create/", {"exam_id": self.exam.id, "answers": [
+            {"question_id": self.mcq.id, "selected_option": "B"},
+            {"question_id": self.short.id, "answer_text": "light energy"},
+        ]}, format="json")
+        self.submission_id = response.json()["data"]["id"]
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def test_moving_an_answered_question_is_refused(self):
+        response = self.staff.patch(f"/api/admin/questions/{self.mcq.id}/", {"exam": self.other.id}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Question.objects.get(pk=self.mcq.pk).exam_id, self.exam.id)
+
+    def test_moving_an_unanswered_question_is_allowed(self):
+        spare = Question.objects.create(exam=self.exam, question_type="MCQ", prompt="Spare", expected_answer="A", max_score=1)
+
+        response = self.staff.patch(f"/api/admin/questions/{spare.id}/", {"exam": self.other.id}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Question.objects.get(pk=spare.pk).exam_id, self.other.id)
+
+    def test_answers_outside_the_answer_key_score_zero(self):
+        # rows moved before the check existed (or behind the API's back) must not break grading
+        Question.objects.filter(pk=self.mcq.pk).update(exam=self.other)
+        Exam.objects.filter(pk__in=[self.exam.pk, self.other.pk]).bump_content_version()
+
+        regrade(start_or_resume_run(Exam.objects.get(pk=self.exam.pk)))
+
+        submission = Submission.objects.get(pk=self.submission_id)
+        self.assertEqual(submission.score, 2.0)
+        self.assertEqual(
+            dict(submission.answers.values_list("question_id", "feedback")),
+            {self.mcq.id: NOT_IN_ANSWER_KEY, self.short.id: "Keyword overlap: 2/3"},
+        )
+
+
+@skipIf(batch.np is None, "NumPy is not installed")
+class BatchGraderParityTests(SimpleTestCase):
+    def setUp(self):
+        questions = [
+            CompiledQuestion.compile(1, "MCQ", "B", 2),
+            CompiledQuestion.compile(2, "MCQ", "", 1),
+            CompiledQuestion.compile(3, "SHORT", "light energy sugar", 3),
+            CompiledQuestion.compile(4, "ESSAY", "the cell wall", 5),
+            CompiledQuestion.compile(5, "SHORT", "", 2),
+        ]
+        self.answer_key = CompiledAnswerKey(exam_id=1, version=1, questions={q.question_id: q for q in questions})
+
+    def row(self, sid, qid, text="", option="", stored=False):
+        return AnswerRow(
+            id=0, submission_id=sid, question_id=qid, answer_text="" if stored else text, selected_option=option,
+            token_fingerprint=fingerprint(text) if stored else b"", token_version=TOKENIZER_VERSION if stored else 0,
+        )
+
+    def test_vectorized_grades_match_the_scalar_grader(self):
+        rows = {
+            1: [self.row(1, 1, option="B"), self.row(1, 2, option="A"), self.row(1, 3, "Light, energy!"),
+                self.row(1, 4, "cell wall cell"), self.row(1, 5, "anything")],
+            2: [self.row(2, 1, option=" b "), self.row(2, 3, "sugar", stored=True), self.row(2, 4, "", stored=True)],
+            3: [self.row(3, 1, option="C"), self.row(3, 3, "light energy sugar", stored=True), self.row(3, 99, "moved")],
+            4: [],
+        }
+
+        vectorized = BatchGrader(self.answer_key).grade(rows)
+        scalar = {sid: self.answer_key.grade(answers) for sid, answers in rows.items()}
+
+        self.assertEqual(vectorized, scalar)
+        self.assertEqual({sid: r.total_score for sid, r in vectorized.items()}, {1: 9.0, 2: 3.0, 3: 3.0, 4: 0.0})
+
+    def test_empty_answer_key(self):
+        answer_key = CompiledAnswerKey(exam_id=1, version=1)
+        rows = {1: [self.row(1, 1, option="B"), self.row(1, 3, "light", stored=True)]}
+
+        self.assertEqual(BatchGrader(answer_key).grade(rows), {1: answer_key.grade(rows[1])})
+
+
+class GradingMemoTests(SimpleTestCase):
+    def row(self, qid, text="", option=""):
+        return AnswerRow(
+            id=0, submission_id=1, question_id=qid, answer_text="", selected_option=option,
+            token_fingerprint=fingerprint(text), token_version=TOKENIZER_VERSION,
+        )
+
+    def grade(self, memo, question, answer):
+        key = CompiledAnswerKey(exam_id=1, version=2, questions={question.question_id: question})
+        return key.grade([answer], memo=memo).per_question[0]
+
+    def test_key_edits_at_the_same_version_are_not_served_stale_grades(self):
+        memo = GradingMemo(maxsize=100)
+        self.assertEqual(self.grade(memo, CompiledQuestion.compile(7, "MCQ", "A", 2), self.row(7, option="B")).awarded_score, 0.0)
+
+        # same question id and content_version, but expected_answer (or max_score) changed
+        self.assertEqual(self.grade(memo, CompiledQuestion.compile(7, "MCQ", "B", 2), self.row(7, option="B")).awarded_score, 2.0)
+        self.assertEqual(self.grade(memo, CompiledQuestion.compile(7, "MCQ", "B", 5), self.row(7, option="B")).awarded_score, 5.0)
+
+        short = self.row(8, text="light energy")
+        self.assertEqual(self.grade(memo, CompiledQuestion.compile(8, "SHORT", "light sugar", 2), short).awarded_score, 1.0)
+        self.assertEqual(self.grade(memo, CompiledQuestion.compile(8, "SHORT", "light energy", 2), short).awarded_score, 2.0)
+        self.assertEqual(self.grade(memo, CompiledQuestion.compile(8, "SHORT", "light energy", 4), short).awarded_score, 4.0)
+
+    def test_repeated_answers_hit_the_memo(self):
+        memo = GradingMemo(maxsize=100)
+        question = CompiledQuestion.compile(7, "MCQ", "B", 2)
+        for _ in range(3):
+            self.grade(memo, CompiledQuestion.compile(7, "MCQ", "B", 2), self.row(7, option=" b"))
+
+        self.assertEqual(memo.stats()["hits"], 2)
+        self.assertEqual(memo.get(memo.key_for(question, self.row(7, option="B"))), (2.0, "Correct"))
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ExamRegradeView
+
+urlpatterns = [
+    path("admin/exams/<int:exam_id>/regrade/", ExamRegradeView.as_view(), name="exam-regrade"),
+]
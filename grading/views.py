@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+
+from assessments.models import Exam
+from assessments.permissions import IsStaff
+from .models import RegradeRun
+from .regrade import regrade, start_or_resume_run
+from .serializers import RegradeRequestSerializer, RegradeRunSerializer
+
+
+class ExamRegradeView(generics.GenericAPIView):
+    """
+    Staff: regrade an exam against its current answer key.
+    Each POST works for a bounded time slice and returns progress; POST again
+    until status is COMPLETED. Large exams are better served by `manage.py regrade_exam`.
+    """
+    permission_classes = [IsStaff]
+    serializer_class = RegradeRunSerializer
+
+    @extend_schema(tags=["Grading"], responses=RegradeRunSerializer)
+    def get(self, request, exam_id):
+        run = RegradeRun.objects.filter(exam_id=exam_id).order_by("-id").first()
+        if run is None:
+            raise NotFound("This exam has not been regraded yet.")
+        return Response(RegradeRunSerializer(run).data)
+
+    @extend_schema(tags=["Grading"], request=RegradeRequestSerializer, responses={200: RegradeRunSerializer, 202: RegradeRunSerializer})
+    def post(self, request, exam_id):
+        exam = get_object_or_404(Exam, pk=exam_id)
+        params = RegradeRequestSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+
+        run = start_or_resume_run(exam, requested_by=request.user, restart=params.validated_data["restart"])
+        deadline = time.monotonic() + settings.GRADING_REGRADE_REQUEST_SECONDS
+        run = regrade(run, deadline=deadline)
+
+        code = status.HTTP_200_OK if run.status == RegradeRun.Status.COMPLETED else status.HTTP_202_ACCEPTED
+        return Response(RegradeRunSerializer(run).data, status=code)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Submission, SubmissionAnswer
+from .models import IdempotencyKey, Submission, SubmissionAnswer
 
 @admin.register(Submission)
 class SubmissionAdmin(admin.ModelAdmin):
@@ -11,3 +11,8 @@ class SubmissionAdmin(admin.ModelAdmin):
 class SubmissionAnswerAdmin(admin.ModelAdmin):
     list_display = ("id", "submission", "question", "awarded_score")
     list_filter = ("question__question_type",)
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "key", "status_code", "created_at", "expires_at")
+    search_fields = ("user__username", "key")
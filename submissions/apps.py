@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class SubmissionsConfig(AppConfig):
     name = "submissions"
+
+    def ready(self):
+        from common import metrics
+        from . import signals  # noqa: F401
+        from .autosave import autosave_buffer, draft_owners
+        from .caches import graded_submission_cache
+
+        metrics.register("submissions.autosave", autosave_buffer.stats)
+        metrics.register("submissions.draft_owners", draft_owners.stats)
+        metrics.register("submissions.graded_detail", graded_submission_cache.stats)
@@ -0,0 +1,258 @@
+# Write-behind buffer for autosaved draft answers.
+#
+# Autosave requests only record the latest (answer_text, selected_option) per
+# (submission, question) in memory; a background thread writes the buffer out every
+# SUBMISSION_AUTOSAVE_FLUSH_SECONDS as one batched upsert. Repeated saves of the same
+# question between flushes collapse into a single row write.
+#
+# The buffer is per process: at most one flush interval of drafts is lost if a process
+# dies. Each process with a buffer keeps an AutosaveWorker row whose flushed_at moves on
+# every flush, in the same transaction as the drafts, and an AutosaveDraft row per
+# submission it has buffered. A submit waits until the other live buffers holding drafts
+# of that submission have flushed after the submit began (wait_for_other_buffers), so
+# drafts held by another process are stored before the submission is graded.
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from assessments.models import Question
+from common.caches import LRUCache
+from grading.services import TOKENIZER_VERSION, fingerprint
+from .models import AutosaveDraft, AutosaveWorker, Submission, SubmissionAnswer
+
+logger = logging.getLogger(__name__)
+
+# submission_id -> {question_id: (question_type, answer_text, selected_option)}
+DraftValue = Tuple[str, str, str]
+Drafts = Dict[int, Dict[int, DraftValue]]
+
+# a buffer that has not flushed for two intervals plus this long is taken to be dead
+LIVENESS_GRACE_SECONDS = 5.0
+
+# submission_id -> (student_id, exam_id) for drafts this process has seen, so autosaves
+# do not need to load the submission; status is re-checked at flush time
+draft_owners = LRUCache(maxsize=getattr(settings, "SUBMISSION_AUTOSAVE_DRAFT_CACHE_SIZE", 10_000))
+
+
+def worker_name() -> str:
+    # evaluated per call: forked servers share the parent's module state
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class AutosaveBuffer:
+    def __init__(self, interval: float = None, name: str = None):
+        # None: follow settings.SUBMISSION_AUTOSAVE_FLUSH_SECONDS / this process's worker_name()
+        self.interval = interval
+        self.name = name
+        self._pending: Drafts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        # submissions this buffer has an AutosaveDraft row for
+        self._marked = LRUCache(maxsize=getattr(settings, "SUBMISSION_AUTOSAVE_DRAFT_CACHE_SIZE", 10_000))
+        self.saves = 0
+        self.rows_written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def _interval(self) -> float:
+        if self.interval is not None:
+            return self.interval
+        return getattr(settings, "SUBMISSION_AUTOSAVE_FLUSH_SECONDS", 5)
+
+    def _name(self) -> str:
+        return self.name or worker_name()
+
+    def put(self, submission_id: int, answers: Iterable[Tuple[int, str, str, str]]) -> int:
+        """Buffers (question_id, question_type, answer_text, selected_option) tuples."""
+        if self._interval() > 0:
+            # registered before the drafts are buffered, so a submit never misses them
+            self._ensure_thread()
+            self._mark(submission_id)
+        count = 0
+        with self._lock:
+            drafts = self._pending.setdefault(submission_id, {})
+            for question_id, question_type, answer_text, selected_option in answers:
+                drafts[question_id] = (question_type, answer_text, selected_option)
+                count += 1
+            self.saves += count
+        if self._interval() <= 0:
+            self.flush()
+        return count
+
+    def has_pending(self, submission_id: int) -> bool:
+        with self._lock:
+            return submission_id in self._pending
+
+    def _take(self, submission_id: int = None) -> Drafts:
+        with self._lock:
+            if submission_id is None:
+                taken, self._pending = self._pending, {}
+            elif submission_id in self._pending:
+                taken = {submission_id: self._pending.pop(submission_id)}
+            else:
+                taken = {}
+        return taken
+
+    def flush(self, submission_id: int = None, heartbeat: bool = False) -> int:
+        """
+        Upserts buffered drafts (all of them, or one submission's) and returns the number
+        of rows written. Drafts of submissions that are no longer IN_PROGRESS are dropped.
+        With heartbeat, also records in this buffer's AutosaveWorker row that everything
+        buffered until the flush began is now stored.
+        """
+        with self._flush_lock:
+            taken_at = timezone.now()
+            taken = self._take(submission_id)
+            if not taken and not heartbeat:
+                return 0
+            try:
+                with transaction.atomic():
+                    written = self._write(taken) if taken else 0
+                    if heartbeat:
+                        self._beat(taken_at)
+            except Exception:
+                # keep the drafts for the next attempt unless newer saves replaced them
+                with self._lock:
+                    for sid, drafts in taken.items():
+                        pending = self._pending.setdefault(sid, {})
+                        for qid, value in drafts.items():
+                            pending.setdefault(qid, value)
+                raise
+            if taken:
+                buffered = sum(len(drafts) for drafts in taken.values())
+                self.flushes += 1
+                self.rows_written += written
+                self.dropped += buffered - written
+            return written
+
+    def _write(self, drafts: Drafts) -> int:
+        open_ids = set(
+            Submission.objects
+            .filter(id__in=list(drafts), status=Submission.Status.IN_PROGRESS)
+            .values_list("id", flat=True)
+        )
+        # autosaves are checked against a cached answer key; skip questions deleted since
+        question_ids = {qid for answers in drafts.values() for qid in answers}
+        live_questions = set(Question.objects.filter(id__in=question_ids).values_list("id", flat=True))
+        rows = []
+        for sid, answers in drafts.items():
+            if sid not in open_ids:
+                continue
+            for qid, (question_type, answer_text, selected_option) in answers.items():
+                if qid not in live_questions:
+                    continue
+                row = SubmissionAnswer(
+                    submission_id=sid, question_id=qid, answer_text=answer_text, selected_option=selected_option,
+                )
+                if question_type != "MCQ":
+                    row.token_fingerprint = fingerprint(answer_text)
+                    row.token_version = TOKENIZER_VERSION
+                rows.append(row)
+        if rows:
+            SubmissionAnswer.objects.bulk_create(
+                rows,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["submission", "question"],
+                update_fields=["answer_text", "selected_option", "token_fingerprint", "token_version"],
+            )
+        return len(rows)
+
+    def _beat(self, flushed_at):
+        AutosaveWorker.objects.update_or_create(
+            name=self._name(), defaults={"flushed_at": flushed_at, "interval": self._interval()},
+        )
+
+    def _mark(self, submission_id: int):
+        if self._marked.get(submission_id) is None:
+            AutosaveDraft.objects.bulk_create(
+                [AutosaveDraft(worker=self._name(), submission_id=submission_id)], ignore_conflicts=True,
+            )
+            self._marked.set(submission_id, True)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # nothing is buffered yet, so this counts as a flush
+            self._beat(timezone.now())
+            self._thread = threading.Thread(target=self._run, name="autosave-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval()):
+            try:
+                self.flush(heartbeat=True)
+            except Exception:
+                logger.exception("Autosave flush failed; drafts kept for the next interval")
+            finally:
+                close_old_connections()
+
+    def retire(self):
+        """Stops the flush thread after a final flush and removes this buffer's worker row."""
+        self._stop.set()
+        self.flush()
+        if self._thread is not None:
+            AutosaveWorker.objects.filter(name=self._name()).delete()
+            AutosaveDraft.objects.filter(worker=self._name()).delete()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(len(drafts) for drafts in self._pending.values())
+        return {
+            "pending": pending,
+            "saves": self.saves,
+            "rows_written": self.rows_written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "coalesced": max(0, self.saves - self.rows_written - self.dropped - pending),
+        }
+
+
+autosave_buffer = AutosaveBuffer()
+
+
+def wait_for_other_buffers(submission_id: int, since, poll: float = 0.05) -> None:
+    """
+    Blocks until every other live autosave buffer that has held drafts of the submission
+    has flushed after `since`, i.e. has stored the drafts it held at that moment. Returns
+    after one query when no other buffer has. A buffer that stopped flushing for two
+    intervals (plus LIVENESS_GRACE_SECONDS) belongs to a dead process and is not waited
+    for, which also bounds the wait. Call outside a transaction: the flushes need to write.
+    """
+    own = autosave_buffer._name()
+    workers = list(
+        AutosaveDraft.objects.filter(submission_id=submission_id).exclude(worker=own).values_list("worker", flat=True)
+    )
+    while workers:
+        now = timezone.now()
+        behind = [
+            (flushed_at, interval)
+            for flushed_at, interval in AutosaveWorker.objects.filter(name__in=workers, flushed_at__lt=since)
+            .values_list("flushed_at", "interval")
+            if flushed_at + timedelta(seconds=2 * interval + LIVENESS_GRACE_SECONDS) > now
+        ]
+        if not behind:
+            return
+        time.sleep(poll)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        autosave_buffer.retire()
+    except Exception:
+        logger.exception("Autosave flush at exit failed")
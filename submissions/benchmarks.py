@@ -0,0 +1,133 @@
+# Response rendering benchmark on synthetic submission list pages. Driven by
+# `manage.py benchmark_renderer`; results are plain dicts so runs can be saved as JSON.
+import platform
+import random
+import statistics
+import string
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from common.renderers import EnvelopeJSONRenderer, PreRendered, encode, orjson
+
+
+@dataclass
+class RenderSpec:
+    pages: int = 20
+    page_size: int = 200  # submissions per page (the list endpoint's max_page_size)
+    answers: int = 20  # answers per submission, as with ?include=answers
+    answer_words: int = 40
+    repeat: int = 5
+    seed: int = 42
+
+
+def synthetic_pages(spec: RenderSpec) -> List[dict]:
+    """List responses shaped like SubmissionListView with ?include=answers."""
+    rng = random.Random(spec.seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(2000)]
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    pages = []
+    sid = 0
+    for page in range(spec.pages):
+        results = []
+        for _ in range(spec.page_size):
+            sid += 1
+            submitted = started + timedelta(seconds=sid * 37)
+            answers = []
+            for qid in range(1, spec.answers + 1):
+                mcq = qid % 3 == 0
+                answers.append({
+                    "id": sid * 100 + qid,
+                    "question_id": qid,
+                    "question_prompt": f"Question {qid}: " + " ".join(rng.choices(words, k=8)),
+                    "question_type": "MCQ" if mcq else "SHORT",
+                    "max_score": 2,
+                    "answer_text": "" if mcq else " ".join(rng.choices(words, k=spec.answer_words)),
+                    "selected_option": rng.choice("ABCD") if mcq else "",
+                    "awarded_score": round(rng.random() * 2, 2),
+                    "feedback": "Correct" if mcq else f"Keyword overlap: {rng.randint(0, 5)}/5",
+                })
+            results.append({
+                "id": sid,
+                "exam_id": 1,
+                "exam_title": "Benchmark",
+                "course": "BENCH",
+                "status": "GRADED",
+                "grading_state": "GRADED",
+                "queue_position": None,
+                "submitted_at": submitted.isoformat().replace("+00:00", "Z"),
+                "graded_at": (submitted + timedelta(seconds=2)).isoformat().replace("+00:00", "Z"),
+                "score": round(sum(a["awarded_score"] for a in answers), 2),
+                "grade_letter": "C",
+                "answers": answers,
+                "percentile": round(rng.random() * 100, 1),
+            })
+        pages.append({"next": f"http://testserver/api/submissions/?cursor=page{page + 1}", "previous": None, "results": results})
+    return pages
+
+
+def _stdlib_envelope(data, context) -> bytes:
+    # what the envelope renderer did before: wrap in a new dict, encode with the stdlib
+    return JSONRenderer().render({"status": True, "message": "Success", "data": data}, None, context)
+
+
+def _envelope(data, context) -> bytes:
+    return EnvelopeJSONRenderer().render(data, None, context)
+
+
+STAGES: Dict[str, Callable] = {
+    "stdlib": _stdlib_envelope,
+    "envelope": _envelope,
+    "spliced": _envelope,  # pages are cached payload bytes, as served by a response cache
+}
+
+
+def bench_stage(stage: str, pages: List[dict], repeat: int) -> dict:
+    render = STAGES[stage]
+    if stage == "spliced":
+        pages = [PreRendered(encode(page)) for page in pages]
+    context = {"response": Response(status=200)}
+
+    timings, total_bytes = [], 0
+    for _ in range(repeat):
+        for page in pages:
+            started = time.perf_counter()
+            body = render(page, context)
+            timings.append(time.perf_counter() - started)
+            total_bytes += len(body)
+
+    elapsed = sum(timings)
+    timings.sort()
+    return {
+        "pages": len(timings),
+        "bytes": total_bytes,
+        "mb_per_sec": round(total_bytes / elapsed / 1e6, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 3),
+    }
+
+
+def run_benchmarks(spec: RenderSpec, stages: List[str]) -> dict:
+    pages = synthetic_pages(spec)
+    context = {"response": Response(status=200)}
+    identical = _envelope(pages[0], context) == _stdlib_envelope(pages[0], context)
+    results = {stage: bench_stage(stage, pages, spec.repeat) for stage in stages}
+    baseline = results.get("stdlib")
+    if baseline:
+        for result in results.values():
+            result["speedup"] = round(result["mb_per_sec"] / baseline["mb_per_sec"], 2)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "orjson": getattr(orjson, "__version__", None),
+            "identical_output": identical,
+            "spec": asdict(spec),
+        },
+        "results": results,
+    }
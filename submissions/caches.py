@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import transaction
+
+from common.caches import SingleFlightCache
+from .models import Submission
+
+# encoded detail payloads of GRADED submissions, without their percentile:
+# (student_id, exam_id, score, stamp, payload bytes) per submission.
+# Graded submissions only change when they are regraded or their exam is edited. A regrade
+# in this process drops the entries it touched, but one in another process (grading_worker,
+# regrade_exam, another web worker) cannot reach a per-process cache, so an entry is only
+# served while graded_stamp() still matches the stamp it was stored with.
+graded_submission_cache = SingleFlightCache(
+    "submission-detail-payload", timeout=getattr(settings, "SUBMISSION_DETAIL_CACHE_SECONDS", 24 * 3600),
+)
+
+
+def graded_stamp(submission_id):
+    """(graded_at, score, exam content_version) of a GRADED submission, or None: one indexed lookup."""
+    return (
+        Submission.objects
+        .filter(pk=submission_id, status=Submission.Status.GRADED)
+        .values_list("graded_at", "score", "exam__content_version")
+        .first()
+    )
+
+
+def invalidate_graded_submissions(submission_ids):
+    # after commit, so a concurrent request cannot re-cache the pre-regrade rows
+    keys = [graded_submission_cache.key(sid) for sid in submission_ids]
+    if keys:
+        transaction.on_commit(lambda: graded_submission_cache.delete_many(keys))
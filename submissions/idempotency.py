@@ -0,0 +1,88 @@
+# Idempotency-Key support: the first response to a keyed request is stored (status and
+# rendered body) and replayed to retries without running the view again.
+import hashlib
+import json
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+def idempotency_key(request) -> Optional[str]:
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({HEADER: f"Must be 1 to {MAX_KEY_LENGTH} characters."})
+    return key
+
+
+def request_hash(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def replay(user, key: str, req_hash: str) -> Optional[HttpResponse]:
+    """The stored response for (user, key), or None if there is none or it expired."""
+    stored = (
+        IdempotencyKey.objects
+        .filter(user=user, key=key)
+        .values_list("id", "request_hash", "status_code", "body", "expires_at")
+        .first()
+    )
+    if stored is None:
+        return None
+    pk, stored_hash, status_code, body, expires_at = stored
+    if expires_at <= timezone.now():
+        IdempotencyKey.objects.filter(pk=pk).delete()
+        return None
+    if stored_hash != req_hash:
+        raise IdempotencyKeyReused()
+
+    response = HttpResponse(bytes(body), status=status_code, content_type="application/json")
+    response[REPLAY_HEADER] = "true"
+    return response
+
+
+def remember(user, key: str, req_hash: str, response) -> None:
+    """Stores a rendered response. Server errors are not stored so they can be retried."""
+    if response.status_code >= 500:
+        return
+    if hasattr(response, "render") and not response.is_rendered:
+        response.render()
+    ttl = timedelta(seconds=getattr(settings, "SUBMISSION_IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=req_hash,
+                status_code=response.status_code,
+                body=response.content,
+                expires_at=timezone.now() + ttl,
+            )
+    except IntegrityError:
+        # a concurrent request with the same key stored its response first; keep that one
+        pass
+
+
+def purge_expired() -> int:
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
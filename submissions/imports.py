@@ -0,0 +1,200 @@
+# Streaming import of offline / paper answer sheets for one exam.
+#
+# Input is read record by record (never loaded whole), validated in batches against the
+# exam's answer key, graded with the batch grader and inserted with bulk_create. The
+# caller receives a generator of report entries: one per rejected record plus a summary.
+import csv
+import json
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from analytics.services import record_grades
+from grading.answer_keys import get_answer_key
+from grading.batch import BatchGrader
+from grading.services import TOKENIZER_VERSION, fingerprint, letter_grade
+from .models import Submission, SubmissionAnswer
+
+IMPORT_FORMATS = ("ndjson", "csv")
+CSV_COLUMNS = ("student", "question_id", "answer_text", "selected_option")
+
+# a record is (row number, {"student": username, "answers": [...]}) or (row number, error message)
+Record = Tuple[int, object]
+
+
+def detect_format(name: str = "", content_type: str = "") -> str:
+    name = (name or "").lower()
+    if name.endswith(".csv") or "csv" in (content_type or ""):
+        return "csv"
+    return "ndjson"
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[Record]:
+    return read_csv(lines) if fmt == "csv" else read_ndjson(lines)
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[Record]:
+    for row, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield row, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield row, "Each line must be a JSON object"
+            continue
+        yield row, record
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Record]:
+    """One answer per CSV row; consecutive rows of the same student form one submission."""
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or not {"student", "question_id"}.issubset(reader.fieldnames):
+        yield 1, f"CSV header must include: {', '.join(CSV_COLUMNS)}"
+        return
+
+    numbered = ((reader.line_num, r) for r in reader)
+    for student, group in groupby(numbered, key=lambda item: (item[1].get("student") or "").strip()):
+        group = list(group)
+        yield group[0][0], {
+            "student": student,
+            "answers": [
+                {
+                    "question_id": r.get("question_id"),
+                    "answer_text": r.get("answer_text") or "",
+                    "selected_option": r.get("selected_option") or "",
+                }
+                for _, r in group
+            ],
+        }
+
+
+def _record_errors(record, answer_key) -> Dict[str, str]:
+    # same rules as SubmissionCreateSerializer, checked against the cached answer key
+    if not isinstance(record.get("student"), str) or not record["student"].strip():
+        return {"student": "This field is required."}
+    answers = record.get("answers")
+    if not isinstance(answers, list) or not answers:
+        return {"answers": "At least one answer is required"}
+
+    seen = set()
+    for a in answers:
+        if not isinstance(a, dict):
+            return {"answers": "Each answer must be an object"}
+        try:
+            qid = int(a.get("question_id"))
+        except (TypeError, ValueError):
+            return {"answers": f"Invalid question_id: {a.get('question_id')!r}"}
+        if qid in seen:
+            return {"answers": "Duplicate question_id in answers payload"}
+        seen.add(qid)
+        q = answer_key.questions.get(qid)
+        if q is None:
+            return {"answers": f"Questions not in this exam: [{qid}]"}
+        for field in ("answer_text", "selected_option"):
+            if a.get(field) is not None and not isinstance(a[field], str):
+                return {"answers": f"Question {qid}: {field} must be a string"}
+        if q.question_type == "MCQ" and not a.get("selected_option"):
+            return {"answers": f"MCQ question {qid} requires selected_option"}
+        if q.question_type != "MCQ" and not a.get("answer_text"):
+            return {"answers": f"Question {qid} requires answer_text"}
+    return {}
+
+
+def _import_batch(exam, answer_key, grader, batch: List[Record], report: dict) -> Iterator[dict]:
+    User = get_user_model()
+    usernames = {r["student"].strip() for _, r in batch if isinstance(r, dict) and isinstance(r.get("student"), str)}
+    students = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+    already = set(
+        Submission.objects.filter(exam=exam, student_id__in=students.values()).values_list("student_id", flat=True)
+    )
+
+    accepted = []
+    for row, record in batch:
+        errors = {"non_field_errors": record} if isinstance(record, str) else _record_errors(record, answer_key)
+        student_id = None
+        if not errors:
+            student_id = students.get(record["student"].strip())
+            if student_id is None:
+                errors = {"student": f"Unknown student {record['student']!r}"}
+            elif student_id in already:
+                errors = {"exam_id": "This student has already submitted for this exam."}
+        if errors:
+            report["failed"] += 1
+            yield {"row": row, "status": "error", "errors": errors}
+            continue
+        already.add(student_id)
+        accepted.append((row, student_id, record["answers"]))
+
+    if not accepted:
+        return
+
+    now = timezone.now()
+    submissions, answers_by_index = [], {}
+    for index, (row, student_id, answers) in enumerate(accepted):
+        submissions.append(Submission(
+            student_id=student_id, exam=exam, status=Submission.Status.GRADED, submitted_at=now, graded_at=now,
+        ))
+        objs = []
+        for a in answers:
+            qid = int(a["question_id"])
+            text = a.get("answer_text") or ""
+            answer = SubmissionAnswer(question_id=qid, answer_text=text, selected_option=a.get("selected_option") or "")
+            if answer_key.questions[qid].question_type != "MCQ":
+                answer.token_fingerprint = fingerprint(text)
+                answer.token_version = TOKENIZER_VERSION
+            objs.append(answer)
+        answers_by_index[index] = objs
+
+    results = grader.grade(answers_by_index)
+    for index, submission in enumerate(submissions):
+        result = results[index]
+        submission.score = result.total_score
+        submission.grade_letter = letter_grade(result.total_score)
+        for answer, g in zip(answers_by_index[index], result.per_question):
+            answer.awarded_score = g.awarded_score
+            answer.feedback = g.feedback
+
+    try:
+        with transaction.atomic():
+            Submission.objects.bulk_create(submissions)
+            all_answers = []
+            for index, submission in enumerate(submissions):
+                for answer in answers_by_index[index]:
+                    answer.submission = submission
+                    all_answers.append(answer)
+            SubmissionAnswer.objects.bulk_create(all_answers, batch_size=1000)
+            record_grades(answer_key, answers_by_index, results)
+    except IntegrityError:
+        # one of the students submitted after the batch was checked; nothing was kept
+        report["failed"] += len(accepted)
+        for row, _, _ in accepted:
+            yield {"row": row, "status": "error", "errors": {"non_field_errors": "Batch not saved: a student submitted concurrently. Retry these rows."}}
+        return
+    report["created"] += len(submissions)
+
+
+def import_submissions(exam, records: Iterable[Record], batch_size: int = 500) -> Iterator[dict]:
+    """
+    Imports records for `exam`, batch by batch. Yields {"row", "status": "error", "errors"}
+    for every rejected record and finally {"status": "done", "created", "failed"}.
+    Every batch commits on its own, so a failure late in a file keeps earlier rows.
+    """
+    answer_key = get_answer_key(exam.id, exam.content_version)
+    grader = BatchGrader(answer_key)
+    report = {"created": 0, "failed": 0}
+
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        yield from _import_batch(exam, answer_key, grader, batch, report)
+
+    yield {"status": "done", **report}
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from submissions.benchmarks import STAGES, RenderSpec, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark response rendering on synthetic submission list pages: the stdlib encoder, "
+        "the envelope renderer (orjson when installed) and cached payloads spliced into the envelope."
+    )
+
+    def add_arguments(self, parser):
+        defaults = RenderSpec()
+        parser.add_argument("--pages", type=int, default=defaults.pages)
+        parser.add_argument("--page-size", type=int, default=defaults.page_size, help="Submissions per page.")
+        parser.add_argument("--answers", type=int, default=defaults.answers, help="Answers per submission.")
+        parser.add_argument("--answer-words", type=int, default=defaults.answer_words)
+        parser.add_argument("--repeat", type=int, default=defaults.repeat, help="Times every page is rendered.")
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated subset of: {', '.join(STAGES)}")
+        parser.add_argument("--output", help="Write JSON results to this file (default: stdout).")
+
+    def handle(self, *args, **options):
+        stages = [s.strip() for s in options["stages"].split(",") if s.strip()]
+        unknown = [s for s in stages if s not in STAGES]
+        if unknown:
+            raise CommandError(f"Unknown stages: {', '.join(unknown)}")
+
+        spec = RenderSpec(
+            pages=options["pages"],
+            page_size=options["page_size"],
+            answers=options["answers"],
+            answer_words=options["answer_words"],
+            repeat=options["repeat"],
+            seed=options["seed"],
+        )
+        report = run_benchmarks(spec, stages)
+
+        for stage, result in report["results"].items():
+            speedup = f"  x{result['speedup']}" if "speedup" in result else ""
+            self.stderr.write(
+                f"{stage:>10}: {result['mb_per_sec']:>10,.1f} MB/s  "
+                f"p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms per page{speedup}"
+            )
+
+        body = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(body + "\n")
+        else:
+            self.stdout.write(body)
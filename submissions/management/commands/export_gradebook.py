@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Exam
+from submissions.exports import EXPORT_FORMATS, export_gradebook
+
+
+class Command(BaseCommand):
+    help = "Stream an exam's gradebook (one row per submission) as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument("--output", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--per-question", action="store_true", help="Add a score column per question.")
+        parser.add_argument("--out", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options["exam_id"])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam_id']} not found")
+
+        lines = export_gradebook(exam, output=options["output"], per_question=options["per_question"])
+        if options["out"]:
+            with open(options["out"], "w", newline="") as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,48 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Exam
+from submissions.imports import IMPORT_FORMATS, detect_format, import_submissions, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Import offline answer sheets for an exam from an NDJSON file (one {\"student\", \"answers\"} "
+        "object per line) or a CSV file (student,question_id,answer_text,selected_option). "
+        "Rejected rows are reported as NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument("path", help="Input file, or - for stdin.")
+        parser.add_argument("--input-format", choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--report", help="Write the error report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options["exam_id"])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam_id']} not found")
+
+        path = options["path"]
+        fmt = options["input_format"] or detect_format(path)
+        source = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        report = open(options["report"], "w") if options["report"] else self.stdout
+        try:
+            for entry in import_submissions(exam, read_records(source, fmt), batch_size=options["batch_size"]):
+                if entry["status"] == "done":
+                    summary = entry
+                else:
+                    report.write(json.dumps(entry) + "\n")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if report is not self.stdout:
+                report.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created']} submissions, rejected {summary['failed']} rows"
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("submissions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submissionanswer",
+            name="token_fingerprint",
+            field=models.BinaryField(blank=True, default=b""),
+        ),
+        migrations.AddField(
+            model_name="submissionanswer",
+            name="token_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("submissions", "0003_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AutosaveWorker",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("flushed_at", models.DateTimeField()),
+                ("interval", models.FloatField()),
+            ],
+        ),
+    ]
@@ -40,6 +40,11 @@ class SubmissionAnswer(models.Model):
     answer_text = models.TextField(blank=True, default="")
     selected_option = models.CharField(max_length=255, blank=True, default="")
 
+    # answer_text normalized once at submission time (grading.services.fingerprint);
+    # only trusted while token_version matches grading.services.TOKENIZER_VERSION
+    token_fingerprint = models.BinaryField(blank=True, default=b"")
+    token_version = models.PositiveIntegerField(default=0)
+
     awarded_score = models.FloatField(default=0.0)
     feedback = models.TextField(blank=True, default="")
 
@@ -50,3 +55,57 @@ class SubmissionAnswer(models.Model):
 
     def __str__(self):
         return f"Answer({self.id}) sub={self.submission_id} q={self.question_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a request sent with an Idempotency-Key header, replayed verbatim
+    to retries of the same request until expires_at.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    body = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_user_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"IdempotencyKey({self.key}) user={self.user_id} status={self.status_code}"
+
+
+class AutosaveWorker(models.Model):
+    """
+    A process with an autosave buffer (submissions.autosave). flushed_at is when its last
+    flush took the buffered drafts, so a submit handled elsewhere can wait until every live
+    buffer has written what it held when the submit began.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    flushed_at = models.DateTimeField()
+    interval = models.FloatField()
+
+    def __str__(self):
+        return f"AutosaveWorker({self.name}) flushed_at={self.flushed_at}"
+
+
+class AutosaveDraft(models.Model):
+    """
+    Marks that the autosave buffer of AutosaveWorker `worker` has held drafts of a
+    submission, so a submit only waits for the buffers that may still hold its drafts.
+    Written once per buffer and submission, before its first draft is buffered.
+    """
+    worker = models.CharField(max_length=255)
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["submission", "worker"], name="uniq_autosave_draft_worker"),
+        ]
+
+    def __str__(self):
+        return f"AutosaveDraft({self.worker}) sub={self.submission_id}"
@@ -1,6 +1,17 @@
+from typing import Optional
+
+from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from rest_framework import serializers
+from analytics.services import percentile_rank, record_grades
 from assessments.models import Exam, Question
+from common.serializers import SparseFieldsMixin
+from grading.answer_keys import get_answer_key
+from grading.models import GradingJob
+from grading.queue import queue_position, queue_positions
+from grading.services import TOKENIZER_VERSION, MockGradingService, fingerprint, letter_grade
+from .exports import EXPORT_FORMATS
+from .imports import IMPORT_FORMATS
 from .models import Submission, SubmissionAnswer
 
 class SubmissionAnswerInputSerializer(serializers.Serializer):
@@ -15,71 +26,100 @@ class SubmissionCreateSerializer(serializers.Serializer):
     def validate(self, attrs):
         exam_id = attrs["exam_id"]
         answers = attrs["answers"]
+        question_ids = [a["question_id"] for a in answers]
 
-        try:
-            exam = Exam.objects.get(id=exam_id)
-        except Exam.DoesNotExist:
+        # one query loads the answered questions together with their exam
+        questions = {
+            q.id: q for q in
+            Question.objects
+            .select_related("exam")
+            .defer("expected_answer", "options")
+            .filter(exam_id=exam_id, id__in=question_ids)
+        }
+        if questions:
+            exam = next(iter(questions.values())).exam
+        else:
+            exam = Exam.objects.filter(id=exam_id).first()
+        if exam is None:
             raise serializers.ValidationError({"exam_id": "Exam not found"})
 
         if not answers:
             raise serializers.ValidationError({"answers": "At least one answer is required"})
 
-        question_ids = [a["question_id"] for a in answers]
         if len(question_ids) != len(set(question_ids)):
             raise serializers.ValidationError({"answers": "Duplicate question_id in answers payload"})
 
         # Ensure questions belong to this exam
-        valid_questions = Question.objects.filter(exam=exam, id__in=question_ids).values_list("id", flat=True)
-        valid_questions_set = set(valid_questions)
-        missing = [qid for qid in question_ids if qid not in valid_questions_set]
+        missing = [qid for qid in question_ids if qid not in questions]
         if missing:
             raise serializers.ValidationError({"answers": f"Questions not in this exam: {missing}"})
 
-        attrs["exam"] = exam
-        request = self.context.get("request")
-        if request and request.user and request.user.is_authenticated:
-            if Submission.objects.filter(student=request.user, exam=attrs["exam"]).exists():
-                raise serializers.ValidationError({
-                    "exam_id": "You have already submitted for this exam."
-                })
+        # Basic per-type validation
+        for a in answers:
+            q = questions[a["question_id"]]
+            if q.question_type == "MCQ" and not a.get("selected_option"):
+                raise serializers.ValidationError({"answers": f"MCQ question {q.id} requires selected_option"})
+            if q.question_type in ("SHORT", "ESSAY") and not a.get("answer_text"):
+                raise serializers.ValidationError({"answers": f"Question {q.id} requires answer_text"})
 
+        # a repeat submission is rejected by uniq_student_exam_submission on insert
+        attrs["exam"] = exam
+        attrs["questions"] = questions
         return attrs
 
     def create(self, validated_data):
+        """
+        Builds and (unless grade=False is passed to save()) grades the submission in memory,
+        then writes it with one INSERT for the submission and one bulk INSERT for its answers.
+        The returned submission has its answers, questions and exam attached, so it can be
+        serialized without further queries.
+        """
         request = self.context["request"]
         exam = validated_data["exam"]
-        answers = validated_data["answers"]
+        questions = validated_data["questions"]
+        now = timezone.now()
 
-        submission = Submission.objects.create(
+        submission = Submission(
             student=request.user,
             exam=exam,
             status=Submission.Status.SUBMITTED,
-            submitted_at=timezone.now(),
+            submitted_at=now,
         )
 
-        # Create answers
-        questions = {q.id: q for q in Question.objects.filter(exam=exam, id__in=[a["question_id"] for a in answers])}
-
         answer_objs = []
-        for a in answers:
+        for a in validated_data["answers"]:
             q = questions[a["question_id"]]
             answer_text = a.get("answer_text", "") or ""
-            selected_option = a.get("selected_option", "") or ""
-
-            # Basic per-type validation
-            if q.question_type == "MCQ" and not selected_option:
-                raise serializers.ValidationError({"answers": f"MCQ question {q.id} requires selected_option"})
-            if q.question_type in ("SHORT", "ESSAY") and not answer_text:
-                raise serializers.ValidationError({"answers": f"Question {q.id} requires answer_text"})
-
-            answer_objs.append(SubmissionAnswer(
-                submission=submission,
+            answer = SubmissionAnswer(
                 question=q,
                 answer_text=answer_text,
-                selected_option=selected_option,
-            ))
+                selected_option=a.get("selected_option", "") or "",
+            )
+            if q.question_type != "MCQ":
+                answer.token_fingerprint = fingerprint(answer_text)
+                answer.token_version = TOKENIZER_VERSION
+            answer_objs.append(answer)
+
+        answer_key = None
+        if validated_data.get("grade", True):
+            answer_key = get_answer_key(exam.id, exam.content_version)
+            result = MockGradingService().grade_answers(answer_objs, answer_key)
+            for answer, g in zip(answer_objs, result.per_question):
+                answer.awarded_score = g.awarded_score
+                answer.feedback = g.feedback
+            submission.score = result.total_score
+            submission.grade_letter = letter_grade(result.total_score)
+            submission.graded_at = now
+            submission.status = Submission.Status.GRADED
 
+        submission.save(force_insert=True)
+        for answer in answer_objs:
+            answer.submission = submission
         SubmissionAnswer.objects.bulk_create(answer_objs)
+        if answer_key is not None:
+            record_grades(answer_key, {submission.id: answer_objs}, {submission.id: result})
+
+        submission._prefetched_objects_cache = {"answers": answer_objs}
         return submission
 
 
@@ -103,22 +143,123 @@ class SubmissionAnswerDetailSerializer(serializers.ModelSerializer):
         ]
 
 
-class SubmissionDetailSerializer(serializers.ModelSerializer):
+class SubmissionSummaryListSerializer(serializers.ListSerializer):
+    """Looks up the queue positions of a whole page in one query instead of one per row."""
+
+    def to_representation(self, data):
+        submissions = list(data.all() if hasattr(data, "all") else data)
+        if "queue_position" in self.child.fields:
+            jobs = (self.child._grading_job(s) for s in submissions)
+            self.child.queue_positions = queue_positions(
+                job.id for job in jobs if job is not None and job.status == GradingJob.Status.QUEUED
+            )
+        return super().to_representation(submissions)
+
+
+class SubmissionSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """A submission without its answers: what list pages and dashboards need."""
     exam_title = serializers.CharField(source="exam.title", read_only=True)
     course = serializers.CharField(source="exam.course", read_only=True)
-    answers = SubmissionAnswerDetailSerializer(many=True, read_only=True)
+    grading_state = serializers.SerializerMethodField()
+    queue_position = serializers.SerializerMethodField()
+
+    # filled in for a whole page by SubmissionSummaryListSerializer
+    queue_positions = None
+
+    # model columns (and relations) each field reads, so list querysets can load only those
+    field_columns = {
+        "exam_id": ["exam_id"],
+        "exam_title": ["exam__title"],
+        "course": ["exam__course"],
+        "status": ["status"],
+        "grading_state": ["status", "grading_job__status"],
+        "queue_position": ["status", "grading_job__id", "grading_job__status"],
+        "submitted_at": ["submitted_at"],
+        "graded_at": ["graded_at"],
+        "score": ["score"],
+        "grade_letter": ["grade_letter"],
+    }
 
     class Meta:
         model = Submission
+        list_serializer_class = SubmissionSummaryListSerializer
         fields = [
             "id",
             "exam_id",
             "exam_title",
             "course",
             "status",
+            "grading_state",
+            "queue_position",
             "submitted_at",
             "graded_at",
             "score",
             "grade_letter",
-            "answers",
         ]
+
+    def _grading_job(self, obj):
+        # graded submissions never need the job row; clients stop polling once GRADED.
+        # drafts have no job until they are submitted
+        if obj.status in (Submission.Status.GRADED, Submission.Status.IN_PROGRESS):
+            return None
+        try:
+            return obj.grading_job
+        except ObjectDoesNotExist:
+            return None
+
+    def get_grading_state(self, obj) -> str:
+        if obj.status == Submission.Status.GRADED:
+            return "GRADED"
+        job = self._grading_job(obj)
+        return job.status if job is not None else obj.status
+
+    def get_queue_position(self, obj) -> Optional[int]:
+        job = self._grading_job(obj)
+        if job is None:
+            return None
+        if self.queue_positions is not None:
+            return self.queue_positions.get(job.id)
+        return queue_position(job)
+
+
+class SubmissionDetailSerializer(SubmissionSummarySerializer):
+    answers = SubmissionAnswerDetailSerializer(many=True, read_only=True)
+    percentile = serializers.SerializerMethodField()
+
+    field_columns = {**SubmissionSummarySerializer.field_columns, "percentile": ["status", "exam_id", "score"]}
+
+    class Meta(SubmissionSummarySerializer.Meta):
+        fields = SubmissionSummarySerializer.Meta.fields + ["answers", "percentile"]
+
+    def get_percentile(self, obj) -> Optional[float]:
+        # approximate (within about 1 point), from the exam's quantile sketch
+        if obj.status != Submission.Status.GRADED:
+            return None
+        return percentile_rank(obj.exam_id, obj.score)
+
+
+class SubmissionImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    input_format = serializers.ChoiceField(choices=IMPORT_FORMATS, required=False)
+    batch_size = serializers.IntegerField(required=False, default=500, min_value=1, max_value=5000)
+
+
+class SubmissionStartSerializer(serializers.Serializer):
+    exam_id = serializers.IntegerField()
+
+
+class SubmissionAutosaveSerializer(serializers.Serializer):
+    answers = SubmissionAnswerInputSerializer(many=True)
+
+    def validate_answers(self, answers):
+        if not answers:
+            raise serializers.ValidationError("At least one answer is required")
+        question_ids = [a["question_id"] for a in answers]
+        if len(question_ids) != len(set(question_ids)):
+            raise serializers.ValidationError("Duplicate question_id in answers payload")
+        return answers
+
+
+class SubmissionExportSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=EXPORT_FORMATS, default="csv")
+    per_question = serializers.BooleanField(default=False)
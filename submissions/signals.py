@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .caches import invalidate_graded_submissions
+from .models import Submission
+
+
+@receiver(post_delete, sender=Submission)
+def drop_cached_submission(sender, instance, **kwargs):
+    invalidate_graded_submissions([instance.pk])
@@ -1,3 +1,586 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import ScoreStats
+from analytics.services import percentile_sketches
+from assessments.models import Exam, Question
+from common.renderers import encode
+from grading.answer_keys import answer_key_cache, get_answer_key
+from grading.batch import BatchGrader
+from grading.memo import grading_memo
+from grading.regrade import regrade, start_or_resume_run
+from grading.models import GradingJob
+from .autosave import AutosaveBuffer, autosave_buffer, draft_owners
+from .exports import SUBMISSION_COLUMNS, gradebook_rows
+from .models import AutosaveWorker, IdempotencyKey, Submission, SubmissionAnswer
+from .views import SubmissionListView
+
+User = get_user_model()
+
+
+@override_settings(GRADING_ASYNC=False)
+class SubmissionCreateQueryBudgetTests(TestCase):
+    # select questions+exam, insert submission, bulk insert answers, select and update
+    # the exam's score stats, plus the savepoint pair the view's atomic() opens inside
+    # the test transaction
+    QUERY_BUDGET = 7
+
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        self.essay = Question.objects.create(
+            exam=self.exam, question_type="ESSAY", prompt="Explain cells", expected_answer="membrane nucleus", max_score=5,
+        )
+        self.exam.refresh_from_db()
+        self.student = User.objects.create_user("student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def tearDown(self):
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def payload(self):
+        return {
+            "exam_id": self.exam.id,
+            "answers": [
+                {"question_id": self.mcq.id, "selected_option": "b"},
+                {"question_id": self.short.id, "answer_text": "Light becomes sugar"},
+                {"question_id": self.essay.id, "answer_text": "The membrane surrounds the cell"},
+            ],
+        }
+
+    def test_create_stays_within_query_budget(self):
+        get_answer_key(self.exam.id, self.exam.content_version)  # warm, as on a live worker
+        # an exam already taken by someone, so its score stats rows exist and its score
+        # sketch is cached for percentiles
+        classmate = APIClient()
+        classmate.force_authenticate(User.objects.create_user("classmate", password="pw"))
+        classmate.post("/api/submissions/create/", self.payload(), format="json")
+
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.post("/api/submissions/create/", self.payload(), format="json")
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()["data"]
+        self.assertEqual(data["status"], "GRADED")
+        self.assertEqual(data["score"], 2 + 2.0 + 2.5)
+        self.assertEqual(data["exam_title"], "Biology")
+        self.assertEqual(
+            [(a["question_prompt"], a["awarded_score"]) for a in data["answers"]],
+            [("Pick B", 2.0), ("Photosynthesis?", 2.0), ("Explain cells", 2.5)],
+        )
+        self.assertTrue(all(a["id"] for a in data["answers"]))
+
+        stored = Submission.objects.get(pk=data["id"])
+        self.assertEqual((stored.score, stored.grade_letter, stored.answers.count()), (6.5, "F", 3))
+
+    def test_second_submission_is_rejected(self):
+        self.client.post("/api/submissions/create/", self.payload(), format="json")
+        response = self.client.post("/api/submissions/create/", self.payload(), format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["data"], {"exam_id": ["You have already submitted for this exam."]})
+        self.assertEqual(Submission.objects.count(), 1)
+
+
+@override_settings(GRADING_ASYNC=False)
+class SubmissionIdempotencyTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Chemistry", course="CHM101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick A", expected_answer="A", options=["A", "B"], max_score=1,
+        )
+        self.student = User.objects.create_user("student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.payload = {"exam_id": self.exam.id, "answers": [{"question_id": self.mcq.id, "selected_option": "A"}]}
+
+    def tearDown(self):
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def post(self, payload, key="retry-1"):
+        return self.client.post("/api/submissions/create/", payload, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self.post(self.payload)
+        self.assertEqual(first.status_code, 201)
+
+        # one lookup; no validation, grading or transaction
+        with self.assertNumQueries(1):
+            retry = self.post(self.payload)
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Submission.objects.count(), 1)
+
+    def test_key_reused_for_different_request_is_rejected(self):
+        self.post(self.payload)
+        other = {**self.payload, "answers": [{"question_id": self.mcq.id, "selected_option": "B"}]}
+
+        response = self.post(other)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Submission.objects.get().score, 1.0)
+
+    def test_expired_key_is_not_replayed(self):
+        self.post(self.payload)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        response = self.post(self.payload)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+
+class SubmissionListPaginationTests(TestCase):
+    def setUp(self):
+        exam = Exam.objects.create(title="History", course="HIS101", duration_minutes=30)
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        students = User.objects.bulk_create([User(username=f"s{i}") for i in range(9)])
+        tied = timezone.now()
+        # ties on submitted_at and drafts without one, both crossed by page boundaries
+        Submission.objects.bulk_create([
+            Submission(student=s, exam=exam, submitted_at=None if i >= 6 else tied - timezone.timedelta(minutes=i // 2))
+            for i, s in enumerate(students)
+        ])
+        self.expected = [
+            s.id for s in sorted(
+                Submission.objects.all(),
+                key=lambda s: (s.submitted_at is None, -(s.submitted_at.timestamp() if s.submitted_at else 0), -s.id),
+            )
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        pages = []
+        url = "/api/submissions/?page_size=2"
+        while url:
+            pages.append(self.client.get(url).json()["data"])
+            url = pages[-1]["next"]
+        self.assertEqual([s["id"] for p in pages for s in p["results"]], self.expected)
+
+        back = list(pages[-1]["results"])
+        url = pages[-1]["previous"]
+        while url:
+            page = self.client.get(url).json()["data"]
+            back = page["results"] + back
+            url = page["previous"]
+        self.assertEqual([s["id"] for s in back], self.expected)
+
+    def test_stream_returns_every_submission_in_page_order(self):
+        with mock.patch.object(SubmissionListView, "stream_chunk_size", 2):
+            response = self.client.get("/api/submissions/?stream=1&fields=id")
+            body = b"".join(response.streaming_content)
+
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = json.loads(body)
+        self.assertEqual((data["status"], data["message"]), (True, "Success"))
+        self.assertEqual([s["id"] for s in data["data"]], self.expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get("/api/submissions/?cursor=bm9wZQ").status_code, 404)
+
+
+@override_settings(GRADING_ASYNC=True)
+class QueuePositionTests(TestCase):
+    def setUp(self):
+        exam = Exam.objects.create(title="History", course="HIS101", duration_minutes=30)
+        question = Question.objects.create(exam=exam, question_type="MCQ", prompt="Pick A", expected_answer="A", max_score=1)
+        for n in range(4):
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(f"s{n}", password="pw"))
+            client.post("/api/submissions/create/", {"exam_id": exam.id, "answers": [
+                {"question_id": question.id, "selected_option": "A"},
+            ]}, format="json")
+        # the oldest job is being graded, so it no longer counts towards anyone's position
+        GradingJob.objects.filter(pk=GradingJob.objects.order_by("id")[0].pk).update(status=GradingJob.Status.RUNNING)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+
+    def positions(self, url):
+        return [s["queue_position"] for s in self.client.get(url).json()["data"]["results"]]
+
+    def test_list_positions_match_the_queue(self):
+        # newest first
+        self.assertEqual(self.positions("/api/submissions/"), [3, 2, 1, None])
+        submission = Submission.objects.order_by("-id")[0]
+        self.assertEqual(self.client.get(f"/api/submissions/{submission.id}/").json()["data"]["queue_position"], 3)
+
+    def test_positions_cost_one_query_per_page(self):
+        with CaptureQueriesContext(connection) as one_row:
+            self.positions("/api/submissions/?page_size=1")
+        with CaptureQueriesContext(connection) as four_rows:
+            self.positions("/api/submissions/?page_size=4")
+
+        self.assertEqual(len(four_rows), len(one_row))
+
+
+@override_settings(GRADING_ASYNC=False, SUBMISSION_AUTOSAVE_FLUSH_SECONDS=60)
+class SubmissionDraftFlowTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("ada", password="pw"))
+        # buffer without the flush thread: drafts stay pending until a read or submit flushes them
+        patcher = mock.patch.object(autosave_buffer, "_ensure_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pk = self.client.post("/api/submissions/start/", {"exam_id": self.exam.id}, format="json").json()["data"]["id"]
+
+    def tearDown(self):
+        autosave_buffer._take()
+        draft_owners.clear()
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def autosave(self, *answers, client=None):
+        return (client or self.client).patch(f"/api/submissions/{self.pk}/autosave/", {"answers": list(answers)}, format="json")
+
+    def submit(self, client=None):
+        return (client or self.client).post(f"/api/submissions/{self.pk}/submit/")
+
+    def test_start_autosave_and_submit(self):
+        again = self.client.post("/api/submissions/start/", {"exam_id": self.exam.id}, format="json")
+        self.assertEqual((again.status_code, again.json()["data"]["id"]), (200, self.pk))
+
+        self.assertEqual(self.autosave({"question_id": self.mcq.id, "selected_option": "A"}).status_code, 202)
+        self.autosave({"question_id": self.mcq.id, "selected_option": "B"}, {"question_id": self.short.id, "answer_text": "light"})
+        self.assertFalse(SubmissionAnswer.objects.filter(submission_id=self.pk).exists())  # still buffered
+
+        draft = self.client.get(f"/api/submissions/{self.pk}/").json()["data"]
+        self.assertEqual(draft["status"], "IN_PROGRESS")
+        self.assertEqual({a["question_id"]: a["selected_option"] or a["answer_text"] for a in draft["answers"]}, {
+            self.mcq.id: "B", self.short.id: "light",
+        })
+
+        self.autosave({"question_id": self.short.id, "answer_text": "light energy"})
+        response = self.submit()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual((data["status"], data["score"]), ("GRADED", 4.0))
+        self.assertEqual(self.autosave({"question_id": self.mcq.id, "selected_option": "A"}).status_code, 400)
+        self.assertEqual(self.submit().status_code, 400)
+
+    def test_only_the_owner_can_autosave_and_submit(self):
+        self.autosave({"question_id": self.mcq.id, "selected_option": "B"})
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("bo", password="pw"))
+
+        self.assertEqual(self.autosave({"question_id": self.mcq.id, "selected_option": "A"}, client=other).status_code, 403)
+        self.assertEqual(self.submit(client=other).status_code, 403)
+        self.assertEqual(Submission.objects.get(pk=self.pk).status, "IN_PROGRESS")
+
+    def test_submit_without_answers_is_rejected(self):
+        self.assertEqual(self.submit().status_code, 400)
+
+    def test_submit_waits_for_drafts_buffered_by_another_process(self):
+        self.autosave({"question_id": self.mcq.id, "selected_option": "B"})
+        other = AutosaveBuffer(interval=5, name="other-host:1")
+        with mock.patch.object(other, "_ensure_thread"):
+            other._beat(timezone.now())
+            other.put(self.pk, [(self.short.id, "SHORT", "light energy sugar", "")])
+
+        # the other process's flush thread runs while the submit waits
+        with mock.patch("submissions.autosave.time.sleep", side_effect=lambda _: other.flush(heartbeat=True)) as sleep:
+            response = self.submit()
+
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(response.json()["data"]["score"], 5.0)
+
+    def test_buffers_without_drafts_of_the_submission_are_not_waited_for(self):
+        self.autosave({"question_id": self.mcq.id, "selected_option": "B"})
+        bo = User.objects.create_user("bo", password="pw")
+        others = Submission.objects.create(student=bo, exam=self.exam, status=Submission.Status.IN_PROGRESS)
+        # live, behind the submit and holding drafts, but only another student's
+        other = AutosaveBuffer(interval=5, name="other-host:1")
+        with mock.patch.object(other, "_ensure_thread"):
+            other._beat(timezone.now() - timezone.timedelta(seconds=1))
+            other.put(others.pk, [(self.mcq.id, "MCQ", "", "A")])
+
+        with mock.patch("submissions.autosave.time.sleep") as sleep:
+            self.assertEqual(self.submit().status_code, 200)
+        sleep.assert_not_called()
+
+    def test_dead_buffers_are_not_waited_for(self):
+        self.autosave({"question_id": self.mcq.id, "selected_option": "B"})
+        AutosaveWorker.objects.create(name="gone:1", flushed_at=timezone.now() - timezone.timedelta(hours=1), interval=5)
+
+        with mock.patch("submissions.autosave.time.sleep") as sleep:
+            self.assertEqual(self.submit().status_code, 200)
+        sleep.assert_not_called()
+
+
+@override_settings(GRADING_ASYNC=False)
+class GradedSubmissionCacheTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Physics", course="PHY101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick A", expected_answer="A", options=["A", "B"], max_score=2,
+        )
+        self.student = User.objects.create_user("student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        response = self.client.post(
+            "/api/submissions/create/",
+            {"exam_id": self.exam.id, "answers": [{"question_id": self.mcq.id, "selected_option": "A"}]},
+            format="json",
+        )
+        self.url = f"/api/submissions/{response.json()['data']['id']}/"
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def test_graded_submission_is_served_from_cache(self):
+        first = self.client.get(self.url)
+
+        # only the stamp lookup that tells a current entry from one regraded elsewhere
+        with self.assertNumQueries(1):
+            again = self.client.get(self.url)
+
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.content, first.content)
+
+    def test_cached_submission_still_checks_owner(self):
+        self.client.get(self.url)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pw"))
+
+        self.assertEqual(other.get(self.url).status_code, 403)
+
+    def test_regrade_invalidates_cached_submission(self):
+        self.assertEqual(self.client.get(self.url).json()["data"]["score"], 2.0)
+        self.mcq.expected_answer = "B"
+        self.mcq.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            regrade(start_or_resume_run(self.exam))
+
+        self.assertEqual(self.client.get(self.url).json()["data"]["score"], 0.0)
+
+    def test_regrade_racing_a_read_is_not_cached(self):
+        self.mcq.expected_answer = "B"
+        self.mcq.save()
+
+        def encode_then_regrade(data):
+            # the regrade commits (and invalidates) after the read loaded the old grade
+            payload = encode(data)
+            with self.captureOnCommitCallbacks(execute=True):
+                regrade(start_or_resume_run(self.exam))
+            return payload
+
+        with mock.patch("submissions.views.encode", side_effect=encode_then_regrade):
+            self.assertEqual(self.client.get(self.url).json()["data"]["score"], 2.0)
+
+        self.assertEqual(self.client.get(self.url).json()["data"]["score"], 0.0)
+
+
+class SubmissionImportTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.mcq = Question.objects.create(
+            exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", options=["A", "B"], max_score=2,
+        )
+        self.short = Question.objects.create(
+            exam=self.exam, question_type="SHORT", prompt="Photosynthesis?", expected_answer="light energy sugar", max_score=3,
+        )
+        for name in ("ada", "bo", "cy"):
+            User.objects.create_user(name, password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+
+    def tearDown(self):
+        cache.clear()
+        answer_key_cache.clear()
+        grading_memo.clear()
+        percentile_sketches.clear()
+
+    def upload(self, name, lines, **params):
+        upload = SimpleUploadedFile(name, "\n".join(lines).encode())
+        response = self.client.post(
+            f"/api/admin/exams/{self.exam.id}/submissions/import/", {"file": upload, **params}, format="multipart",
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    def scores(self):
+        return dict(Submission.objects.filter(exam=self.exam).values_list("student__username", "score"))
+
+    def test_ndjson_imports_valid_rows_and_reports_bad_ones(self):
+        mcq, short = self.mcq.id, self.short.id
+        report = self.upload("sheets.ndjson", [
+            json.dumps({"student": "ada", "answers": [
+                {"question_id": mcq, "selected_option": "B"}, {"question_id": short, "answer_text": "light energy"},
+            ]}),
+            "{not json",
+            "",
+            json.dumps({"student": "nobody", "answers": [{"question_id": mcq, "selected_option": "B"}]}),
+            json.dumps({"student": "bo", "answers": [{"question_id": mcq}]}),
+            json.dumps({"student": "bo", "answers": [{"question_id": 999, "selected_option": "B"}]}),
+            json.dumps({"student": "ada", "answers": [{"question_id": mcq, "selected_option": "A"}]}),
+            json.dumps({"student": "cy", "answers": [{"question_id": short, "answer_text": "sugar"}]}),
+        ], batch_size=2)
+
+        self.assertEqual([(e.get("row"), e["status"]) for e in report], [
+            (2, "error"), (4, "error"), (5, "error"), (6, "error"), (7, "error"), (None, "done"),
+        ])
+        self.assertTrue(report[0]["errors"]["non_field_errors"].startswith("Invalid JSON"))
+        self.assertEqual(report[1]["errors"], {"student": "Unknown student 'nobody'"})
+        self.assertEqual(report[2]["errors"], {"answers": f"MCQ question {mcq} requires selected_option"})
+        self.assertEqual(report[3]["errors"], {"answers": "Questions not in this exam: [999]"})
+        self.assertEqual(report[4]["errors"], {"exam_id": "This student has already submitted for this exam."})
+        self.assertEqual(report[-1], {"status": "done", "created": 2, "failed": 5})
+
+        self.assertEqual(self.scores(), {"ada": 4.0, "cy": 1.0})
+        ada = Submission.objects.get(exam=self.exam, student__username="ada")
+        self.assertEqual((ada.status, ada.grade_letter), ("GRADED", "F"))
+        stats = ScoreStats.objects.get(exam=self.exam, question__isnull=True)
+        self.assertEqual((stats.count, stats.total), (2, 5.0))
+
+    def test_non_string_values_are_row_errors(self):
+        mcq, short = self.mcq.id, self.short.id
+        report = self.upload("sheets.ndjson", [
+            json.dumps({"student": "ada", "answers": [{"question_id": short, "answer_text": 5}]}),
+            json.dumps({"student": "bo", "answers": [{"question_id": mcq, "selected_option": ["B"]}]}),
+            json.dumps({"student": 7, "answers": [{"question_id": mcq, "selected_option": "B"}]}),
+            json.dumps({"student": "cy", "answers": [{"question_id": mcq, "selected_option": "B"}]}),
+        ])
+
+        self.assertEqual([e.get("errors") for e in report[:3]], [
+            {"answers": f"Question {short}: answer_text must be a string"},
+            {"answers": f"Question {mcq}: selected_option must be a string"},
+            {"student": "This field is required."},
+        ])
+        self.assertEqual(report[-1], {"status": "done", "created": 1, "failed": 3})
+
+    def test_a_concurrent_submission_fails_only_its_batch(self):
+        grade = BatchGrader.grade
+
+        def grade_after_bo_submits(grader, answers):
+            if not Submission.objects.filter(student__username="bo").exists():
+                Submission.objects.create(student=User.objects.get(username="bo"), exam=self.exam)
+            return grade(grader, answers)
+
+        with mock.patch.object(BatchGrader, "grade", grade_after_bo_submits):
+            report = self.upload("sheets.ndjson", [
+                json.dumps({"student": "bo", "answers": [{"question_id": self.mcq.id, "selected_option": "B"}]}),
+                json.dumps({"student": "cy", "answers": [{"question_id": self.mcq.id, "selected_option": "B"}]}),
+            ], batch_size=1)
+
+        self.assertEqual(report[0]["row"], 1)
+        self.assertTrue(report[0]["errors"]["non_field_errors"].startswith("Batch not saved"))
+        self.assertEqual(report[-1], {"status": "done", "created": 1, "failed": 1})
+        self.assertEqual(self.scores(), {"bo": 0.0, "cy": 2.0})
+
+    def test_csv_groups_contiguous_rows_of_a_student(self):
+        report = self.upload("sheets.csv", [
+            "student,question_id,answer_text,selected_option",
+            f"bo,{self.mcq.id},,B",
+            f"bo,{self.short.id},sugar,",
+            f"cy,{self.mcq.id},,A",
+            # bo again after another student: a second submission, rejected as a repeat
+            f"bo,{self.short.id},light,",
+        ])
+
+        self.assertEqual(report, [
+            {"row": 5, "status": "error", "errors": {"exam_id": "This student has already submitted for this exam."}},
+            {"status": "done", "created": 2, "failed": 1},
+        ])
+        self.assertEqual(self.scores(), {"bo": 3.0, "cy": 0.0})
+        bo = Submission.objects.get(exam=self.exam, student__username="bo")
+        self.assertEqual(bo.answers.count(), 2)
+
+    def test_csv_without_required_columns_is_rejected(self):
+        report = self.upload("sheets.csv", ["name,answer", "ada,B"])
+
+        self.assertEqual(report[0]["row"], 1)
+        self.assertEqual(report[-1], {"status": "done", "created": 0, "failed": 1})
+
+
+class GradebookExportTests(TestCase):
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Biology", course="BIO101", duration_minutes=30)
+        self.q1 = Question.objects.create(exam=self.exam, question_type="MCQ", prompt="Pick B", expected_answer="B", max_score=2)
+        self.q2 = Question.objects.create(exam=self.exam, question_type="SHORT", prompt="Why?", expected_answer="light", max_score=3)
+        other = Exam.objects.create(title="Chemistry", course="CHEM101", duration_minutes=30)
+        other_q = Question.objects.create(exam=other, question_type="MCQ", prompt="Pick A", expected_answer="A", max_score=1)
+
+        now = timezone.now()
+        ada, bo, cy = (User.objects.create_user(name, password="pw") for name in ("ada", "bo", "cy"))
+        self.ada = Submission.objects.create(student=ada, exam=self.exam, status="GRADED", submitted_at=now, graded_at=now, score=3.5, grade_letter="F")
+        # interleaved with this exam's rows, so a merge-join that ignored the exam would pick it up
+        foreign = Submission.objects.create(student=ada, exam=other, status="GRADED", submitted_at=now, graded_at=now, score=1)
+        self.bo = Submission.objects.create(student=bo, exam=self.exam, status="GRADED", submitted_at=now, graded_at=now, score=2, grade_letter="F")
+        self.cy = Submission.objects.create(student=cy, exam=self.exam, status="IN_PROGRESS")  # a draft without answers
+        SubmissionAnswer.objects.bulk_create([
+            SubmissionAnswer(submission=self.ada, question=self.q2, answer_text="light", awarded_score=1.5),
+            SubmissionAnswer(submission=self.ada, question=self.q1, selected_option="B", awarded_score=2),
+            SubmissionAnswer(submission=foreign, question=other_q, selected_option="A", awarded_score=1),
+            SubmissionAnswer(submission=self.bo, question=self.q1, selected_option="B", awarded_score=2),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+
+    def export(self, **params):
+        response = self.client.get(f"/api/admin/exams/{self.exam.id}/gradebook/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_per_question_scores_are_merged_into_their_submission(self):
+        rows = [json.loads(line) for line in self.export(output="ndjson", per_question="true").splitlines()]
+
+        q1, q2 = f"q_{self.q1.id}", f"q_{self.q2.id}"
+        self.assertEqual(
+            [(r["submission_id"], r["student"], r["score"], r[q1], r[q2]) for r in rows],
+            [(self.ada.id, "ada", 3.5, 2.0, 1.5), (self.bo.id, "bo", 2.0, 2.0, None), (self.cy.id, "cy", 0.0, None, None)],
+        )
+        self.assertEqual(set(rows[0]), {*SUBMISSION_COLUMNS, q1, q2})
+
+    def test_small_chunks_give_the_same_rows(self):
+        self.assertEqual(
+            list(gradebook_rows(self.exam, per_question=True, chunk_size=1)),
+            list(gradebook_rows(self.exam, per_question=True)),
+        )
+
+    def test_csv_leaves_missing_values_blank(self):
+        lines = self.export(per_question="true").splitlines()
+
+        self.assertEqual(lines[0], ",".join(SUBMISSION_COLUMNS + [f"q_{self.q1.id}", f"q_{self.q2.id}"]))
+        self.assertEqual(lines[2].split(",")[-4:], ["2.0", "F", "2.0", ""])
+        self.assertEqual(lines[3], f"{self.cy.id},cy,IN_PROGRESS,,,0.0,,,")
+        self.assertEqual(len(self.export().splitlines()[1].split(",")), len(SUBMISSION_COLUMNS))
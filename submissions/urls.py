@@ -1,8 +1,22 @@
 from django.urls import path
-from .views import SubmissionCreateView, SubmissionListView, SubmissionDetailView
+from .views import (
+    GradebookExportView,
+    SubmissionAutosaveView,
+    SubmissionCreateView,
+    SubmissionDetailView,
+    SubmissionImportView,
+    SubmissionListView,
+    SubmissionStartView,
+    SubmissionSubmitView,
+)
 
 urlpatterns = [
     path("submissions/", SubmissionListView.as_view(), name="submission-list"),
     path("submissions/create/", SubmissionCreateView.as_view(), name="submission-create"),
+    path("submissions/start/", SubmissionStartView.as_view(), name="submission-start"),
     path("submissions/<int:pk>/", SubmissionDetailView.as_view(), name="submission-detail"),
+    path("submissions/<int:pk>/autosave/", SubmissionAutosaveView.as_view(), name="submission-autosave"),
+    path("submissions/<int:pk>/submit/", SubmissionSubmitView.as_view(), name="submission-submit"),
+    path("admin/exams/<int:exam_id>/gradebook/", GradebookExportView.as_view(), name="gradebook-export"),
+    path("admin/exams/<int:exam_id>/submissions/import/", SubmissionImportView.as_view(), name="submission-import"),
 ]
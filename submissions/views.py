@@ -1,17 +1,45 @@
+import codecs
+import json
+from itertools import islice
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F, Prefetch
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import generics
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import IntegrityError
 from rest_framework.exceptions import ValidationError
-from .models import Submission, SubmissionAnswer
-from .serializers import SubmissionCreateSerializer, SubmissionDetailSerializer
+from .autosave import autosave_buffer, draft_owners, wait_for_other_buffers
+from .caches import graded_stamp, graded_submission_cache
+from .exports import export_gradebook
+from .idempotency import REPLAY_HEADER, idempotency_key, remember, replay, request_hash
+from .imports import detect_format, import_submissions, read_records
+from .models import AutosaveDraft, Submission, SubmissionAnswer
+from .serializers import (
+    SubmissionAutosaveSerializer,
+    SubmissionCreateSerializer,
+    SubmissionDetailSerializer,
+    SubmissionExportSerializer,
+    SubmissionImportSerializer,
+    SubmissionStartSerializer,
+    SubmissionSummarySerializer,
+)
 from .permissions import IsOwnerOrStaff
 
-from grading.services import MockGradingService
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExample
+from analytics.services import percentile_rank, record_grades
+from assessments.models import Exam
+from assessments.permissions import IsStaff
+from common.renderers import PreRendered, encode, stream_list, with_fields
+
+from grading.answer_keys import answer_key_cache, get_answer_key
+from grading.bulk import grade_rows, load_answer_rows, write_grades
+from grading.queue import enqueue_grading
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExample, OpenApiParameter
 
 
 
@@ -19,7 +47,15 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExam
     post=extend_schema(
         tags=["Submissions"],
         request=SubmissionCreateSerializer,
-        responses={201: SubmissionDetailSerializer},
+        responses={201: SubmissionDetailSerializer, 202: SubmissionDetailSerializer},
+        parameters=[
+            OpenApiParameter(
+                "Idempotency-Key",
+                location=OpenApiParameter.HEADER,
+                required=False,
+                description="Retries with the same key get the first response back instead of a new attempt.",
+            ),
+        ],
         examples=[
             OpenApiExample(
                 "Create submission example",
@@ -38,64 +74,144 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiExam
 
 class SubmissionCreateView(generics.GenericAPIView):
     serializer_class = SubmissionCreateSerializer
+    idempotency = None
 
-    @transaction.atomic
     def post(self, request, *args, **kwargs):
+        # a retry with a known Idempotency-Key is answered from the stored response,
+        # before validation, grading or the write transaction
+        key = idempotency_key(request)
+        if key is not None:
+            self.idempotency = (key, request_hash(request.data))
+            stored = replay(request.user, *self.idempotency)
+            if stored is not None:
+                return stored
+        return self.create(request)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.idempotency is not None and not response.has_header(REPLAY_HEADER):
+            remember(request.user, *self.idempotency, response)
+        return response
+
+    @transaction.atomic
+    def create(self, request):
         input_serializer = self.get_serializer(data=request.data, context={"request": request})
         input_serializer.is_valid(raise_exception=True)
 
+        # async mode: store answers now, a grading_worker grades them after commit
+        grade_now = not settings.GRADING_ASYNC
         try:
-            submission = input_serializer.save()
+            submission = input_serializer.save(grade=grade_now)
         except IntegrityError:
             # handles UNIQUE constraint failed: (student, exam)
-            raise ValidationError({"exam_id": "You have already submitted for this exam."})
+            raise ValidationError({"exam_id": ["You have already submitted for this exam."]})
 
-        # Re-fetch with optimal prefetch for grading
-        submission = (
-            Submission.objects
-            .select_related("exam", "student")
-            .prefetch_related("answers__question")
-            .get(id=submission.id)
-        )
+        if not grade_now:
+            submission.grading_job = enqueue_grading(submission)
+
+        # built from the in-memory submission: no re-fetch
+        output = SubmissionDetailSerializer(submission).data
+        return Response(output, status=status.HTTP_201_CREATED if grade_now else status.HTTP_202_ACCEPTED)
 
-        grader = MockGradingService()
-        result = grader.grade(submission)
 
-        per_q = {g.question_id: g for g in result.per_question}
+class SubmissionListView(generics.ListAPIView):
+    """
+    Lists submissions as summaries (no answers). `?include=answers` adds the answers;
+    `?fields=id,score,...` limits the fields returned, and the columns loaded with them.
+    `?stream=1` returns every matching submission instead of a page, as a streamed list.
+    """
+    # served by the submitted_at and (student, submitted_at) indexes
+    ordering = ("-submitted_at", "-id")
+    stream_chunk_size = 500
+
+    @extend_schema(
+        tags=["Submissions"],
+        responses=SubmissionDetailSerializer(many=True),
+        parameters=[
+            OpenApiParameter("fields", str, description="Comma-separated fields to return, e.g. id,score,grade_letter."),
+            OpenApiParameter("include", str, enum=["answers"], description="`answers` adds each submission's answers."),
+            OpenApiParameter(
+                "stream", bool,
+                description="Return all matching submissions as one streamed list (`data` is an array, no cursors).",
+            ),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        if request.query_params.get("stream") in ("1", "true"):
+            return self.stream()
+        return super().get(request, *args, **kwargs)
 
-        answers = list(submission.answers.all())
-        for ans in answers:
-            g = per_q.get(ans.question_id)
-            if g:
-                ans.awarded_score = g.awarded_score
-                ans.feedback = g.feedback
+    def stream(self):
+        """
+        Reads the rows with a database iterator and serializes, encodes and sends them
+        stream_chunk_size at a time, so memory and time to first byte do not depend on
+        how many submissions match.
+        """
+        # same order as the pages: NULL submitted_at (drafts) last on every database
+        order = [
+            F(name.lstrip("-")).desc(nulls_last=True) if name.startswith("-") else F(name).asc(nulls_last=True)
+            for name in self.ordering
+        ]
+        queryset = self.filter_queryset(self.get_queryset()).order_by(*order)
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
 
-        SubmissionAnswer.objects.bulk_update(answers, ["awarded_score", "feedback"])
+        def chunks():
+            while True:
+                batch = list(islice(rows, self.stream_chunk_size))
+                if not batch:
+                    return
+                yield self.get_serializer(batch, many=True).data
 
-        submission.score = result.total_score
-        submission.graded_at = timezone.now()
-        submission.status = Submission.Status.GRADED
-        submission.grade_letter = letter_grade(submission.score)
-        submission.save(update_fields=["score", "graded_at", "status", "grade_letter"])
+        return StreamingHttpResponse(stream_list(chunks()), content_type="application/json")
 
-        output = SubmissionDetailSerializer(submission).data
-        return Response(output, status=status.HTTP_201_CREATED)
+    def include_answers(self) -> bool:
+        return "answers" in self.request.query_params.get("include", "").split(",")
 
+    def get_serializer_class(self):
+        return SubmissionDetailSerializer if self.include_answers() else SubmissionSummarySerializer
 
-class SubmissionListView(generics.ListAPIView):
-    serializer_class = SubmissionDetailSerializer
+    def requested_fields(self):
+        if not hasattr(self, "_requested_fields"):
+            raw = self.request.query_params.get("fields")
+            fields = None
+            if raw:
+                available = self.get_serializer_class().Meta.fields
+                fields = [f for f in (part.strip() for part in raw.split(",")) if f]
+                unknown = [f for f in fields if f not in available]
+                if unknown:
+                    raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+                if self.include_answers():
+                    fields.append("answers")
+            self._requested_fields = fields
+        return self._requested_fields
 
-    @extend_schema(tags=["Submissions"], responses=SubmissionDetailSerializer(many=True))
-    def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+    def get_serializer(self, *args, **kwargs):
+        kwargs["fields"] = self.requested_fields()
+        return super().get_serializer(*args, **kwargs)
 
     def get_queryset(self):
-        qs = (
-            Submission.objects
-            .select_related("exam", "student")
-            .prefetch_related("answers__question")
-            .order_by("-submitted_at")
-        )
+        serializer_class = self.get_serializer_class()
+        fields = self.requested_fields() or serializer_class.Meta.fields
+
+        # only the columns the response needs, plus the pagination keys
+        columns = {"id", "submitted_at"}
+        for name in fields:
+            columns.update(serializer_class.field_columns.get(name, ()))
+        related = sorted({c.split("__")[0] for c in columns if "__" in c})
+        if "exam" in related:
+            columns.add("exam")
+
+        qs = Submission.objects.only(*columns)
+        if related:
+            qs = qs.select_related(*related)
+        if "answers" in fields:
+            qs = qs.prefetch_related(Prefetch(
+                "answers",
+                queryset=SubmissionAnswer.objects.select_related("question").only(
+                    "id", "submission_id", "question", "answer_text", "selected_option", "awarded_score", "feedback",
+                    "question__prompt", "question__question_type", "question__max_score",
+                ),
+            ))
         if self.request.user.is_staff:
             return qs
         return qs.filter(student=self.request.user)
@@ -107,12 +223,38 @@ class SubmissionDetailView(generics.RetrieveAPIView):
 
     @extend_schema(tags=["Submissions"], responses=SubmissionDetailSerializer)
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        pk = kwargs["pk"]
+        # graded submissions are immutable until regraded: serve the rendered response,
+        # with the percentile (which moves as the cohort grows) filled in per request
+        key = graded_submission_cache.key(pk)
+        cached = graded_submission_cache.get(key)
+        if cached is not None:
+            student_id, exam_id, score, stamp, payload = cached
+            if not request.user.is_staff and student_id != request.user.id:
+                raise PermissionDenied("You can only view your own submissions.")
+            if graded_stamp(pk) == stamp:
+                return Response(PreRendered(with_fields(payload, percentile=percentile_rank(exam_id, score))))
+
+        # show a draft as last autosaved, not as last flushed
+        if autosave_buffer.has_pending(pk):
+            autosave_buffer.flush(pk)
+
+        submission = self.get_object()
+        data = self.get_serializer(submission).data
+        if submission.status != Submission.Status.GRADED:
+            return Response(data)
+        percentile = data.pop("percentile")
+        payload = encode(data)
+        # stamped as loaded: if a regrade commits while this response is built, the next read
+        # sees a newer stamp and rebuilds
+        stamp = (submission.graded_at, submission.score, submission.exam.content_version)
+        graded_submission_cache.set(key, (submission.student_id, submission.exam_id, submission.score, stamp, payload))
+        return Response(PreRendered(with_fields(payload, percentile=percentile)))
 
     def get_queryset(self):
         return (
             Submission.objects
-            .select_related("exam", "student")
+            .select_related("exam", "student", "grading_job")
             .prefetch_related("answers__question")
         )
 
@@ -124,14 +266,203 @@ class SubmissionDetailView(generics.RetrieveAPIView):
         return obj
 
 
-def letter_grade(score: float) -> str:
-    # Simple scale; adjust if needed
-    if score >= 90:
-        return "A"
-    if score >= 75:
-        return "B"
-    if score >= 60:
-        return "C"
-    if score >= 50:
-        return "D"
-    return "F"
+
+class SubmissionStartView(generics.GenericAPIView):
+    """
+    Start (or resume) an exam: creates an IN_PROGRESS submission that answers are
+    autosaved into. Starting again returns the same draft.
+    """
+    serializer_class = SubmissionStartSerializer
+
+    @extend_schema(tags=["Submissions"], request=SubmissionStartSerializer, responses={200: SubmissionDetailSerializer, 201: SubmissionDetailSerializer})
+    def post(self, request):
+        params = self.get_serializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        exam = Exam.objects.filter(id=params.validated_data["exam_id"]).first()
+        if exam is None:
+            raise ValidationError({"exam_id": "Exam not found"})
+
+        try:
+            with transaction.atomic():
+                submission, created = Submission.objects.get_or_create(
+                    student=request.user, exam=exam, defaults={"status": Submission.Status.IN_PROGRESS},
+                )
+        except IntegrityError:
+            # a concurrent start for the same exam won the insert
+            submission, created = Submission.objects.get(student=request.user, exam=exam), False
+        if submission.status != Submission.Status.IN_PROGRESS:
+            raise ValidationError({"exam_id": ["You have already submitted for this exam."]})
+
+        draft_owners.set(submission.id, (submission.student_id, submission.exam_id))
+        submission = (
+            Submission.objects
+            .select_related("exam")
+            .prefetch_related("answers__question")
+            .get(pk=submission.pk)
+        )
+        return Response(
+            SubmissionDetailSerializer(submission).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class SubmissionAutosaveView(generics.GenericAPIView):
+    """
+    Autosave draft answers. Saves are buffered in memory and written in batches
+    (see submissions.autosave); only the latest answer per question is kept.
+    """
+    serializer_class = SubmissionAutosaveSerializer
+
+    def _draft_owner(self, pk):
+        owner = draft_owners.get(pk)
+        if owner is not None:
+            return owner
+        row = Submission.objects.filter(pk=pk).values_list("student_id", "exam_id", "status").first()
+        if row is None:
+            raise NotFound("Submission not found.")
+        if row[2] != Submission.Status.IN_PROGRESS:
+            raise ValidationError({"status": "This submission is no longer in progress."})
+        owner = row[:2]
+        draft_owners.set(pk, owner)
+        return owner
+
+    @extend_schema(tags=["Submissions"], request=SubmissionAutosaveSerializer, responses={202: dict})
+    def patch(self, request, pk):
+        student_id, exam_id = self._draft_owner(pk)
+        if student_id != request.user.id:
+            raise PermissionDenied("You can only autosave your own submissions.")
+
+        params = self.get_serializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        answers = params.validated_data["answers"]
+
+        # any cached key will do for membership checks; reload only for unknown questions
+        answer_key = answer_key_cache.get(exam_id)
+        if answer_key is None or any(a["question_id"] not in answer_key.questions for a in answers):
+            answer_key = get_answer_key(exam_id)
+        missing = [a["question_id"] for a in answers if a["question_id"] not in answer_key.questions]
+        if missing:
+            raise ValidationError({"answers": f"Questions not in this exam: {missing}"})
+
+        buffered = autosave_buffer.put(pk, (
+            (
+                a["question_id"],
+                answer_key.questions[a["question_id"]].question_type,
+                a.get("answer_text", "") or "",
+                a.get("selected_option", "") or "",
+            )
+            for a in answers
+        ))
+        return Response({"id": pk, "status": Submission.Status.IN_PROGRESS, "buffered": buffered}, status=status.HTTP_202_ACCEPTED)
+
+
+class SubmissionSubmitView(generics.GenericAPIView):
+    """
+    Final submit of a draft: writes any buffered autosaves (this process's directly, other
+    processes' by waiting for their next flush), then grades the stored answers (or queues
+    them in async mode). The client does not upload the answers again.
+    """
+    serializer_class = SubmissionDetailSerializer
+
+    def _check(self, submission):
+        if submission is None:
+            raise NotFound("Submission not found.")
+        if submission.student_id != self.request.user.id:
+            raise PermissionDenied("You can only submit your own submissions.")
+        if submission.status != Submission.Status.IN_PROGRESS:
+            raise ValidationError({"status": "This submission is no longer in progress."})
+
+    @extend_schema(tags=["Submissions"], request=None, responses={200: SubmissionDetailSerializer, 202: SubmissionDetailSerializer})
+    def post(self, request, pk):
+        self._check(Submission.objects.filter(pk=pk).only("id", "student_id", "status").first())
+        since = timezone.now()
+        autosave_buffer.flush(pk)
+        wait_for_other_buffers(pk, since)
+        with transaction.atomic():
+            return self._submit(pk)
+
+    def _submit(self, pk):
+        submission = Submission.objects.select_for_update().filter(pk=pk).first()
+        self._check(submission)
+
+        rows_by_submission = load_answer_rows([submission.id])
+        if not rows_by_submission[submission.id]:
+            raise ValidationError({"answers": "At least one answer is required"})
+
+        now = timezone.now()
+        grade_now = not settings.GRADING_ASYNC
+        Submission.objects.filter(pk=submission.pk).update(status=Submission.Status.SUBMITTED, submitted_at=now)
+        if grade_now:
+            answer_key = get_answer_key(submission.exam_id)
+            results = grade_rows(answer_key, rows_by_submission)
+            write_grades(rows_by_submission, results, graded_at=now)
+            record_grades(answer_key, rows_by_submission, results)
+        else:
+            enqueue_grading(submission)
+        draft_owners.pop(submission.id)
+        AutosaveDraft.objects.filter(submission_id=submission.id).delete()
+
+        submission = (
+            Submission.objects
+            .select_related("exam", "grading_job")
+            .prefetch_related("answers__question")
+            .get(pk=submission.pk)
+        )
+        return Response(
+            SubmissionDetailSerializer(submission).data,
+            status=status.HTTP_200_OK if grade_now else status.HTTP_202_ACCEPTED,
+        )
+
+
+class SubmissionImportView(generics.GenericAPIView):
+    """
+    Staff: import offline answer sheets for an exam from an NDJSON or CSV upload.
+    The response is streamed as NDJSON: one line per rejected row, then a summary line.
+    """
+    permission_classes = [IsStaff]
+    serializer_class = SubmissionImportSerializer
+
+    @extend_schema(tags=["Submissions"], request={"multipart/form-data": SubmissionImportSerializer}, responses={(200, "application/x-ndjson"): dict})
+    def post(self, request, exam_id):
+        exam = get_object_or_404(Exam, pk=exam_id)
+        params = self.get_serializer(data=request.data)
+        params.is_valid(raise_exception=True)
+
+        upload = params.validated_data["file"]
+        fmt = params.validated_data.get("input_format") or detect_format(upload.name, upload.content_type)
+        lines = codecs.iterdecode(upload, "utf-8-sig")
+        report = import_submissions(
+            exam, read_records(lines, fmt), batch_size=params.validated_data["batch_size"],
+        )
+        return StreamingHttpResponse(
+            (json.dumps(entry) + "\n" for entry in report),
+            content_type="application/x-ndjson",
+        )
+
+
+class GradebookExportView(generics.GenericAPIView):
+    """
+    Staff: stream an exam's gradebook as CSV or NDJSON, one row per submission,
+    optionally with a score column per question. Not wrapped in the response envelope.
+    """
+    permission_classes = [IsStaff]
+    serializer_class = SubmissionExportSerializer
+    pagination_class = None
+
+    @extend_schema(
+        tags=["Submissions"],
+        parameters=[SubmissionExportSerializer],
+        responses={(200, "text/csv"): str, (200, "application/x-ndjson"): str},
+    )
+    def get(self, request, exam_id):
+        exam = get_object_or_404(Exam, pk=exam_id)
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        output = params.validated_data["output"]
+
+        response = StreamingHttpResponse(
+            export_gradebook(exam, output=output, per_question=params.validated_data["per_question"]),
+            content_type="text/csv" if output == "csv" else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="exam-{exam.id}-gradebook.{output}"'
+        return response